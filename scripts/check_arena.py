@@ -0,0 +1,41 @@
+import sys, tracemalloc
+from aurafilm.utils.params import Params, ParamStore
+from aurafilm.utils.presets import load_preset_by_name, apply_preset_to_params
+from aurafilm.rt.engine import RTProcessor
+from aurafilm.rt.arena import peak_rss_mb
+from check_glow_quality import test_frame
+
+# Checks that steady-state frames allocate nothing: after warm-up the arena
+# must not grow, and the traced peak over a run of frames must stay below
+# LIMIT_KB (small Python/OpenCV bookkeeping, not frame-sized buffers).
+PRESETS = ["portra_00s", "kodachrome_60s", "expired_90s", "bw_trix"]
+TILES = [1, 3]
+WARMUP, FRAMES = 4, 8
+LIMIT_KB = 256
+
+def main():
+    frame = test_frame(1920, 1080)
+    failed = False
+    for name in PRESETS:
+        p = apply_preset_to_params(load_preset_by_name(name), Params(width=1920, height=1080))
+        for tiles in TILES:
+            proc = RTProcessor(ParamStore(p), tiles=tiles)
+            proc.out_ring = 4
+            for i in range(WARMUP): proc.process(frame, frame_idx=i)
+            allocs = proc.arena.allocs
+            tracemalloc.start()
+            base = tracemalloc.get_traced_memory()[0]
+            for i in range(WARMUP, WARMUP+FRAMES): proc.process(frame, frame_idx=i)
+            peak_kb = (tracemalloc.get_traced_memory()[1] - base)//1024
+            tracemalloc.stop()
+            grew = proc.arena.allocs - allocs
+            ok = grew == 0 and peak_kb <= LIMIT_KB
+            failed |= not ok
+            s = proc.arena.stats()
+            print(f"{name:16s} tiles={tiles}  arena {s['buffers']:3d} bufs {s['mb']:7.1f} MB  "
+                  f"steady allocs={grew}  traced peak={peak_kb} KB" + ("" if ok else "  FAIL"))
+    print(f"peak RSS: {peak_rss_mb()} MB")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
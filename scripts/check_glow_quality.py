@@ -0,0 +1,40 @@
+import sys, numpy as np, cv2
+from aurafilm.utils.params import Params
+from aurafilm.utils.presets import load_preset_by_name, apply_preset_to_params
+from aurafilm.rt.nodes import halation, bloom, to_float, to_uint8
+from aurafilm.rt.glow import glow_f
+
+# Measures how far each glow quality deviates from the exact per-node
+# halation() -> bloom() output. Exits non-zero if a tolerance is exceeded.
+PRESETS = ["portra_00s", "kodachrome_60s", "expired_90s", "bw_trix"]
+# max mean abs error (0..255) per quality
+TOLERANCE = {"full": 0.5, "half": 1.0, "quarter": 2.0}
+
+def test_frame(w=1280, h=720, seed=0):
+    rng = np.random.default_rng(seed)
+    img = cv2.GaussianBlur((rng.random((h,w,3))*255).astype(np.uint8), (0,0), 6)
+    for _ in range(12):  # bright highlights of various sizes
+        x, y = int(rng.integers(w)), int(rng.integers(h))
+        cv2.circle(img, (x,y), int(rng.integers(3, 60)), (250,245,255), -1)
+    return img
+
+def main():
+    frame = test_frame()
+    failed = False
+    print(f"{'preset':16s} {'quality':8s} {'mean':>7s} {'p99':>5s} {'max':>5s} {'psnr':>7s}")
+    for name in PRESETS:
+        p = apply_preset_to_params(load_preset_by_name(name), Params())
+        ref = bloom(halation(frame, p), p.bloom_radius, p.bloom_str).astype(np.float32)
+        for q in TOLERANCE:
+            out = to_uint8(glow_f(to_float(frame), p, q)).astype(np.float32)
+            d = np.abs(out-ref)
+            mse = float(np.mean(d*d))
+            psnr = 10*np.log10(255.0**2/mse) if mse > 0 else float("inf")
+            ok = d.mean() <= TOLERANCE[q]
+            failed |= not ok
+            print(f"{name:16s} {q:8s} {d.mean():7.3f} {np.percentile(d,99):5.0f} {d.max():5.0f} {psnr:7.2f}"
+                  + ("" if ok else "  FAIL"))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
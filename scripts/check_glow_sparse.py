@@ -0,0 +1,55 @@
+import sys, time, numpy as np, cv2
+from aurafilm.utils.params import Params
+from aurafilm.utils.presets import load_preset_by_name, apply_preset_to_params
+from aurafilm.rt import analysis
+from aurafilm.rt.arena import BufferArena
+from aurafilm.rt.glow import glow_f, glow_plan
+from aurafilm.rt.nodes import to_float, to_uint8
+from check_glow_quality import test_frame
+
+# Checks that region-sparse glow matches the full-frame pass (regions
+# forced to the whole frame) on frames with scattered, edge-touching and no
+# highlights, for every quality, and prints the cost of both. Differences
+# come only from pyramid / resize rounding at region edges. Exits non-zero
+# if a pixel differs by more than TOLERANCE (uint8 levels).
+PRESETS = ["portra_00s", "kodachrome_60s", "expired_90s", "bw_trix"]
+TOLERANCE = 1
+REPEAT = 5
+
+def frames(w=1280, h=720):
+    dark = (test_frame(w, h, seed=1)*0.5).astype(np.uint8)
+    few = dark.copy()
+    for x, y, r in ((100, 90, 6), (900, 400, 20), (w-3, h-2, 12), (2, 300, 8)):  # incl. corners and edges
+        cv2.circle(few, (x, y), r, (250, 248, 255), -1)
+    return {"scattered": test_frame(w, h), "few": few, "dark": dark}
+
+def run(x, p, q, arena, dense):
+    share = analysis.DENSE_SHARE
+    if dense: analysis.DENSE_SHARE = -1.0
+    try:
+        t0 = time.perf_counter()
+        for _ in range(REPEAT):
+            out = glow_f(x, p, q, plan=glow_plan(p, q), arena=arena)
+        return out, (time.perf_counter()-t0)*1000/REPEAT
+    finally:
+        analysis.DENSE_SHARE = share
+
+def main():
+    failed = False
+    for fname, frame in frames().items():
+        x = to_float(frame)
+        for name in PRESETS:
+            p = apply_preset_to_params(load_preset_by_name(name), Params())
+            for q in ("full", "half", "quarter"):
+                ref, t_dense = run(x, p, q, BufferArena(), True)
+                ref = to_uint8(ref.copy())
+                out, t_sparse = run(x, p, q, BufferArena(), False)
+                d = int(np.abs(to_uint8(out.copy()).astype(np.int16) - ref).max())
+                ok = d <= TOLERANCE
+                failed |= not ok
+                print(f"{fname:9s} {name:16s} {q:8s} max diff={d}  dense {t_dense:6.1f} ms  sparse {t_sparse:6.1f} ms"
+                      + ("" if ok else "  FAIL"))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+import sys, json, time, urllib.request
+import cv2, numpy as np
+from aurafilm.rt.render import params_for_preset
+from aurafilm.rt.server import StreamServer
+
+# Starts the multi-stream server on three synthetic feeds (two share a
+# preset and resolution), reads MJPEG parts and a snapshot over HTTP and
+# checks /stats: every stream makes progress, and derived state (LUTs, grain
+# banks) is built once per distinct preset, not once per stream, even when
+# streams ask for it at the same time. Exits non-zero on failure.
+STREAMS = [("synthetic:320x240", "portra_00s"), ("synthetic:320x240", "portra_00s"),
+           ("synthetic:320x240", "bw_trix")]
+SECONDS = 3.0
+
+def read_mjpeg(url, parts):
+    frames = []
+    with urllib.request.urlopen(url, timeout=5) as r:
+        boundary = r.headers.get_content_type() == "multipart/x-mixed-replace" and r.headers.get_param("boundary")
+        assert boundary, r.headers
+        while len(frames) < parts:
+            line = r.readline().strip()
+            if line != b"--" + boundary.encode(): continue
+            n = 0
+            while (h := r.readline().strip()):
+                if h.lower().startswith(b"content-length:"): n = int(h.split(b":")[1])
+            frames.append(cv2.imdecode(np.frombuffer(r.read(n), np.uint8), cv2.IMREAD_COLOR))
+    return frames
+
+def main():
+    srv = StreamServer(workers=2)
+    params = [params_for_preset(preset, width=320, height=240) for _, preset in STREAMS]
+    for (src, _), p in zip(STREAMS, params):
+        srv.add_stream(src, p)
+    srv.start()
+    host, port = srv.serve_http(port=0)
+    base = f"http://{host}:{port}"
+    failed = False
+    try:
+        frames = read_mjpeg(f"{base}/stream/0.mjpg", 5)
+        snap = urllib.request.urlopen(f"{base}/snapshot/2.jpg", timeout=5).read()
+        time.sleep(SECONDS)
+        stats = json.loads(urllib.request.urlopen(f"{base}/stats", timeout=5).read())
+    finally:
+        srv.stop()
+    ok = all(f is not None and f.shape == (240, 320, 3) for f in frames)
+    print(f"mjpeg parts: {len(frames)} decoded={ok}  snapshot: {len(snap)} bytes")
+    failed |= not ok or not snap.startswith(b"\xff\xd8")
+    for n, s in stats["streams"].items():
+        print(f"stream {n} {s['preset']:12s} frames={s['frames']} fps={s['fps']} lat={s['latency_ms']}ms "
+              f"proc={s['process_ms']}ms drop={s['dropped']}")
+        failed |= s["frames"] == 0
+    lut = stats["cache"].get("lut", {})
+    print(f"lut cache: {lut}  grain bank: {stats['grain_bank']}")
+    failed |= lut.get("misses", 0) != len({p for _, p in STREAMS})
+    failed |= stats["grain_bank"]["misses"] != len({round(p.grain_scale, 4) for p in params if p.grain_strength > 0})
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
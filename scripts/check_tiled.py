@@ -0,0 +1,40 @@
+import sys, numpy as np
+from dataclasses import replace
+from aurafilm.utils.params import Params, ParamStore
+from aurafilm.utils.presets import load_preset_by_name, apply_preset_to_params
+from aurafilm.rt.engine import RTProcessor
+from aurafilm.rt.tiling import halo_rows, auto_tiles
+from check_glow_quality import test_frame
+
+# Checks that band-tiled processing matches the untiled path. Exits non-zero
+# if any pixel differs by more than TOLERANCE (uint8 levels).
+PRESETS = ["portra_00s", "kodachrome_60s", "expired_90s", "bw_trix"]
+TILES = [2, 3, 5, 8]
+TOLERANCE = 1
+DISTORTION = [0.1, -0.1]  # extra runs with lens distortion (widest halo)
+
+def check(frame, label, p):
+    ref = RTProcessor(ParamStore(p)).process(frame, frame_idx=7).astype(np.int16)
+    failed = False
+    for n in TILES:
+        out = RTProcessor(ParamStore(p), tiles=n).process(frame, frame_idx=7)
+        d = int(np.abs(out.astype(np.int16) - ref).max())
+        ok = d <= TOLERANCE
+        failed |= not ok
+        print(f"{label:26s} tiles={n}  halo={halo_rows(p):3d}  max diff={d}" + ("" if ok else "  FAIL"))
+    return failed
+
+def main():
+    frame = test_frame(1920, 1080)
+    failed = False
+    for name in PRESETS:
+        base = apply_preset_to_params(load_preset_by_name(name), Params(width=1920, height=1080))
+        for q in ("full", "half", "quarter"):
+            failed |= check(frame, f"{name:16s} {q}", replace(base, quality=q))
+        for k in DISTORTION:
+            failed |= check(frame, f"{name:16s} k1={k:+.2f}", replace(base, distortion=k))
+    print("auto tiles @3840x2160:", auto_tiles(3840, 2160, halo_rows(Params())))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import sys, time, numpy as np
+from dataclasses import replace
+from aurafilm.utils.params import Params, ParamStore
+from aurafilm.utils.presets import load_preset_by_name, apply_preset_to_params
+from aurafilm.rt.engine import RTProcessor, make_processor
+from check_glow_quality import test_frame
+
+# Checks the torch backend against the OpenCV path on a short sequence. The
+# two differ only in interpolation details (pyrDown/resize/remap borders,
+# float rounding), so this bounds the mean and the 99.9th percentile of the
+# per-pixel difference (uint8 levels) instead of asking for bit-exactness.
+# A batch must match the same frames rendered one by one (within a level:
+# torch may pick different kernels per batch size). Also
+# prints the throughput of both, and the worst mean / p99.9 as a share of
+# their tolerances (the headroom left). Exits non-zero on failure or
+# without torch.
+PRESETS = ["portra_00s", "kodachrome_60s", "expired_90s", "bw_trix"]
+SIZE = (960, 540)
+FRAMES = 8
+MEAN_TOL = 0.5
+P999_TOL = 3
+
+def main():
+    try:
+        import torch  # noqa: F401
+    except ImportError:
+        print("torch is not installed")
+        return 1
+    w, h = SIZE
+    base = test_frame(w, h)
+    # a little motion so grain, flicker and weave differ per frame
+    frames = [np.roll(base, 3*i, axis=1) for i in range(FRAMES)]
+    failed = False
+    worst_mean = worst_p999 = worst_single = 0
+    for name in PRESETS:
+        p = apply_preset_to_params(load_preset_by_name(name), Params(width=w, height=h))
+        if name == "kodachrome_60s": p = replace(p, distortion=0.06)  # cover the distortion tables
+        ref_proc = RTProcessor(ParamStore(p))
+        tp = make_processor(ParamStore(p), "torch", batch=4)
+        tp.grain = ref_proc.grain  # same grain fields
+        ref_proc.process(frames[0]); tp.process(frames[0])  # build derived state outside the timing
+        t0 = time.perf_counter()
+        ref = [ref_proc.process(f, frame_idx=i) for i, f in enumerate(frames)]
+        t_cv = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        out = tp.process_batch(frames, frame_idx=0)
+        t_torch = time.perf_counter() - t0
+        d = np.abs(np.stack(out).astype(np.int16) - np.stack(ref))
+        mean, p999 = float(d.mean()), int(np.percentile(d, 99.9))
+        single = max(int(np.abs(tp.process(f, frame_idx=i).astype(np.int16) - o).max())
+                     for i, (f, o) in enumerate(zip(frames, out)))
+        ok = mean <= MEAN_TOL and p999 <= P999_TOL and single <= 1
+        failed |= not ok
+        worst_mean, worst_p999, worst_single = max(worst_mean, mean), max(worst_p999, p999), max(worst_single, single)
+        print(f"{name:16s} mean={mean:.3f} p99.9={p999} max={int(d.max())} batch/single={single}  "
+              f"opencv {FRAMES/t_cv:6.1f} fps  torch {FRAMES/t_torch:6.1f} fps" + ("" if ok else "  FAIL"))
+    print(f"worst: mean {worst_mean:.3f} ({100*worst_mean/MEAN_TOL:.0f}% of {MEAN_TOL})  "
+          f"p99.9 {worst_p999} ({100*worst_p999/P999_TOL:.0f}% of {P999_TOL})  batch/single {worst_single} (limit 1)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+import sys, cv2, numpy as np
+from aurafilm.utils.params import Params, ParamStore
+from aurafilm.utils.presets import load_preset_by_name, apply_preset_to_params
+from aurafilm.rt.engine import RTProcessor
+from aurafilm.rt.variants import VariantRenderer
+from check_glow_quality import test_frame
+
+# Checks that the batched variant renderer matches RTProcessor when rendering
+# at the frame's own size with the same grain bank. Exits non-zero if any
+# pixel differs by more than TOLERANCE (uint8 levels).
+PRESETS = ["portra_00s", "kodachrome_60s", "expired_90s", "bw_trix"]
+TOLERANCE = 0
+
+def main():
+    frame = cv2.resize(test_frame(1920, 1080), (320, 180), interpolation=cv2.INTER_AREA)
+    ps = [apply_preset_to_params(load_preset_by_name(n), Params(width=320, height=180)) for n in PRESETS]
+    vr = VariantRenderer(width=320)
+    batch = vr.render(frame, ps, frame_idx=5)
+    failed = False
+    for name, p, out in zip(PRESETS, ps, batch):
+        proc = RTProcessor(ParamStore(p))
+        proc.grain = vr.grain
+        ref = proc.process(frame, frame_idx=5)
+        d = int(np.abs(out.astype(np.int16) - ref).max())
+        ok = d <= TOLERANCE
+        failed |= not ok
+        print(f"{name:16s} max diff={d}" + ("" if ok else "  FAIL"))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,8 @@ from aurafilm.ui.app import MainWindow   # <-- changed
 
 if __name__ == "__main__":
     app = QtWidgets.QApplication(sys.argv)
-    w = MainWindow(camera_index=0)
+    # camera index (default 0), video / image sequence / .afraw path, or "synthetic"
+    w = MainWindow(source=sys.argv[1] if len(sys.argv) > 1 else 0)
     w.resize(1280, 720)
     w.show()
     sys.exit(app.exec())
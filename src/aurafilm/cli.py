@@ -0,0 +1,182 @@
+import argparse, sys
+
+def _size(text):
+    w, h = map(int, text.lower().split("x"))
+    return (w, h)
+
+def _tiles(text):
+    return text if text == "auto" else int(text)
+
+def cmd_render(args):
+    from .rt.render import render, params_for_preset
+    params = params_for_preset(args.preset, quality=args.quality,
+                               lock_grain=False if args.live_grain else None)
+    def progress(done, total, fps):
+        print(f"\r{done}/{total} frames  {fps:6.1f} fps", end="", file=sys.stderr, flush=True)
+    res = render(args.input, args.output, params, workers=args.workers, chunk=args.chunk,
+                 size=args.size, fps=args.fps, fourcc=args.fourcc, tiles=args.tiles,
+                 progress=None if args.quiet else progress, backend=args.backend, batch=args.batch)
+    if not args.quiet: print(file=sys.stderr)
+    print(f"rendered {res['frames']} frames in {res['seconds']:.2f}s "
+          f"({res['fps']:.1f} fps, {res['workers']} workers, {res['backend']})")
+    return 0
+
+def cmd_bench(args):
+    from .rt import bench
+    def log(key, r):
+        print(f"{key:55s} median {r['median_ms']:9.3f} ms  p95 {r['p95_ms']:9.3f} ms  peak {r['peak_mb']:8.2f} MB")
+    data = bench.run(resolutions=args.res or bench.RESOLUTIONS, presets=args.preset or bench.PRESETS,
+                     repeat=args.repeat, include_nodes=not args.no_nodes, tiles=args.tiles, log=log,
+                     source=args.source)
+    if args.out:
+        bench.save(data, args.out)
+        print(f"baseline written to {args.out}")
+    if args.compare:
+        regs = bench.compare(data, bench.load(args.compare), args.threshold)
+        for key, b, c, ratio in regs:
+            print(f"REGRESSION {key}: {b:.3f} -> {c:.3f} ms (x{ratio:.2f})")
+        print(f"{len(regs)} regression(s) above {args.threshold:.0%}")
+        return 1 if regs else 0
+    return 0
+
+def cmd_lut(args):
+    from .rt.render import params_for_preset
+    from .rt.lut3d import load_or_bake, write_cube, read_cube
+    if args.action == "export":
+        p = params_for_preset(args.preset, look_cube=args.look)
+        write_cube(args.path, load_or_bake(p, args.size), title=args.preset)
+        print(f"wrote {args.size}^3 LUT for {args.preset} to {args.path}")
+    else:  # check
+        lut = read_cube(args.path)
+        print(f"{args.path}: {lut.shape[0]}^3 LUT, range {lut.min():.4f}..{lut.max():.4f}")
+    return 0
+
+def cmd_grid(args):
+    import cv2
+    from .rt.render import params_for_preset
+    from .rt.sources import open_source
+    from .rt.variants import VariantRenderer, contact_sheet
+    from .utils.presets import registry
+    names = args.preset or registry().names()
+    reader = open_source(args.input)
+    frame = reader.read_at(min(args.frame, max(0, len(reader)-1))) if not reader.live else reader.read()[1]
+    reader.close()
+    if frame is None:
+        print(f"could not read frame {args.frame} from {args.input}", file=sys.stderr)
+        return 1
+    imgs = VariantRenderer(args.width).render(frame, [params_for_preset(n) for n in names], frame_idx=args.frame)
+    cv2.imwrite(args.output, contact_sheet(imgs, names, cols=args.cols))
+    print(f"wrote {len(names)} variants to {args.output}")
+    return 0
+
+def cmd_serve(args):
+    import os, time, cv2
+    from .rt.render import params_for_preset
+    from .rt.server import StreamServer
+    workers = args.workers or os.cpu_count() or 1
+    cv2.setNumThreads(1)  # the pool spreads streams over the cores
+    srv = StreamServer(workers=workers, jpeg_quality=args.jpeg_quality)
+    for spec in args.streams:
+        src, _, preset = spec.rpartition("@") if "@" in spec else (spec, "", args.preset)
+        size = args.size or (None, None)
+        srv.add_stream(src, params_for_preset(preset or args.preset, quality=args.quality,
+                                              width=size[0], height=size[1]), size=args.size)
+    srv.start()
+    host, port = srv.serve_http(args.host, args.port)
+    print(f"serving {len(srv.streams)} streams on http://{host}:{port}/ ({workers} workers)")
+    t0 = time.perf_counter()
+    try:
+        while not args.duration or time.perf_counter()-t0 < args.duration:
+            time.sleep(args.stats_every or 0.5)
+            if args.stats_every:
+                for n, s in srv.stats()["streams"].items():
+                    print(f"  [{n}] {s['preset']:16s} {s['fps']:6.1f} fps  lat {s['latency_ms']:7.1f} ms  "
+                          f"proc {s['process_ms']:6.1f} ms  drop {s['dropped']}  clients {s['clients']}")
+    except KeyboardInterrupt:
+        pass
+    srv.stop()
+    return 0
+
+def cmd_startup(args):
+    from .utils.startup import import_report, DEFAULT_MODULES
+    for line in import_report(args.module or DEFAULT_MODULES, top=args.top):
+        print(line)
+    return 0
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog="aurafilm")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    r = sub.add_parser("render", help="apply a preset to a video file or image sequence")
+    r.add_argument("input", help="video file, image directory or glob, .afraw capture, synthetic:WxH:N")
+    r.add_argument("output", help="video file, or image path / printf pattern (out/%%06d.png)")
+    r.add_argument("-p", "--preset", default="portra_00s")
+    r.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    r.add_argument("--chunk", type=int, default=16, help="frames per work item")
+    r.add_argument("--size", type=_size, default=None, help="processing size WxH (default: input size)")
+    r.add_argument("--fps", type=float, default=None, help="output frame rate (default: input rate)")
+    r.add_argument("--fourcc", default="mp4v")
+    r.add_argument("--quality", choices=["full", "half", "quarter"], default=None)
+    r.add_argument("--tiles", type=_tiles, default=1, help="bands per frame on a thread pool (N or auto)")
+    r.add_argument("--live-grain", action="store_true", help="animated grain instead of locked")
+    r.add_argument("--backend", choices=["opencv", "torch"], default="opencv",
+                   help="torch: batched tensor node chain (default: 1 worker, torch threads)")
+    r.add_argument("--batch", type=int, default=4, help="frames per tensor batch (torch backend)")
+    r.add_argument("-q", "--quiet", action="store_true")
+    r.set_defaults(func=cmd_render)
+
+    b = sub.add_parser("bench", help="benchmark nodes and RTProcessor on synthetic frames")
+    b.add_argument("--res", type=_size, action="append", help="WxH, repeatable (default: 480p..4K sweep)")
+    b.add_argument("--preset", action="append", help="repeatable (default: all shipped presets)")
+    b.add_argument("--repeat", type=int, default=10)
+    b.add_argument("--no-nodes", action="store_true", help="only time the full RTProcessor.process")
+    b.add_argument("--tiles", type=_tiles, default=1)
+    b.add_argument("--source", help="also time decode + process from a video, image sequence, .afraw or synthetic")
+    b.add_argument("--out", help="write results as a JSON baseline")
+    b.add_argument("--compare", help="baseline JSON to compare against")
+    b.add_argument("--threshold", type=float, default=0.15, help="relative slowdown flagged as regression")
+    b.set_defaults(func=cmd_bench)
+
+    lt = sub.add_parser("lut", help="export a preset as a .cube 3D LUT, or check a .cube file")
+    lt.add_argument("action", choices=["export", "check"])
+    lt.add_argument("path", help=".cube file to write (export) or read (check)")
+    lt.add_argument("-p", "--preset", default="portra_00s")
+    lt.add_argument("--size", type=int, default=33, choices=[17, 33, 65])
+    lt.add_argument("--look", default=None, help="external .cube applied after the preset's tone")
+    lt.set_defaults(func=cmd_lut)
+
+    g = sub.add_parser("grid", help="render one frame under several presets into an A/B contact sheet")
+    g.add_argument("input", help="video file, image directory, glob, single image, .afraw or synthetic:WxH")
+    g.add_argument("output", help="image file for the contact sheet")
+    g.add_argument("-p", "--preset", action="append", help="preset to include (repeatable, default: all)")
+    g.add_argument("--frame", type=int, default=0)
+    g.add_argument("--width", type=int, default=480, help="width of each variant")
+    g.add_argument("--cols", type=int, default=None)
+    g.set_defaults(func=cmd_grid)
+
+    sv = sub.add_parser("serve", help="process several sources at once and serve them as local MJPEG streams")
+    sv.add_argument("streams", nargs="+", metavar="SOURCE[@PRESET]",
+                    help="camera index, video, image sequence, .afraw or synthetic[:WxH], optionally @preset")
+    sv.add_argument("-p", "--preset", default="portra_00s", help="preset for streams without @preset")
+    sv.add_argument("-j", "--workers", type=int, default=None, help="shared processing threads (default: all cores)")
+    sv.add_argument("--size", type=_size, default=None, help="processing size WxH (default: source size)")
+    sv.add_argument("--quality", choices=["full", "half", "quarter"], default=None)
+    sv.add_argument("--host", default="127.0.0.1")
+    sv.add_argument("--port", type=int, default=8080)
+    sv.add_argument("--jpeg-quality", type=int, default=80)
+    sv.add_argument("--stats-every", type=float, default=0, help="print per-stream stats every N seconds")
+    sv.add_argument("--duration", type=float, default=0, help="stop after N seconds (default: run until Ctrl-C)")
+    sv.set_defaults(func=cmd_serve)
+
+    st = sub.add_parser("startup", help="import-time report: what each entry point pulls in, and what it costs")
+    st.add_argument("-m", "--module", action="append", help="module to profile (repeatable, default: rt, engine, presets, ui)")
+    st.add_argument("--top", type=int, default=12, help="rows per section")
+    st.set_defaults(func=cmd_startup)
+    return ap
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,31 @@
+import importlib
+
+# The real-time engine. Submodules pull in numpy / OpenCV (and torch for the
+# torch backend), so nothing is imported here: `import aurafilm.rt` costs
+# nothing, and the names below resolve to their submodule on first access
+# (`from aurafilm.rt import RTProcessor` imports only rt.engine and what it
+# needs).
+
+_EXPORTS = {
+    "RTProcessor": "engine", "make_processor": "engine", "BACKENDS": "engine",
+    "PipelineRunner": "pipeline", "RingQueue": "pipeline",
+    "ArtifactCache": "cache",
+    "QualityGovernor": "governor",
+    "VariantRenderer": "variants",
+    "Recorder": "recorder",
+    "RawRing": "rawring",
+    "FrameSource": "sources", "Prefetch": "sources", "open_source": "sources",
+    "StreamServer": "server",
+}
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(name):
+    mod = _EXPORTS.get(name)
+    if mod is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{mod}", __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
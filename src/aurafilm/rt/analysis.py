@@ -0,0 +1,79 @@
+import math
+import cv2, numpy as np
+from .arena import scratch
+
+# Per-frame analysis, computed once and shared by the stages that need it:
+# luma, the max luma of every TILE x TILE tile, and (on demand) a luma
+# histogram. The glow stage uses the tile maxima to find where anything is
+# above its threshold and blurs only those regions (highlight_rects), or
+# nothing at all on a frame without highlights.
+
+TILE = 32
+DENSE_SHARE = 0.6  # regions covering more of the frame than this: one full-frame pass
+
+def luma_f(x, out=None, tmp=None):
+    if out is None: out = np.empty(x.shape[:2], np.float32)
+    np.multiply(x[...,2], np.float32(0.2126), out=out)
+    tmp = np.multiply(x[...,1], np.float32(0.7152), out=tmp)
+    out += tmp
+    out += np.multiply(x[...,0], np.float32(0.0722), out=tmp)
+    return out
+
+class FrameStats:
+    # luma lives in the arena: valid until the next frame is analysed
+    __slots__ = ("luma", "tile", "tile_max", "peak", "_hist")
+    def __init__(self, luma, tile, tile_max):
+        self.luma, self.tile, self.tile_max = luma, tile, tile_max
+        self.peak = float(tile_max.max()) if tile_max.size else 0.0
+        self._hist = None
+
+    def histogram(self, bins=256):
+        # luma histogram over [0, 1], computed on first use
+        if self._hist is None or len(self._hist) != bins:
+            self._hist = cv2.calcHist([self.luma], [0], None, [bins], [0.0, 1.0 + 1e-6]).ravel()
+        return self._hist
+
+def analyze_f(x, arena=None, tile=TILE):
+    h, w = x.shape[:2]
+    luma = luma_f(x, out=scratch(arena, "luma", (h,w)), tmp=scratch(arena, "luma_tmp", (h,w)))
+    # per tile row with cv2.reduce (SIMD), then the small remaining axis
+    rows = scratch(arena, "tile_rows", (-(-h//tile), w))
+    for i in range(rows.shape[0]):
+        cv2.reduce(luma[i*tile:(i+1)*tile], 0, cv2.REDUCE_MAX, dst=rows[i:i+1])
+    return FrameStats(luma, tile, np.maximum.reduceat(rows, np.arange(0, w, tile), axis=1))
+
+def _overlap(a, b):
+    return a[0] < b[1] and b[0] < a[1] and a[2] < b[3] and b[2] < a[3]
+
+def highlight_rects(stats, thresh, reach, align=1):
+    # -> [(y0, y1, x0, x1)]: disjoint pixel rectangles that contain every
+    # pixel with luma > thresh, grown by `reach` pixels (how far a blur of
+    # them spreads) and aligned to `align`. Anything outside them is
+    # unaffected by that blur. [] when no pixel is above thresh; the whole
+    # frame when the regions would cover most of it anyway.
+    hot = stats.tile_max > thresh
+    if not hot.any(): return []
+    h, w = stats.luma.shape
+    t = stats.tile
+    r = math.ceil(reach/t)
+    grown = cv2.dilate(hot.view(np.uint8), np.ones((2*r+1, 2*r+1), np.uint8)) if r else hot.view(np.uint8)
+    n, _, boxes, _ = cv2.connectedComponentsWithStats(grown, connectivity=8)
+    rects = []
+    for bx, by, bw, bh, _ in boxes[1:n]:
+        rects.append((by*t//align*align, min(h, -(-(by+bh)*t//align)*align),
+                      bx*t//align*align, min(w, -(-(bx+bw)*t//align)*align)))
+    # bounding boxes of separate components can still overlap (concave shapes)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(rects)):
+            for j in range(i+1, len(rects)):
+                if _overlap(rects[i], rects[j]):
+                    a, b = rects[i], rects.pop(j)
+                    rects[i] = (min(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3]))
+                    merged = True
+                    break
+            if merged: break
+    if sum((y1-y0)*(x1-x0) for y0, y1, x0, x1 in rects) > DENSE_SHARE*h*w:
+        return [(0, h, 0, w)]
+    return rects
@@ -0,0 +1,114 @@
+import sys, threading
+import numpy as np
+
+# Reusable frame buffers. Nodes ask for scratch by (name, shape, dtype) and
+# get the same array back every frame, so a steady-state frame at a fixed
+# resolution allocates nothing. Names must be unique per concurrent user
+# (band workers prefix theirs with the band index). Outputs that leave the
+# processor come from a ring that is deep enough to cover every queue the
+# frame can sit in.
+
+class BufferArena:
+    def __init__(self, max_buffers=256):
+        self.max_buffers = max_buffers
+        self._bufs = {}
+        self._rings = {}
+        self._lock = threading.Lock()
+        self.allocs = 0
+        self.nbytes = 0
+
+    def _alloc(self, shape, dtype):
+        b = np.empty(shape, dtype)
+        self.allocs += 1
+        self.nbytes += b.nbytes
+        return b
+
+    def get(self, name, shape, dtype=np.float32):
+        key = (name, shape, dtype)
+        b = self._bufs.get(key)
+        if b is None:
+            with self._lock:
+                if len(self._bufs) >= self.max_buffers:
+                    self._drop_all()  # resolution or band layout churn
+                b = self._bufs[key] = self._alloc(shape, dtype)
+        return b
+
+    def ring(self, name, shape, depth, dtype=np.uint8):
+        # next of `depth` rotating buffers, allocated lazily on first use
+        key = (name, shape, dtype)
+        with self._lock:
+            r = self._rings.get(key)
+            if r is None:
+                r = self._rings[key] = [[], 0]
+            bufs = r[0]
+            if len(bufs) > depth:
+                # shrink; continuing from the last handed-out slot keeps every
+                # buffer's reuse at least `depth` calls after it was returned
+                self.nbytes -= sum(b.nbytes for b in bufs[depth:])
+                del bufs[depth:]
+                r[1] = min(r[1], depth-1)
+            if len(bufs) < depth:
+                # grow in place after the last handed-out slot, so the older
+                # buffers keep their turn order
+                r[1] = r[1] + 1 if bufs else 0
+                bufs.insert(r[1], self._alloc(shape, dtype))
+                return bufs[r[1]]
+            r[1] = (r[1] + 1) % len(bufs)
+            return bufs[r[1]]
+
+    def _drop_all(self):
+        self._bufs.clear()
+        self.nbytes = sum(b.nbytes for r in self._rings.values() for b in r[0])
+
+    def clear(self):
+        with self._lock:
+            self._bufs.clear()
+            self._rings.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        return {"allocs": self.allocs, "buffers": len(self._bufs) + sum(len(r[0]) for r in self._rings.values()),
+                "mb": round(self.nbytes/2**20, 2)}
+
+    def scope(self, prefix):
+        return _Scoped(self, prefix)
+
+class _Scoped:
+    # name-prefixed view of an arena, e.g. one per band worker
+    def __init__(self, arena, prefix):
+        self.arena, self.prefix = arena, prefix
+    def get(self, name, shape, dtype=np.float32):
+        return self.arena.get(self.prefix + name, shape, dtype)
+    def ring(self, name, shape, depth, dtype=np.uint8):
+        return self.arena.ring(self.prefix + name, shape, depth, dtype)
+
+class RegionArena:
+    # scratch for sub-rectangles of an h x w frame whose size changes from
+    # frame to frame (e.g. highlight regions): a buffer is a contiguous view
+    # onto the start of the arena buffer of the same name, which is sized to
+    # the smallest pyramid level of the frame that still fits it, so moving
+    # regions never allocate
+    def __init__(self, arena, h, w):
+        self.arena, self.h, self.w = arena, h, w
+    def get(self, name, shape, dtype=np.float32):
+        if self.arena is None: return np.empty(shape, dtype)
+        rh, rw = shape[:2]
+        H, W = self.h, self.w
+        while H > 1 and (H+1)//2 >= rh and (W+1)//2 >= rw:
+            H, W = (H+1)//2, (W+1)//2
+        buf = self.arena.get(name, (max(H, rh), max(W, rw)) + tuple(shape[2:]), dtype)
+        return buf.reshape(-1)[:int(np.prod(shape))].reshape(shape)
+
+def scratch(arena, name, shape, dtype=np.float32):
+    # arena buffer, or a fresh array when running without an arena
+    if arena is None: return np.empty(shape, dtype)
+    return arena.get(name, shape, dtype)
+
+def peak_rss_mb():
+    # peak resident set size of this process, None where unavailable
+    try:
+        import resource
+    except ImportError:
+        return None
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(kb/2**20 if sys.platform == "darwin" else kb/2**10, 1)  # macOS reports bytes
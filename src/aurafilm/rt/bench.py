@@ -0,0 +1,128 @@
+import json, time, platform, tracemalloc
+import numpy as np
+from numpy.random import default_rng
+from ..utils.params import ParamStore
+from . import nodes
+from .geometry import geometry_maps, geometry_f
+from .glow import glow_f, glow_plan
+from .analysis import analyze_f
+from .engine import RTProcessor
+from .render import params_for_preset
+from .sources import open_source, synthetic_frame
+
+# Headless benchmark: times every node in rt/nodes.py and the full
+# RTProcessor.process on synthetic frames, per resolution and preset.
+# Results (median/p95 ms, peak traced memory) go to a JSON baseline that a
+# later run can be compared against. With a source (video, image sequence,
+# .afraw, synthetic) the sweep also times decode + process end to end,
+# reading through a prefetch thread the way rendering does.
+
+RESOLUTIONS = [(640,480), (1280,720), (1920,1080), (3840,2160)]
+PRESETS = ["portra_00s", "kodachrome_60s", "expired_90s", "bw_trix"]
+
+def _refill(buf, x):
+    # to_uint8 clobbers its input, so time it on a fresh copy
+    np.copyto(buf, x)
+    return buf
+
+def node_cases(frame, p):
+    h, w = frame.shape[:2]
+    lut = nodes.lut_from_tone(p)
+    mask = nodes.vignette_mask(w, h, p.vignette_str, p.vignette_round)
+    x = nodes.to_float(frame)
+    buf = np.empty_like(x)
+    geo = geometry_maps(w, h, max(p.ca_pixels, 1.0), 0.05)
+    rng = default_rng(0)
+    plan = glow_plan(p)
+    dark = x*np.float32(0.5)  # no highlights: glow costs only the analysis
+    return {
+        "lut_from_tone":    lambda: nodes.lut_from_tone(p),
+        "apply_tone_lut":   lambda: nodes.apply_tone_lut(frame, lut),
+        "vignette_mask":    lambda: nodes.vignette_mask(w, h, p.vignette_str, p.vignette_round),
+        "apply_vignette":   lambda: nodes.apply_vignette(frame, mask),
+        "halation":         lambda: nodes.halation(frame, p),
+        "bloom":            lambda: nodes.bloom(frame, p.bloom_radius, p.bloom_str),
+        "chrom_aberration": lambda: nodes.chrom_aberration(frame, p.ca_pixels),
+        "grain":            lambda: nodes.grain(frame, p.grain_strength, p.grain_scale, rng),
+        "to_float":         lambda: nodes.to_float(frame, out=buf),
+        "to_uint8":         lambda: nodes.to_uint8(_refill(buf, x)),
+        "flicker_f":        lambda: nodes.flicker_f(x, nodes.flicker_gain(3, p.flicker), out=buf),
+        "weave_f":          lambda: nodes.weave_f(x, 1, -1, out=buf),
+        "geometry_f":       lambda: geometry_f(x, geo, 0.4, -0.7, mask, out=buf),
+        "analyze_f":        lambda: analyze_f(x),
+        "glow_f":           lambda: glow_f(x, p, plan=plan, out=buf),
+        "glow_f (dark)":    lambda: glow_f(dark, p, plan=plan, out=buf),
+    }
+
+def measure(fn, repeat, warmup=1):
+    # timed untraced (tracemalloc slows every allocation down), then one
+    # untimed call under tracemalloc for the peak
+    for _ in range(warmup): fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter_ns()
+        fn()
+        times.append((time.perf_counter_ns()-t0)/1e6)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"median_ms": round(float(np.median(times)), 4),
+            "p95_ms": round(float(np.percentile(times, 95)), 4),
+            "peak_mb": round(peak/2**20, 3), "n": repeat}
+
+def _looping(src):
+    # next frame, starting over at the end
+    def read():
+        ok, frame = src.read()
+        if not ok: frame = src.read_at(0)
+        return frame
+    return read
+
+def run(resolutions=RESOLUTIONS, presets=PRESETS, repeat=10, include_nodes=True, tiles=1, log=None, source=None):
+    results = {}
+    for (w, h) in resolutions:
+        frame = synthetic_frame(w, h)
+        # fewer repeats at 4K keeps the sweep bounded
+        n = max(3, repeat if w*h <= 1920*1080 else repeat//3)
+        for name in presets:
+            p = params_for_preset(name, width=w, height=h)
+            cases = node_cases(frame, p) if include_nodes else {}
+            proc = RTProcessor(ParamStore(p), tiles=tiles)
+            idx = iter(range(1 << 30))
+            cases["RTProcessor.process"] = lambda: proc.process(frame, frame_idx=next(idx))
+            src = None
+            if source:
+                src = open_source(source, size=(w, h), prefetch=4)
+                read = _looping(src)
+                cases["source+process"] = lambda: proc.process(read(), frame_idx=next(idx))
+            for case, fn in cases.items():
+                key = f"{w}x{h}/{name}/{case}"
+                results[key] = measure(fn, n)
+                if log: log(key, results[key])
+            if src is not None: src.close()
+    return {"meta": {"python": platform.python_version(), "numpy": np.__version__,
+                     "machine": platform.machine(), "processor": platform.processor(),
+                     "created": time.strftime("%Y-%m-%dT%H:%M:%S")},
+            "results": results}
+
+def compare(current, baseline, threshold=0.15, metric="median_ms"):
+    # -> list of (key, base, cur, ratio) where cur is slower than base by more than threshold
+    regressions = []
+    base = baseline.get("results", {})
+    for key, cur in current.get("results", {}).items():
+        b = base.get(key)
+        if not b or b.get(metric, 0) <= 0: continue
+        ratio = cur[metric]/b[metric]
+        if ratio > 1.0 + threshold:
+            regressions.append((key, b[metric], cur[metric], ratio))
+    return regressions
+
+def save(data, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+def load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,68 @@
+import threading
+from collections import OrderedDict
+
+# Thread-safe LRU for derived state (tone LUTs, vignette masks, glow plans).
+# Entries are keyed by (kind, key) where key is the tuple of parameter values
+# the artifact was built from, so a rebuild only happens when those inputs
+# change and switching back to earlier values is a hit. Values are shared
+# read-only between processors using the same cache. Each key is built once
+# even when several processors (e.g. server streams) miss it at the same
+# time: the first builds, the others wait for its result.
+
+# full-frame float masks and remap tables, for both backends: a few MB to
+# tens of MB each, so only a handful are kept. Preset warming is sized to
+# these (RTProcessor.warm_capacity) rather than to the preset library.
+DEFAULT_LIMITS = {"mask": 8, "geometry": 2, "torch.mask": 8, "torch.geometry": 2}
+
+class ArtifactCache:
+    def __init__(self, max_per_kind=16, limits=None):
+        self.max_per_kind = max_per_kind
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self._items = {}
+        self._building = {}  # (kind, key) -> Event set when its build is done (or failed)
+        self._lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+
+    def get(self, kind, key, build):
+        while True:
+            with self._lock:
+                od = self._items.setdefault(kind, OrderedDict())
+                if key in od:
+                    od.move_to_end(key)
+                    self.hits[kind] = self.hits.get(kind, 0) + 1
+                    return od[key]
+                pending = self._building.get((kind, key))
+                if pending is None:
+                    self.misses[kind] = self.misses.get(kind, 0) + 1
+                    done = self._building[(kind, key)] = threading.Event()
+                    break
+            pending.wait()  # someone else is building it
+        try:
+            value = build()  # outside the lock: other keys stay available
+            with self._lock:
+                od = self._items.setdefault(kind, OrderedDict())  # invalidate() may have dropped it
+                od[key] = value
+                limit = self.limits.get(kind, self.max_per_kind)
+                while len(od) > limit:
+                    od.popitem(last=False)
+            return value
+        finally:
+            with self._lock:
+                del self._building[(kind, key)]
+            done.set()
+
+    def peek(self, kind, key):
+        with self._lock:
+            return self._items.get(kind, {}).get(key)
+
+    def invalidate(self, kind=None):
+        with self._lock:
+            if kind is None: self._items.clear()
+            else: self._items.pop(kind, None)
+
+    def stats(self):
+        with self._lock:
+            kinds = set(self.hits) | set(self.misses)
+            return {k: {"hits": self.hits.get(k, 0), "misses": self.misses.get(k, 0),
+                        "entries": len(self._items.get(k, ()))} for k in sorted(kinds)}
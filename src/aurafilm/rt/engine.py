@@ -1,56 +1,288 @@
 import cv2, numpy as np
-from numpy.random import default_rng
-from .nodes import (lut_from_tone, apply_tone_lut, halation, bloom,
-                    chrom_aberration, vignette_mask, apply_vignette, grain)
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from .cache import ArtifactCache
+from .grain import GrainBank
+from .glow import glow_f, glow_plan, QUALITY_LEVELS
+from .analysis import analyze_f
+from .geometry import geometry_maps, geometry_f, needs_geometry
+from .lut3d import Lut3D, bake_lut3d, load_or_bake, needs_lut3d
+from .tiling import halo_rows, auto_tiles, band_layout
+from .profiling import Profiler
+from .arena import BufferArena, peak_rss_mb
+from .variants import proxy_params
+from .nodes import (lut_from_tone, apply_tone_lut, vignette_mask, to_float, to_uint8, dep_key,
+                    apply_grain_f, flicker_gain, flicker_f, weave_offset, apply_vignette_f)
+
+EPS = 1e-4
+BACKENDS = ("opencv", "torch")
+
+def make_processor(param_store, backend="opencv", **kw):
+    # "torch" imports torch lazily; its extra options (threads, batch) and
+    # RTProcessor's (tiles, governor) are passed through as keywords
+    if backend == "opencv":
+        return RTProcessor(param_store, **kw)
+    if backend == "torch":
+        try:
+            from .torch_engine import TorchProcessor
+        except ImportError as e:
+            raise RuntimeError(f"torch backend unavailable ({e}); install torch or use --backend opencv") from None
+        return TorchProcessor(param_store, **kw)
+    raise ValueError(f"unknown backend: {backend}")
+
+class Derived:
+    # derived state for one params version + frame size
+    __slots__ = ("lut", "lut3d", "mask", "plan", "geo")
+    def __init__(self, lut, lut3d, mask, plan, geo):
+        self.lut, self.lut3d, self.mask, self.plan, self.geo = lut, lut3d, mask, plan, geo
 
 class RTProcessor:
-    def __init__(self, param_store):
+    # tiles: 1 = whole frame, N = N horizontal bands on a thread pool,
+    # "auto" = pick the band count from the frame size and core count.
+    # cache: ArtifactCache to share derived state between processors.
+    # governor: optional QualityGovernor that trades quality for frame rate.
+    def __init__(self, param_store, tiles=1, cache=None, governor=None):
         self.params_store = param_store
-        self._lut = None
-        self._mask = None
-        self._last_size = (0,0)
-        self._rng_locked = default_rng(0)     # no "boiling" when locked
-        self._rng_live   = default_rng(12345) # dynamic grain
+        self.tiles = tiles
+        self.cache = cache if cache is not None else ArtifactCache()
+        self._derived = None
+        self._derived_for = None  # (params version, w, h)
+        self.grain = GrainBank()
         self._frame_idx = 0
+        self.last_params = None  # (version, Params) of the last processed frame
+        self.arena = BufferArena()  # working buffers, reused across frames
+        # outputs come from a ring of this many buffers; None hands out a fresh
+        # array per frame (callers that keep every output, e.g. offline render)
+        self.out_ring = None
+        self._size = None
+        self._pool = None
+        self._pool_size = 0
+        self.profiler = Profiler()
+        self.governor = governor
+        self._prof = self.profiler  # timer for the current frame
+        self._fused = None  # (key, gain field) for the governor's fused grain+vignette
+
+    def _build(self, name, fn):
+        prof = self.profiler
+        def build():
+            t = prof.start()
+            v = fn()
+            prof.stop(name, t)
+            return v
+        return build
+
+    def _artifacts(self, w, h, p):
+        c = self.cache
+        lut = c.get("lut", dep_key(lut_from_tone, p), self._build("build_lut", lambda: lut_from_tone(p)))
+        lut3d = None
+        if needs_lut3d(p):
+            lut3d = c.get("lut3d", dep_key(bake_lut3d, p), self._build("build_lut3d", lambda: Lut3D(load_or_bake(p))))
+        mask = c.get("mask", (w, h) + dep_key(vignette_mask, p),
+                     self._build("build_mask", lambda: vignette_mask(w, h, p.vignette_str, p.vignette_round)))
+        plan = c.get("glow_plan", dep_key(glow_plan, p), self._build("build_glow_plan", lambda: glow_plan(p)))
+        geo = None
+        if needs_geometry(p):
+            geo = c.get("geometry", (w, h) + dep_key(geometry_maps, p),
+                        self._build("build_geometry", lambda: geometry_maps(w, h, p.ca_pixels, p.distortion)))
+        if p.grain_strength > EPS:
+            self.grain.bank(w, h, p.grain_scale)  # warm the tile bank off the per-frame path
+        return Derived(lut, lut3d, mask, plan, geo)
+
+    def warm(self, p, w, h):
+        # build (or touch) the derived state for p at w x h without switching
+        # to it, e.g. for presets the user is likely to pick next
+        self._artifacts(w, h, p)
+
+    @property
+    def warm_capacity(self):
+        # how many presets' full-frame state (vignette masks, grain banks) the
+        # caches keep at once; warming more presets than this evicts the
+        # earlier ones again
+        c = self.cache
+        return max(1, min(c.limits.get("mask", c.max_per_kind), self.grain.max_banks))
 
-    def _ensure_cache(self, w,h,p):
-        if self._lut is None:
-            self._lut = lut_from_tone(p)
-        if self._mask is None or self._last_size!=(w,h):
-            self._mask = vignette_mask(w,h, p.vignette_str, p.vignette_round)
-            self._last_size=(w,h)
+    def _derive(self, w, h, p, version):
+        # rebuild only the artifacts whose declared inputs changed
+        if self._derived_for == (version, w, h):
+            return self._derived
+        self._derived = self._artifacts(w, h, p)
+        self._derived_for = (version, w, h)
+        if self._size != (w, h):
+            self.arena.clear()  # drop buffers of the previous resolution
+            self._size = (w, h)
+        return self._derived
 
     def params_changed(self, recalc_tone=True, recalc_vignette=True):
-        p = self.params_store.snapshot()
-        if recalc_tone:
-            self._lut = lut_from_tone(p)
-        if recalc_vignette:
-            self._mask = None  # recompute on next frame
-
-    def process(self, frame_bgr):
-        p = self.params_store.snapshot()
+        # kept for compatibility: derived state now tracks parameter changes
+        # automatically; this only forces a rebuild of the requested artifacts
+        if recalc_tone: self.cache.invalidate("lut")
+        if recalc_vignette: self.cache.invalidate("mask")
+        self._derived_for = None
+
+    def _run(self, src, p, d, frame_idx, arena, noise, mask, y0=0):
+        # node chain on a frame or band; returns the buffer holding the result
+        # uint8 -> float once, all nodes in place, quantize once on exit.
+        # Stages whose strength is zero are skipped entirely. All working
+        # memory comes from `arena`. mask is the vignette (or the governor's
+        # fused grain x vignette gain), None to skip. y0: first frame row of src.
+        prof = self._prof
+        h, w = src.shape[:2]
+        x = arena.get("x", (h,w,3))
+        t = prof.start()
+        if d.lut3d is not None:
+            d.lut3d.apply_f(src, out=x, arena=arena)  # tone + colour in one lookup
+        else:
+            to_float(apply_tone_lut(src, d.lut, out=arena.get("tone8", src.shape, np.uint8)), out=x)
+        prof.stop("tone", t)
+
+        if noise is not None:
+            t = prof.start()
+            apply_grain_f(x, p.grain_strength, noise, out=x, tmp=arena.get("grain_k", (h,w)))
+            prof.stop("grain", t)
+
+        if p.hal_str>EPS or p.bloom_str>EPS:
+            # luma + highlight tiles once; glow blurs only around highlights
+            t = prof.start()
+            stats = analyze_f(x, arena=arena)
+            prof.stop("analysis", t)
+            t = prof.start()
+            glow_f(x, p, out=x, plan=d.plan, arena=arena, stats=stats)
+            prof.stop("glow", t)
+
+        if p.flicker>EPS:
+            t = prof.start()
+            flicker_f(x, flicker_gain(frame_idx, p.flicker), out=x)
+            prof.stop("flicker", t)
+
+        if d.geo is not None:
+            # CA + distortion + weave + vignette in one gather
+            t = prof.start()
+            dx, dy = weave_offset(frame_idx, p.weave) if p.weave>EPS else (0.0, 0.0)
+            x = geometry_f(x, d.geo, dx, dy, mask, out=arena.get("tmp", (h,w,3)), arena=arena, y0=y0)
+            prof.stop("geometry", t)
+        elif mask is not None:
+            t = prof.start()
+            x = apply_vignette_f(x, mask, out=x)
+            prof.stop("vignette", t)
+        return x
+
+    def process_batch(self, frames, frame_idx=None):
+        # frame-at-a-time; same interface as TorchProcessor.process_batch
+        if frame_idx is None: frame_idx = self._frame_idx
+        return [self.process(f, frame_idx=frame_idx+i) for i, f in enumerate(frames)]
+
+    def tile_count(self, w, h, p):
+        if self.tiles == "auto":
+            return auto_tiles(w, h, halo_rows(p))
+        return max(1, int(self.tiles or 1))
+
+    def process(self, frame_bgr, frame_idx=None):
+        # frame_idx drives all temporal effects (grain, flicker, weave); pass it
+        # explicitly to render frames independently of processing order
+        if frame_idx is None:
+            frame_idx = self._frame_idx
+        self._frame_idx = frame_idx + 1
+        gov = self.governor
+        prof = self.profiler
+        if gov is not None and gov.enabled and not prof.enabled:
+            prof = gov.clock  # stage costs for the governor without full profiling
+        self._prof = prof
+        prof.frame = frame_idx
+        t_total = prof.start()
+        t_gov = perf_counter() if gov is not None else 0
+        version, p = self.params_store.versioned()
+        self.last_params = (version, p)
+        user_p = p
+        h,w = frame_bgr.shape[:2]
+        flags = {}
+        if gov is not None and gov.enabled:
+            p, flags = gov.apply(p), gov.flags
+            version = (version, gov.level)
+
+        scale = flags.get("scale", 1.0)
+        if scale < 1.0:
+            # reduced internal resolution, upscaled into the output
+            sw, sh = max(2, int(w*scale)) & ~1, max(2, int(h*scale)) & ~1
+            t = prof.start()
+            small = cv2.resize(frame_bgr, (sw, sh), dst=self.arena.get("gov.in", (sh,sw,3), np.uint8),
+                               interpolation=cv2.INTER_AREA)
+            prof.stop("downscale", t)
+            res = self._process_at(small, proxy_params(p, sw/w), version, frame_idx, flags,
+                                   self.arena.get("gov.out", (sh,sw,3), np.uint8))
+            t = prof.start()
+            out = cv2.resize(res, (w, h), dst=self._output(h, w), interpolation=cv2.INTER_LINEAR)
+            prof.stop("upscale", t)
+        else:
+            out = self._process_at(frame_bgr, p, version, frame_idx, flags, None)
+        prof.stop("total", t_total)
+        if gov is not None:
+            stages = None if prof is gov.clock else (lambda: {k: v["mean"] for k, v in self.profiler.summary().items()})
+            gov.observe((perf_counter()-t_gov)*1000.0, stages, user_p)
+        return out
+
+    def _process_at(self, frame_bgr, p, version, frame_idx, flags, out):
+        prof = self._prof
+        h,w = frame_bgr.shape[:2]
+        d = self._derive(w, h, p, version)
+        noise = None
+        if p.grain_strength>EPS:
+            t = prof.start()
+            noise = self.grain.noise(w, h, p.grain_scale, frame_idx, locked=p.lock_grain)
+            prof.stop("grain_noise", t)
+        mask = d.mask if p.vignette_str>EPS else None
+        if noise is not None and flags.get("fuse_grain") and p.lock_grain:
+            # locked grain is the same every frame: fold it into the vignette
+            # as one cached gain field (grain lands after glow, not before)
+            key = (version, w, h)
+            if self._fused is None or self._fused[0] != key:
+                g = 1.0 + p.grain_strength*noise
+                self._fused = (key, (g*mask if mask is not None else g).astype(np.float32))
+            noise, mask = None, self._fused[1]
+
+        tiles = self.tile_count(w, h, p)
+        if out is None: out = self._output(h, w)
+        if tiles > 1:
+            return self._process_bands(frame_bgr, p, d, frame_idx, noise, mask, tiles, out)
+        x = self._run(frame_bgr, p, d, frame_idx, self.arena, noise, mask)
+        t = prof.start()
+        to_uint8(x, out=out)
+        prof.stop("quantize", t)
+        return out
+
+    def stats(self):
+        # profiling snapshot: per-stage percentiles, cache counters
+        prof = self.profiler
+        for kind, s in self.cache.stats().items():
+            prof.gauge(f"{kind}.hits", s["hits"])
+            prof.gauge(f"{kind}.misses", s["misses"])
+        prof.gauge("grain_bank.hits", self.grain.hits)
+        prof.gauge("grain_bank.misses", self.grain.misses)
+        for k, v in self.arena.stats().items():
+            prof.gauge(f"arena.{k}", v)
+        rss = peak_rss_mb()
+        if rss is not None: prof.gauge("peak_rss_mb", rss)
+        if self.governor is not None:
+            prof.gauge("governor.level", f"{self.governor.level} {self.governor.name}")
+        return {"timers": prof.summary(), "counters": dict(prof.counters), "gauges": dict(prof.gauges)}
+
+    def _process_bands(self, frame_bgr, p, d, frame_idx, noise, mask, tiles, out):
         h,w = frame_bgr.shape[:2]
-        self._ensure_cache(w,h,p)
-
-        img = apply_tone_lut(frame_bgr, self._lut)
-        rng = self._rng_locked if p.lock_grain else self._rng_live
-        img = grain(img, p.grain_strength, p.grain_scale, rng)
-        img = halation(img, p)
-        img = bloom(img, p.bloom_radius, p.bloom_str)
-        img = chrom_aberration(img, p.ca_pixels)
-
-        # Flicker (multiplicative luma drift)
-        if p.flicker>1e-4:
-            k = 1.0 + p.flicker*(np.sin(self._frame_idx*0.21)*0.6 + np.sin(self._frame_idx*0.037)*0.4)
-            img = np.clip(img.astype(np.float32)*k, 0, 255).astype(np.uint8)
-
-        # Gate weave (tiny translation)
-        if p.weave>1e-4:
-            dx = int(np.sin(self._frame_idx*0.013)*p.weave)
-            dy = int(np.cos(self._frame_idx*0.017)*p.weave)
-            M = np.float32([[1,0,dx],[0,1,dy]])
-            img = cv2.warpAffine(img, M, (w,h), borderMode=cv2.BORDER_REFLECT)
-
-        img = apply_vignette(img, self._mask)
-        self._frame_idx += 1
-        return img
+        align = 2**QUALITY_LEVELS.get(p.quality, 0)
+        bands = band_layout(h, tiles, halo_rows(p), align)
+        if self._pool is None or self._pool_size < len(bands):
+            if self._pool is not None: self._pool.shutdown(wait=False)
+            self._pool = ThreadPoolExecutor(len(bands), thread_name_prefix="aurafilm-band")
+            self._pool_size = len(bands)
+
+        def band(i, y0, y1, a, b):
+            x = self._run(frame_bgr[a:b], p, d, frame_idx, self.arena.scope(f"band{i}."),
+                          None if noise is None else noise[a:b], None if mask is None else mask[a:b], y0=a)
+            to_uint8(x[y0-a:y1-a], out=out[y0:y1])
+
+        futures = [self._pool.submit(band, i, *bd) for i, bd in enumerate(bands)]
+        for f in futures: f.result()
+        return out
+
+    def _output(self, h, w):
+        if not self.out_ring: return np.empty((h,w,3), np.uint8)
+        return self.arena.ring("out", (h,w,3), self.out_ring)
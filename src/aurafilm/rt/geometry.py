@@ -0,0 +1,65 @@
+import cv2, numpy as np
+from .nodes import depends
+from .arena import scratch
+
+# One gather pass for everything that moves or shades pixels by position.
+# Radial, sub-pixel chromatic aberration and barrel/pincushion distortion
+# live in per-resolution remap tables, built once and cached; gate weave is
+# a per-frame sub-pixel offset added to those tables; the vignette is
+# multiplied in while each remapped channel is written back.
+#
+# CA is radial: R is magnified and B shrunk by ca_pixels at the left/right
+# frame edges, less towards the centre. distortion is k1 in
+# r' = r * (1 + k1 * r^2), with r normalised to 1 at the left/right edges.
+
+EPS = 1e-4
+
+def needs_geometry(p):
+    return p.ca_pixels > EPS or abs(p.distortion) > EPS or p.weave > EPS
+
+class GeometryMaps:
+    # per-channel (h, w, 2) float32 source coordinates, B, G, R
+    def __init__(self, w, h, ca_pixels, distortion):
+        self.size = (w, h)
+        cx, cy = (w-1)/2.0, (h-1)/2.0
+        R = w/2.0
+        xx = np.arange(w, dtype=np.float32) - np.float32(cx)
+        yy = np.arange(h, dtype=np.float32) - np.float32(cy)
+        if distortion:
+            k = 1.0 + np.float32(distortion)*((xx/R)**2 + ((yy/R)**2)[:,None])
+        else:
+            k = np.ones((h, w), np.float32)
+        self.maps = []
+        for s in (1.0 + ca_pixels/R, 1.0, 1.0 - ca_pixels/R):
+            m = np.empty((h, w, 2), np.float32)
+            np.multiply(k, np.float32(s)*xx, out=m[...,0]); m[...,0] += np.float32(cx)
+            np.multiply(k, np.float32(s)*yy[:,None], out=m[...,1]); m[...,1] += np.float32(cy)
+            self.maps.append(m)
+        # channels whose table is the identity can skip the gather when
+        # there is no offset either
+        self.identity = [not distortion and s == 1.0 for s in (1.0 + ca_pixels/R, 1.0, 1.0 - ca_pixels/R)]
+
+@depends("ca_pixels", "distortion")
+def geometry_maps(w, h, ca_pixels, distortion):
+    return GeometryMaps(w, h, ca_pixels, distortion)
+
+def geometry_f(x, geo, dx=0.0, dy=0.0, mask=None, out=None, arena=None, y0=0):
+    # x: float32 BGR frame or band starting at row y0 of the frame geo was
+    # built for; (dx, dy): weave offset in pixels; mask: vignette (or any
+    # per-pixel gain) for the rows of x. out must not alias x.
+    h, w = x.shape[:2]
+    if out is None: out = np.empty_like(x)
+    shift = np.float32([-dx, -dy - y0])
+    moved = bool(dx or dy or y0)
+    for c in range(3):
+        if geo.identity[c] and not dx and not dy:
+            g = x[...,c]
+        else:
+            src = cv2.extractChannel(x, c, dst=scratch(arena, "geo.src", (h, w)))
+            m = geo.maps[c][y0:y0+h]
+            if moved: m = np.add(m, shift, out=scratch(arena, "geo.map", (h, w, 2)))
+            g = cv2.remap(src, m, None, cv2.INTER_LINEAR, dst=scratch(arena, "geo.dst", (h, w)),
+                          borderMode=cv2.BORDER_REFLECT)
+        if mask is not None: np.multiply(g, mask, out=out[...,c])
+        else: out[...,c] = g
+    return out
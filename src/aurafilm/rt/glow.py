@@ -0,0 +1,132 @@
+import cv2, numpy as np
+from .nodes import depends
+from .arena import scratch, RegionArena
+from .analysis import analyze_f, highlight_rects, luma_f  # noqa: F401 (luma_f re-exported)
+
+# Halation + bloom on a shared luma/threshold pass. Each blur runs on the
+# coarsest pyramid level the quality setting allows while keeping the blur
+# sigma at that level >= MIN_LEVEL_SIGMA, then gets upsampled and composited.
+# Sparse: the glow sources are zero below the thresholds, so only the
+# highlight regions from the frame analysis (grown by each blur's reach) are
+# blurred, and a frame without highlights costs nothing but the analysis.
+QUALITY_LEVELS = {"full": 0, "half": 1, "quarter": 2}
+MIN_LEVEL_SIGMA = 1.5
+
+class Pyramid:
+    # lazily built pyrDown levels of one image; with an arena the levels
+    # live in buffers named <name>.L<i>
+    def __init__(self, img, arena=None, name="pyr"):
+        self.levels = [img]
+        self.arena, self.name = arena, name
+    def level(self, i):
+        while len(self.levels) <= i:
+            prev = self.levels[-1]
+            h, w = prev.shape[:2]
+            dst = scratch(self.arena, f"{self.name}.L{len(self.levels)}", ((h+1)//2, (w+1)//2) + prev.shape[2:])
+            self.levels.append(cv2.pyrDown(prev, dst=dst))
+        return self.levels[i]
+
+def pick_level(sigma, max_level):
+    L = 0
+    while L < max_level and sigma/(2**(L+1)) >= MIN_LEVEL_SIGMA:
+        L += 1
+    return L
+
+def level_sigma(sigma, L):
+    # remove the blur already contributed by pyrDown (var (4^L-1)/3) and the
+    # linear upsample (~f^2/6), expressed at level scale
+    if L == 0: return max(1e-6, sigma)
+    f = 2**L
+    var = sigma*sigma - (4**L-1)/3.0 - f*f/6.0
+    return max(0.5, np.sqrt(max(var, 0.0))/f)
+
+def gaussian_kernel(sigma):
+    # same kernel size rule cv2.GaussianBlur uses for float images
+    ksize = int(round(sigma*8+1)) | 1
+    return cv2.getGaussianKernel(ksize, sigma, cv2.CV_32F)
+
+@depends("hal_r", "hal_g", "hal_b", "bloom_radius", "quality")
+def glow_plan(p, quality=None):
+    # per blur: (pyramid level, separable kernel at that level)
+    max_level = QUALITY_LEVELS.get(quality or p.quality, 0)
+    def entry(sigma):
+        L = pick_level(sigma, max_level)
+        return L, gaussian_kernel(level_sigma(sigma, L))
+    return {"b": entry(p.hal_b), "g": entry(p.hal_g), "r": entry(p.hal_r), "bloom": entry(p.bloom_radius)}
+
+def plan_reach(plan, keys):
+    # pixels a blur spreads from its source: pyrDown taps and the linear
+    # upsample add about 3 level pixels to the kernel radius
+    return max((k.shape[0]//2 + 3) * 2**L for L, k in (plan[key] for key in keys))
+
+def plan_align(plan):
+    return 2**max(L for L, _ in plan.values())
+
+def _contig(a, arena, name):
+    # a region view as a contiguous array (a copy when it is strided): numpy
+    # buffers strided operands, and regions are blurred many ops at a time
+    if a.flags.c_contiguous: return a
+    c = arena.get(name, a.shape, a.dtype)
+    np.copyto(c, a)
+    return c
+
+def pyramid_blur(pyr, entry, size, channel=None, arena=None, name="blur"):
+    L, k = entry
+    src = pyr.level(L)
+    if channel is not None:
+        c = scratch(arena, name+".ch", src.shape[:2])
+        np.copyto(c, src[...,channel])
+        src = c
+    b =cv2.sepFilter2D(src, -1, k, k, dst=scratch(arena, name+".lvl", src.shape), borderType=cv2.BORDER_REFLECT_101)
+    if L == 0: return b
+    w, h = size
+    return cv2.resize(b, size, dst=scratch(arena, name, (h, w) + src.shape[2:]), interpolation=cv2.INTER_LINEAR)
+
+@depends("hal_thresh", "hal_r", "hal_g", "hal_b", "hal_str", "bloom_radius", "bloom_str", "quality")
+def glow_f(x, p, quality=None, bloom_thresh=0.85, out=None, plan=None, arena=None, stats=None):
+    # stats: FrameStats of x from analyze_f (computed here when not given)
+    if out is None: out = np.empty_like(x)
+    if plan is None: plan = glow_plan(p, quality)
+    h,w = x.shape[:2]
+    if stats is None: stats = analyze_f(x, arena=arena)
+    align = plan_align(plan)
+    hal = highlight_rects(stats, p.hal_thresh, plan_reach(plan, "bgr"), align) if p.hal_str > 1e-4 else []
+    bloom = highlight_rects(stats, bloom_thresh, plan_reach(plan, ("bloom",)), align) if p.bloom_str > 1e-4 else []
+    if out is not x: np.copyto(out, x)
+    if not hal and not bloom: return out
+    ra = RegionArena(arena, h, w)
+    luma = stats.luma
+
+    # bloom reads x before halation lands in out (out may be x); its glow is
+    # parked in a frame-sized buffer and added last
+    bglow = scratch(arena, "bloom_glow", x.shape) if bloom else None
+    for y0, y1, x0, x1 in bloom:
+        xr, rs = _contig(x[y0:y1, x0:x1], ra, "glow_x"), (x1-x0, y1-y0)
+        lr = _contig(luma[y0:y1, x0:x1], ra, "glow_luma")
+        bmask = np.greater(lr, bloom_thresh, out=ra.get("bloom_mask", lr.shape, np.bool_))
+        src = np.multiply(xr, bmask[...,None], out=ra.get("bloom_src", xr.shape))
+        g = pyramid_blur(Pyramid(src, ra, "bloom_pyr"), plan["bloom"], rs, arena=ra, name="bloom")
+        g *= p.bloom_str
+        np.copyto(bglow[y0:y1, x0:x1], g)
+    for y0, y1, x0, x1 in hal:
+        xr, rs = _contig(x[y0:y1, x0:x1], ra, "glow_x"), (x1-x0, y1-y0)
+        outr = out[y0:y1, x0:x1]
+        dst = outr if outr.flags.c_contiguous else ra.get("glow_out", xr.shape)
+        m = np.subtract(_contig(luma[y0:y1, x0:x1], ra, "glow_luma"), p.hal_thresh,
+                        out=ra.get("hal_mask", (y1-y0, x1-x0)))
+        m /= 1-p.hal_thresh+1e-6
+        np.clip(m, 0, 1, out=m)
+        pyr = Pyramid(np.multiply(xr, m[...,None], out=ra.get("hal_src", xr.shape)), ra, "hal_pyr")
+        for c, ch in ((0,"b"),(1,"g"),(2,"r")):
+            g = pyramid_blur(pyr, plan[ch], rs, channel=c, arena=ra, name="hal")
+            g *= p.hal_str
+            np.add(xr[...,c], g, out=dst[...,c])
+        np.clip(dst, 0, 1, out=dst)
+        if dst is not outr: np.copyto(outr, dst)
+    for y0, y1, x0, x1 in bloom:
+        outr = out[y0:y1, x0:x1]
+        o = _contig(outr, ra, "glow_out")
+        o += bglow[y0:y1, x0:x1]
+        np.clip(o, 0, 1, out=o)
+        if o is not outr: np.copyto(outr, o)
+    return out
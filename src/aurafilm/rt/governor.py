@@ -0,0 +1,159 @@
+from dataclasses import replace
+from time import perf_counter_ns
+
+# Holds a target frame rate by degrading quality in a fixed order and
+# restoring it when there is headroom again. Levels are cumulative: each one
+# keeps every degradation before it.
+#
+#   (name, stage it relieves, Params overrides, engine flags)
+#
+# Stage-aware: a step is skipped when its stage currently costs less than
+# MIN_SHARE of the frame (inactive or already cheap), so the governor goes
+# straight to a step that helps. Hysteresis: degrade after `patience`
+# frames over budget, restore after `restore_patience` frames under
+# restore_ratio * budget; a level that had to be left again soon after being
+# restored doubles its restore patience (up to MAX_BACKOFF). Every change
+# resets the frame-time average.
+LEVELS = (
+    ("full",         None,    {},                          {}),
+    ("glow_half",    "glow",  {"quality": "half"},         {}),
+    ("glow_quarter", "glow",  {"quality": "quarter"},      {}),
+    ("grain_reuse",  "grain", {"lock_grain": True},        {"fuse_grain": True}),
+    ("optics_off",   "geometry", {"ca_pixels": 0.0, "weave": 0.0, "distortion": 0.0}, {}),
+    ("scale_75",     None,    {},                          {"scale": 0.75}),
+    ("scale_50",     None,    {},                          {"scale": 0.5}),
+)
+QUALITY_ORDER = ("full", "half", "quarter")
+MIN_SHARE = 0.05
+MAX_BACKOFF = 16
+
+class StageClock:
+    # Profiler stand-in used while profiling is off: per-stage EWMA (ms),
+    # no history and no trace events
+    enabled = True
+    def __init__(self, alpha=0.1):
+        self.alpha = alpha
+        self.ms = {}
+        self.frame = 0
+    def start(self):
+        return perf_counter_ns()
+    def stop(self, name, t0):
+        ms = (perf_counter_ns()-t0)/1e6
+        old = self.ms.get(name)
+        self.ms[name] = ms if old is None else old + self.alpha*(ms-old)
+    def count(self, name, n=1): pass
+    def gauge(self, name, value): pass
+
+class QualityGovernor:
+    def __init__(self, target_fps=30.0, patience=8, restore_patience=60, restore_ratio=0.7, alpha=0.2):
+        self.target_fps = float(target_fps)
+        self.patience = patience
+        self.restore_patience = restore_patience
+        self.restore_ratio = restore_ratio
+        self.alpha = alpha
+        self.enabled = True
+        self.clock = StageClock()
+        self.level = 0
+        self._stack = []        # levels we degraded from, for restoring
+        self._backoff = {}      # level -> restore patience multiplier
+        self._restored_at = None
+        self._frames = 0        # frames observed at the current level
+        self._avg = None
+        self._over = 0
+        self._under = 0
+        self.changes = 0
+
+    @property
+    def budget_ms(self):
+        return 1000.0/self.target_fps
+
+    @property
+    def name(self):
+        return LEVELS[self.level][0]
+
+    @property
+    def flags(self):
+        f = {}
+        for _, _, _, fl in LEVELS[:self.level+1]: f.update(fl)
+        return f
+
+    def apply(self, p):
+        return self._params_at(p, self.level)
+
+    def _params_at(self, p, level):
+        # Params with every override up to `level`; never raises quality
+        # above what the user picked
+        kw = {}
+        for _, _, over, _ in LEVELS[1:level+1]:
+            kw.update(over)
+        if "quality" in kw and QUALITY_ORDER.index(kw["quality"]) <= QUALITY_ORDER.index(p.quality):
+            del kw["quality"]
+        kw = {k: v for k, v in kw.items() if getattr(p, k) != v}
+        return replace(p, **kw) if kw else p
+
+    def _skip(self, level, p, stages, total):
+        # a step that changes nothing for p, or relieves a stage that is
+        # (nearly) free, would only cost another `patience` frames
+        if p is not None and not LEVELS[level][3] and self._params_at(p, level) == self._params_at(p, level-1):
+            return True
+        return self._share(LEVELS[level][1], stages, total) < MIN_SHARE
+
+    def set_target(self, fps):
+        self.target_fps = float(fps)
+        self._backoff.clear()
+        self._reset()
+
+    def reset(self):
+        self.level = 0
+        self._stack.clear()
+        self._backoff.clear()
+        self._reset()
+
+    def _reset(self):
+        self._avg = None
+        self._over = self._under = self._frames = 0
+
+    def _share(self, stage, stages, total):
+        if stage is None: return 1.0
+        return stages.get(stage, 0.0)/max(total, 1e-6)
+
+    def observe(self, frame_ms, stages=None, p=None):
+        # call once per frame with the processing time; stages ({stage: ms},
+        # or a callable returning it) defaults to the governor's own clock;
+        # p (the user's Params) lets it skip steps that change nothing.
+        # Returns True when the level changed.
+        if not self.enabled: return False
+        self._frames += 1
+        self._avg = frame_ms if self._avg is None else self._avg + self.alpha*(frame_ms-self._avg)
+        budget = self.budget_ms
+        if self._avg > budget:
+            self._over += 1; self._under = 0
+        elif self._avg < budget*self.restore_ratio:
+            self._under += 1; self._over = 0
+        else:
+            self._over = self._under = 0
+        if self._over >= self.patience and self.level < len(LEVELS)-1:
+            if self._restored_at == self.level and self._frames < 4*self.restore_patience:
+                self._backoff[self.level] = min(MAX_BACKOFF, 2*self._backoff.get(self.level, 1))
+            self._restored_at = None
+            nxt = self.level + 1
+            stages = stages() if callable(stages) else (stages or self.clock.ms)
+            while nxt < len(LEVELS)-1 and self._skip(nxt, p, stages, self._avg):
+                nxt += 1
+            self._stack.append(self.level)
+            return self._set(nxt)
+        if self._stack and self._under >= self.restore_patience*self._backoff.get(self._stack[-1], 1):
+            prev = self._stack.pop()
+            self._restored_at = prev
+            return self._set(prev)
+        return False
+
+    def _set(self, level):
+        self.level = level
+        self.changes += 1
+        self._reset()
+        return True
+
+    def stats(self):
+        return {"level": self.level, "name": self.name, "target_fps": self.target_fps,
+                "avg_ms": round(self._avg or 0.0, 3), "budget_ms": round(self.budget_ms, 3), "changes": self.changes}
@@ -0,0 +1,69 @@
+import numpy as np
+from collections import OrderedDict
+from threading import Lock, Event
+from .nodes import grain_noise
+
+# Pre-blurred noise tiles per (resolution, grain_scale), kept in an LRU.
+# Tiles are `pad` px larger than the frame so live mode can pick a tile,
+# offset and flip per frame; locked mode always reuses the same tile.
+# Randomness comes from a counter-based RNG (Philox) keyed by frame index,
+# so any frame's grain can be regenerated in any order.
+# Thread-safe: a bank is built once per key even when several processors
+# (e.g. server streams) ask for it at the same time; the others wait for it.
+class GrainBank:
+    def __init__(self, tiles=4, pad=32, seed=0, max_banks=4):
+        self.tiles = tiles
+        self.pad = pad
+        self.seed = seed
+        self.max_banks = max_banks
+        self._banks = OrderedDict()
+        self._building = {}  # key -> Event set when its bank is in (or failed)
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _rng(self, idx, stream):
+        return np.random.Generator(np.random.Philox(key=self.seed, counter=[idx, stream, 0, 0]))
+
+    def bank(self, w, h, scale):
+        key = (w, h, round(float(scale), 4))
+        while True:
+            with self._lock:
+                tiles = self._banks.get(key)
+                if tiles is not None:
+                    self._banks.move_to_end(key)
+                    self.hits += 1
+                    return tiles
+                pending = self._building.get(key)
+                if pending is None:
+                    self.misses += 1
+                    done = self._building[key] = Event()
+                    break
+            pending.wait()  # someone else is building it
+        try:
+            th, tw = h+self.pad, w+self.pad
+            tiles = [grain_noise(th, tw, scale, self._rng(i, 1)) for i in range(self.tiles)]
+            with self._lock:
+                self._banks[key] = tiles
+                while len(self._banks) > self.max_banks:
+                    self._banks.popitem(last=False)
+            return tiles
+        finally:
+            with self._lock:
+                del self._building[key]
+            done.set()
+
+    def noise(self, w, h, scale, frame_idx, locked=False):
+        tiles = self.bank(w, h, scale)
+        if locked:
+            return tiles[0][:h,:w]
+        rng = self._rng(frame_idx, 0)
+        i = int(rng.integers(len(tiles)))
+        ox, oy = (int(v) for v in rng.integers(self.pad+1, size=2))
+        n = tiles[i][oy:oy+h, ox:ox+w]
+        fy, fx = rng.integers(2, size=2)
+        return n[::-1 if fy else 1, ::-1 if fx else 1]
+
+    def clear(self):
+        with self._lock:
+            self._banks.clear()
@@ -0,0 +1,141 @@
+import os, json, hashlib
+import cv2, numpy as np
+from .nodes import depends, dep_key, tone_curve, TONE_FIELDS
+from .arena import scratch
+
+# Bakes the per-pixel, spatially invariant part of a look (white balance,
+# tone curve with lift/gamma/gain, monochrome mix, optional external .cube)
+# into one 3D LUT, applied per frame with a single trilinear lookup.
+#
+# Layout: lut[b, g, r] -> (B, G, R) float32 in [0,1], matching OpenCV's BGR
+# frames. For the lookup the cube is unrolled into a 2D image of S rows (g)
+# by S*S columns (b slices of r), so each b slice is one bilinear cv2.remap
+# and trilinear = two remaps + a lerp along b.
+
+LUT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".aurafilm", "luts")
+BAKE_VERSION = 1
+COLOR_FIELDS = ("balance_r", "balance_g", "balance_b", "mono", "mono_r", "mono_g", "mono_b", "look_cube")
+
+def needs_lut3d(p):
+    # the plain 1D tone LUT covers everything unless colour work is active
+    return (p.balance_r, p.balance_g, p.balance_b) != (1.0, 1.0, 1.0) or p.mono > 1e-4 or bool(p.look_cube)
+
+def identity_lut(size):
+    v = np.linspace(0, 1, size, dtype=np.float32)
+    b, g, r = np.meshgrid(v, v, v, indexing="ij")
+    return np.stack([b, g, r], axis=-1)
+
+@depends(*TONE_FIELDS, *COLOR_FIELDS, "lut3d_size")
+def bake_lut3d(p, size=None):
+    size = size or p.lut3d_size
+    c = identity_lut(size)
+    c *= np.float32([p.balance_b, p.balance_g, p.balance_r])
+    np.clip(c, 0, 1, out=c)
+    c = tone_curve(p, c).astype(np.float32)
+    if p.mono > 1e-4:
+        wsum = max(1e-6, p.mono_r + p.mono_g + p.mono_b)
+        y = (c[...,0]*p.mono_b + c[...,1]*p.mono_g + c[...,2]*p.mono_r)/wsum
+        c += p.mono*(y[...,None] - c)
+    if p.look_cube:
+        c = sample_lut3d(read_cube(p.look_cube), c)
+    return np.clip(c, 0, 1).astype(np.float32)
+
+def sample_lut3d(lut, pts):
+    # trilinear lookup of float BGR points (any shape [..., 3]) into lut
+    S = lut.shape[0]
+    f = np.clip(pts, 0, 1)*(S-1)
+    i0 = np.minimum(f.astype(np.int32), S-2)
+    t = (f - i0).astype(np.float32)
+    ib, ig, ir = i0[...,0], i0[...,1], i0[...,2]
+    tb, tg, tr = t[...,0,None], t[...,1,None], t[...,2,None]
+    def at(db, dg, dr): return lut[ib+db, ig+dg, ir+dr]
+    c00 = at(0,0,0) + tr*(at(0,0,1)-at(0,0,0)); c01 = at(0,1,0) + tr*(at(0,1,1)-at(0,1,0))
+    c10 = at(1,0,0) + tr*(at(1,0,1)-at(1,0,0)); c11 = at(1,1,0) + tr*(at(1,1,1)-at(1,1,0))
+    c0 = c00 + tg*(c01-c00); c1 = c10 + tg*(c11-c10)
+    return c0 + tb*(c1-c0)
+
+class Lut3D:
+    # baked cube plus the precomputed tables for the per-frame lookup
+    def __init__(self, lut):
+        S = lut.shape[0]
+        self.lut = lut
+        self.size = S
+        self.image = np.ascontiguousarray(lut.transpose(1, 0, 2, 3).reshape(S, S*S, 3))
+        pos = np.arange(256, dtype=np.float32)*(S-1)/255.0
+        i0 = np.minimum(np.floor(pos), S-2)
+        self.pos = pos.reshape(256, 1)                                # r / g coordinate
+        self.slice_x = (i0*S).astype(np.float32).reshape(256, 1)      # b slice origin
+        self.frac = (pos - i0).astype(np.float32).reshape(256, 1)     # b interpolation weight
+        self.frac_inv = (1.0 - self.frac).astype(np.float32)
+
+    def apply_f(self, img_bgr, out=None, arena=None):
+        if out is None: out = np.empty(img_bgr.shape, np.float32)
+        hw = img_bgr.shape[:2]
+        b, g, r = (cv2.extractChannel(img_bgr, i, dst=scratch(arena, f"lut3d.c{i}", hw, np.uint8)) for i in range(3))
+        mx = cv2.LUT(b, self.slice_x, dst=scratch(arena, "lut3d.mx", hw))
+        mx += cv2.LUT(r, self.pos, dst=scratch(arena, "lut3d.t", hw))
+        my = cv2.LUT(g, self.pos, dst=scratch(arena, "lut3d.my", hw))
+        lo = cv2.remap(self.image, mx, my, cv2.INTER_LINEAR, dst=scratch(arena, "lut3d.lo", img_bgr.shape),
+                       borderMode=cv2.BORDER_REPLICATE)
+        mx += np.float32(self.size)
+        hi = cv2.remap(self.image, mx, my, cv2.INTER_LINEAR, dst=scratch(arena, "lut3d.hi", img_bgr.shape),
+                       borderMode=cv2.BORDER_REPLICATE)
+        # per-pixel lerp along b
+        return cv2.blendLinear(lo, hi, cv2.LUT(b, self.frac_inv, dst=scratch(arena, "lut3d.t", hw)),
+                               cv2.LUT(b, self.frac, dst=scratch(arena, "lut3d.my", hw)), dst=out)
+
+# ---------- disk cache ----------
+def lut_hash(p, size=None):
+    key = {"v": BAKE_VERSION, "size": size or p.lut3d_size,
+           "fields": dict(zip(bake_lut3d.depends, map(repr, dep_key(bake_lut3d, p))))}
+    if p.look_cube and os.path.exists(p.look_cube):
+        st = os.stat(p.look_cube)
+        key["look"] = [st.st_mtime_ns, st.st_size]
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+def load_or_bake(p, size=None, cache_dir=None):
+    cache_dir = cache_dir or LUT_CACHE_DIR
+    path = os.path.join(cache_dir, lut_hash(p, size) + ".npy")
+    try:
+        return np.load(path)
+    except (OSError, ValueError):
+        pass
+    lut = bake_lut3d(p, size)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = path + f".{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, lut)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # cache is best effort
+    return lut
+
+# ---------- .cube I/O (Adobe/Resolve format: R varies fastest) ----------
+def write_cube(path, lut, title="aurafilm"):
+    S = lut.shape[0]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'TITLE "{title}"\nLUT_3D_SIZE {S}\nDOMAIN_MIN 0 0 0\nDOMAIN_MAX 1 1 1\n')
+        rgb = lut[..., ::-1].reshape(-1, 3)  # [b][g][r] order == R fastest
+        np.savetxt(f, rgb, fmt="%.6f")
+
+def read_cube(path):
+    size, lo, hi, rows = None, np.zeros(3, np.float32), np.ones(3, np.float32), []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"): continue
+            head = line.split()[0].upper()
+            if head == "LUT_3D_SIZE": size = int(line.split()[1])
+            elif head == "DOMAIN_MIN": lo = np.asarray(line.split()[1:4], np.float32)
+            elif head == "DOMAIN_MAX": hi = np.asarray(line.split()[1:4], np.float32)
+            elif head == "LUT_1D_SIZE": raise ValueError(f"{path}: 1D .cube files are not supported")
+            elif head in ("TITLE", "LUT_1D_INPUT_RANGE", "LUT_3D_INPUT_RANGE"): continue
+            else:
+                rows.append(line.split()[:3])
+    if size is None or len(rows) != size**3:
+        raise ValueError(f"{path}: malformed .cube (size={size}, {len(rows)} entries)")
+    if lo.any() or (hi != 1).any():
+        raise ValueError(f"{path}: only DOMAIN 0..1 .cube files are supported")
+    rgb = np.asarray(rows, np.float32)
+    return np.ascontiguousarray(rgb.reshape(size, size, size, 3)[..., ::-1])
@@ -1,17 +1,56 @@
 import cv2, numpy as np
+from .arena import scratch
 
-def lut_from_tone(p):
-    x = np.linspace(0,1,256, dtype=np.float32)
+# Float path: every *_f node works on a float32 BGR buffer in [0,1] and can
+# write into `out` (which may be the input buffer itself). The frame is
+# converted once with to_float() and quantized once with to_uint8().
+# The plain uint8 functions below are kept as a compatibility API.
+
+def depends(*fields):
+    # declares the Params fields a node or derived artifact reads; the
+    # processor keys its caches and stage skipping on these
+    def deco(fn):
+        fn.depends = fields
+        return fn
+    return deco
+
+def dep_key(fn, p):
+    return tuple(getattr(p, f) for f in fn.depends)
+
+def to_float(img, out=None):
+    if out is None: out = np.empty(img.shape, np.float32)
+    np.divide(img, np.float32(255.0), out=out)
+    return out
+
+def to_uint8(x, out=None):
+    # NOTE: uses x as scratch for the clip/scale
+    if out is None: out = np.empty(x.shape, np.uint8)
+    np.clip(x, 0, 1, out=x)
+    np.multiply(x, 255, out=x)
+    np.copyto(out, x, casting="unsafe")
+    return out
+
+TONE_FIELDS = ("toe", "shoulder", "contrast", "lift", "gamma", "gain")
+
+@depends(*TONE_FIELDS)
+def tone_curve(p, x):
+    # filmic S-curve with toe/shoulder normalisation, then lift/gamma/gain
     y = 1.0/(1.0+np.exp(-(p.contrast*(x-0.5))))
     amin = 1.0/(1.0+np.exp(-(p.contrast*(p.toe-0.5))))
     amax = 1.0/(1.0+np.exp(-(p.contrast*(p.shoulder-0.5))))
     y = (y-amin)/max(1e-6,(amax-amin))
-    y = np.clip(((y+p.lift)**(1.0/max(1e-6,p.gamma)))*p.gain, 0, 1)
-    return (y*255).astype(np.uint8)
+    # values below the toe go negative; clamp before the gamma power
+    return np.clip((np.maximum(y+p.lift, 0)**(1.0/max(1e-6,p.gamma)))*p.gain, 0, 1)
+
+@depends(*TONE_FIELDS)
+def lut_from_tone(p):
+    x = np.linspace(0,1,256, dtype=np.float32)
+    return (tone_curve(p, x)*255).astype(np.uint8)
 
-def apply_tone_lut(img_bgr, lut):
-    return cv2.LUT(img_bgr, lut)
+def apply_tone_lut(img_bgr, lut, out=None):
+    return cv2.LUT(img_bgr, lut, dst=out)
 
+@depends("vignette_str", "vignette_round")
 def vignette_mask(w,h, strength, roundness):
     yy,xx=np.mgrid[0:h,0:w]
     cx,cy=w/2,h/2
@@ -19,43 +58,102 @@ def vignette_mask(w,h, strength, roundness):
     r = np.sqrt(((xx-cx)/max(1e-6,rx))**2 + ((yy-cy)/max(1e-6,ry))**2)
     return np.clip(1.0 - strength*(r**1.2), 0.0, 1.0).astype(np.float32)
 
-def apply_vignette(img, mask):
-    f = img.astype(np.float32)/255.0
-    return (np.clip(f*mask[...,None],0,1)*255).astype(np.uint8)
+# ---------- float nodes ----------
+@depends("vignette_str")
+def apply_vignette_f(x, mask, out=None):
+    return np.multiply(x, mask[...,None], out=out)
 
-def halation(img, p):
-    x = img.astype(np.float32)/255.0
+@depends("hal_thresh", "hal_r", "hal_g", "hal_b", "hal_str")
+def halation_f(x, p, out=None):
+    if out is None: out = np.empty_like(x)
     luma = 0.2126*x[...,2] + 0.7152*x[...,1] + 0.0722*x[...,0]
     m = np.clip((luma-p.hal_thresh)/(1-p.hal_thresh+1e-6),0,1)
-    def glow(ch, rad):
-        return cv2.GaussianBlur(m*ch,(0,0), max(1e-6,rad))
-    b = glow(x[...,0], p.hal_b); g = glow(x[...,1], p.hal_g); r = glow(x[...,2], p.hal_r)
-    out = x.copy()
-    out[...,0] = np.clip(out[...,0] + p.hal_str*b, 0, 1)
-    out[...,1] = np.clip(out[...,1] + p.hal_str*g, 0, 1)
-    out[...,2] = np.clip(out[...,2] + p.hal_str*r, 0, 1)
-    return (out*255).astype(np.uint8)
+    # each channel's glow only reads its own channel, so out may alias x
+    for c, rad in ((0,p.hal_b),(1,p.hal_g),(2,p.hal_r)):
+        glow = cv2.GaussianBlur(m*x[...,c],(0,0), max(1e-6,rad))
+        np.add(x[...,c], p.hal_str*glow, out=out[...,c])
+    return np.clip(out, 0, 1, out=out)
 
-def bloom(img, radius, strength, thresh=0.85):
-    x = img.astype(np.float32)/255.0
+@depends("bloom_radius", "bloom_str")
+def bloom_f(x, radius, strength, thresh=0.85, out=None):
     luma = 0.2126*x[...,2] + 0.7152*x[...,1] + 0.0722*x[...,0]
     mask = (luma>thresh).astype(np.float32)
     glow = cv2.GaussianBlur(x*mask[...,None], (0,0), max(1e-6,radius))
-    return (np.clip(x + strength*glow, 0, 1)*255).astype(np.uint8)
+    glow *= strength
+    out = np.add(x, glow, out=out)
+    return np.clip(out, 0, 1, out=out)
 
-def chrom_aberration(img, pixels):
-    h,w=img.shape[:2]; shift=int(max(1, round(pixels)))
-    b,g,r = cv2.split(img)
-    r2 = cv2.warpAffine(r, np.float32([[1,0, shift],[0,1,0]]),(w,h), borderMode=cv2.BORDER_REFLECT)
-    b2 = cv2.warpAffine(b, np.float32([[1,0,-shift],[0,1,0]]),(w,h), borderMode=cv2.BORDER_REFLECT)
-    return cv2.merge([b2,g,r2])
+@depends("ca_pixels")
+def chrom_aberration_f(x, pixels, out=None, arena=None):
+    # shifts R right and B left; out may alias x
+    h,w=x.shape[:2]; shift=int(max(1, round(pixels)))
+    if out is None: out = np.empty_like(x)
+    if out is not x: np.copyto(out[...,1], x[...,1])
+    src = scratch(arena, "ca_src", (h,w), x.dtype)
+    dst = scratch(arena, "ca_dst", (h,w), x.dtype)
+    for c, dx in ((2, shift), (0, -shift)):
+        np.copyto(src, x[...,c])
+        cv2.warpAffine(src, np.float32([[1,0,dx],[0,1,0]]), (w,h), dst=dst, borderMode=cv2.BORDER_REFLECT)
+        out[...,c] = dst
+    return out
 
-def grain(img, strength, scale, rng):
-    x = img.astype(np.float32)/255.0
-    h,w=x.shape[:2]
+@depends("grain_scale")
+def grain_noise(h, w, scale, rng):
     noise = rng.normal(0,1,(h,w)).astype(np.float32)
     if scale>1:
         small = cv2.resize(noise, (max(1, int(w/scale)), max(1,int(h/scale))), interpolation=cv2.INTER_AREA)
         noise = cv2.resize(small, (w,h), interpolation=cv2.INTER_LINEAR)
-    noise = cv2.GaussianBlur(noise,(0,0),0.6)
-    return (np.clip(x*(1.0 + strength*noise[...,None]),0,1)*255).astype(np.uint8)
+    return cv2.GaussianBlur(noise,(0,0),0.6)
+
+@depends("grain_strength")
+def apply_grain_f(x, strength, noise, out=None, tmp=None):
+    # tmp: optional 2D float32 scratch for the gain field
+    k = np.multiply(noise, strength, out=tmp)
+    k += 1.0
+    out = np.multiply(x, k[...,None], out=out)
+    return np.clip(out, 0, 1, out=out)
+
+def grain_f(x, strength, scale, rng, out=None):
+    h,w=x.shape[:2]
+    return apply_grain_f(x, strength, grain_noise(h, w, scale, rng), out=out)
+
+def flicker_gain(frame_idx, amount):
+    # multiplicative luma drift
+    return 1.0 + amount*(np.sin(frame_idx*0.21)*0.6 + np.sin(frame_idx*0.037)*0.4)
+
+@depends("flicker")
+def flicker_f(x, k, out=None):
+    out = np.multiply(x, np.float32(k), out=out)
+    return np.clip(out, 0, 1, out=out)
+
+def weave_offset(frame_idx, amount):
+    # gate weave: tiny sub-pixel translation
+    dx = float(np.sin(frame_idx*0.013)*amount)
+    dy = float(np.cos(frame_idx*0.017)*amount)
+    return dx, dy
+
+@depends("weave")
+def weave_f(x, dx, dy, out=None):
+    # out must not alias x
+    h,w=x.shape[:2]
+    M = np.float32([[1,0,dx],[0,1,dy]])
+    return cv2.warpAffine(x, M, (w,h), dst=out, borderMode=cv2.BORDER_REFLECT)
+
+# ---------- uint8 compatibility API ----------
+def apply_vignette(img, mask):
+    return to_uint8(apply_vignette_f(to_float(img), mask))
+
+def halation(img, p):
+    x = to_float(img)
+    return to_uint8(halation_f(x, p, out=x))
+
+def bloom(img, radius, strength, thresh=0.85):
+    x = to_float(img)
+    return to_uint8(bloom_f(x, radius, strength, thresh, out=x))
+
+def chrom_aberration(img, pixels):
+    return chrom_aberration_f(img, pixels)
+
+def grain(img, strength, scale, rng):
+    x = to_float(img)
+    return to_uint8(grain_f(x, strength, scale, rng, out=x))
@@ -0,0 +1,322 @@
+import sys, threading, time, traceback
+from collections import deque
+
+# Staged capture -> process -> present/record pipeline. Capture and
+# processing each run on their own thread (OpenCV releases the GIL), the
+# UI thread polls the preview queue, and an optional record stage drains a
+# lossless queue into a sink. An optional raw sink sees every captured
+# frame on the capture thread, before any processing (it must be cheap,
+# e.g. a memcpy into a RawRing).
+#
+# Processed frames may live in the processor's output ring, which only
+# outlives the preview queue: consumers that keep a frame (the UI across
+# repaints, a photo) copy it. The record stage copies every frame into its
+# own FramePool, so a deep record queue never pins or resizes that ring.
+#
+# If a stage raises (source, node, recorder sink), the runner stops every
+# stage, keeps the reason in .error, prints the traceback to stderr and
+# calls on_error(message) from the failing thread.
+
+class RingQueue:
+    # Bounded FIFO. policy "latest": put never blocks and evicts the oldest
+    # item when full (latest frame wins). policy "block": put waits for space
+    # so nothing is lost (recording). on_drop(item) sees every item that is
+    # evicted or not accepted (e.g. to give its buffer back to a pool).
+    def __init__(self, maxsize=2, policy="latest", on_drop=None):
+        if policy not in ("latest", "block"):
+            raise ValueError(f"unknown queue policy: {policy}")
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self.on_drop = on_drop
+        self._q = deque()
+        self._cv = threading.Condition()
+        self._closed = False
+        self.put_count = 0
+        self.dropped = 0
+        self.blocked_s = 0.0  # total time producers spent waiting (block policy)
+
+    def put(self, item, timeout=None):
+        evicted = None
+        with self._cv:
+            if self._closed:
+                evicted, ok = item, False
+            elif len(self._q) >= self.maxsize and self.policy == "latest":
+                evicted, ok = self._q.popleft(), True
+                self.dropped += 1
+            elif len(self._q) >= self.maxsize:
+                t0 = time.perf_counter()
+                ok = self._cv.wait_for(lambda: self._closed or len(self._q) < self.maxsize, timeout)
+                self.blocked_s += time.perf_counter() - t0
+                if not ok or self._closed:
+                    self.dropped += 1
+                    evicted, ok = item, False
+            else:
+                ok = True
+            if ok:
+                self._q.append(item)
+                self.put_count += 1
+                self._cv.notify_all()
+        if evicted is not None and self.on_drop is not None: self.on_drop(evicted)
+        return ok
+
+    def get(self, timeout=None):
+        with self._cv:
+            if not self._cv.wait_for(lambda: self._q or self._closed, timeout):
+                return None
+            if not self._q: return None
+            item = self._q.popleft()
+            self._cv.notify_all()
+            return item
+
+    def get_nowait(self):
+        with self._cv:
+            if not self._q: return None
+            item = self._q.popleft()
+            self._cv.notify_all()
+            return item
+
+    def close(self):
+        with self._cv:
+            self._closed = True
+            self._cv.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def __len__(self):
+        with self._cv:
+            return len(self._q)
+
+
+class FramePool:
+    # at most `limit` frame buffers, handed out with acquire() and given back
+    # with release(). Buffers are allocated on demand, so the pool only grows
+    # as far as its consumer falls behind.
+    def __init__(self, limit):
+        self.limit = max(1, int(limit))
+        self._free = []
+        self._cv = threading.Condition()
+        self.allocated = 0
+
+    def acquire(self, like, timeout=None):
+        # -> an unused buffer shaped like `like`, or None after timeout
+        with self._cv:
+            while True:
+                while self._free:
+                    buf = self._free.pop()
+                    if buf.shape == like.shape and buf.dtype == like.dtype: return buf
+                    self.allocated -= 1  # frame size changed: let it go
+                if self.allocated < self.limit:
+                    self.allocated += 1
+                    return like.copy()  # caller overwrites it anyway
+                if not self._cv.wait(timeout): return None
+
+    def release(self, buf):
+        with self._cv:
+            self._free.append(buf)
+            self._cv.notify()
+
+
+class StageStats:
+    def __init__(self, alpha=0.1):
+        self.alpha = alpha
+        self.frames = 0
+        self.dropped = 0
+        self.latency_ms = 0.0  # last
+        self.avg_ms = 0.0      # exponential moving average
+        self.fps = 0.0
+        self._t_last = None
+
+    def record(self, latency_s):
+        now = time.perf_counter()
+        ms = latency_s*1000.0
+        self.latency_ms = ms
+        self.avg_ms = ms if self.frames == 0 else self.avg_ms + self.alpha*(ms-self.avg_ms)
+        if self._t_last is not None and now > self._t_last:
+            inst = 1.0/(now-self._t_last)
+            self.fps = inst if self.fps == 0 else self.fps + self.alpha*(inst-self.fps)
+        self._t_last = now
+        self.frames += 1
+
+    def as_dict(self):
+        return {"frames": self.frames, "dropped": self.dropped, "latency_ms": round(self.latency_ms, 3),
+                "avg_ms": round(self.avg_ms, 3), "fps": round(self.fps, 2)}
+
+
+class PipelineRunner:
+    # read_frame() -> (ok, frame_bgr); processor has .process(frame)
+    def __init__(self, read_frame, processor, capture_depth=2, preview_depth=1):
+        self.read_frame = read_frame
+        self.processor = processor
+        self.capture_q = RingQueue(capture_depth, "latest")
+        self.preview_q = RingQueue(preview_depth, "latest")
+        self.record_q = None
+        self.record_pool = None
+        self.stats = {k: StageStats() for k in ("capture", "process", "present", "record")}
+        self._calls = deque()  # callables to run on the capture thread
+        self._running = False
+        self._threads = []
+        self._rec_thread = None
+        self._seq = 0
+        self.raw_sink = None  # raw_sink(frame, capture_ts, seq)
+        self.error = None     # why the pipeline stopped, if a stage failed
+        self.on_error = None  # on_error(message), called from the failing thread
+        if hasattr(self.processor, "out_ring"):
+            # the processor may recycle output buffers: the ring must outlive
+            # the preview queue plus the frames being processed and polled
+            self.processor.out_ring = self.preview_q.maxsize + 3
+        self.last_source = None  # most recent unprocessed frame (e.g. for preset thumbnails)
+
+    # ----- lifecycle -----
+    def start(self):
+        if self._running: return
+        self._running = True
+        self._threads = [threading.Thread(target=self._capture_loop, name="aurafilm-capture", daemon=True),
+                         threading.Thread(target=self._process_loop, name="aurafilm-process", daemon=True)]
+        for t in self._threads: t.start()
+
+    def stop(self):
+        self._running = False
+        self.stop_recording()
+        self.capture_q.close()
+        for t in self._threads: t.join(timeout=2.0)
+        self._threads = []
+
+    def fail(self, stage, exc):
+        # a worker loop raised: stop every stage, keep and report the reason
+        first = self.error is None
+        if first:
+            self.error = f"{stage}: {type(exc).__name__}: {exc}"
+            print(f"aurafilm: {stage} stage failed:", file=sys.stderr)
+            traceback.print_exception(exc, file=sys.stderr)
+        self._running = False
+        self.capture_q.close()
+        rq = self.record_q
+        if rq is not None: rq.close()  # releases a process loop waiting on it
+        cb = self.on_error
+        if first and cb is not None: cb(self.error)
+
+    def call_in_capture(self, fn):
+        # capture devices are not thread safe; run fn on the capture thread
+        if self._running: self._calls.append(fn)
+        else: fn()
+
+    # ----- recording stage -----
+    def start_recording(self, sink, depth=64, policy="block"):
+        # sink(frame, capture_ts, params, seq) is called for every queued
+        # frame, in order; params is the processor's (version, Params) for
+        # that frame or None, seq its capture sequence number. The frame is a pooled copy, valid only during the call.
+        # policy "latest" never stalls processing: on overload the oldest
+        # queued frames are dropped (and counted) instead.
+        self.stop_recording()
+        # queued frames, the one in the sink and the one being copied
+        pool = self.record_pool = FramePool(depth + 2)
+        self.record_q = RingQueue(depth, policy, on_drop=lambda item: pool.release(item[0]))
+        self.stats["record"] = StageStats()
+        self._rec_thread = threading.Thread(target=self._record_loop, args=(self.record_q, sink),
+                                            name="aurafilm-record", daemon=True)
+        self._rec_thread.start()
+
+    def stop_recording(self):
+        q, self.record_q = self.record_q, None
+        if q is not None:
+            q.close()
+            if self._rec_thread: self._rec_thread.join()
+        self._rec_thread = None
+        self.record_pool = None
+
+    # ----- raw tap -----
+    def start_raw(self, sink):
+        self.raw_sink = sink
+
+    def stop_raw(self):
+        # returns once the capture thread can no longer be inside the sink
+        sink, self.raw_sink = self.raw_sink, None
+        if sink is not None: self.sync_capture()
+
+    def sync_capture(self, timeout=1.0):
+        # wait until the capture thread finishes its current iteration
+        done = threading.Event()
+        self.call_in_capture(done.set)
+        done.wait(timeout)
+
+    # ----- present stage (UI thread) -----
+    def poll_preview(self):
+        item = self.preview_q.get_nowait()
+        if item is None: return None
+        frame, ts, _seq = item
+        self.stats["present"].record(time.perf_counter()-ts)  # capture -> present latency
+        return frame
+
+    def stats_dict(self):
+        d = {k: s.as_dict() for k, s in self.stats.items()}
+        d["capture"]["dropped"] = self.capture_q.dropped
+        d["present"]["dropped"] = self.preview_q.dropped
+        if self.record_q is not None:
+            d["record"]["dropped"] = self.record_q.dropped
+            d["record"]["queued"] = len(self.record_q)
+            d["record"]["blocked_s"] = round(self.record_q.blocked_s, 3)
+            if self.record_pool is not None: d["record"]["buffers"] = self.record_pool.allocated
+        return d
+
+    # ----- worker loops -----
+    def _capture_loop(self):
+        try:
+            while self._running:
+                while self._calls:
+                    self._calls.popleft()()
+                t0 = time.perf_counter()
+                ok, frame = self.read_frame()
+                if not ok:
+                    time.sleep(0.005)
+                    continue
+                ts = time.perf_counter()
+                self.stats["capture"].record(ts-t0)
+                raw = self.raw_sink
+                if raw is not None: raw(frame, ts, self._seq)
+                self.capture_q.put((frame, ts, self._seq))
+                self._seq += 1
+        except Exception as e:
+            self.fail("capture", e)
+
+    def _process_loop(self):
+        try:
+            while self._running:
+                item = self.capture_q.get(timeout=0.1)
+                if item is None: continue
+                frame, ts, seq = item
+                self.last_source = frame
+                t0 = time.perf_counter()
+                out = self.processor.process(frame)
+                self.stats["process"].record(time.perf_counter()-t0)
+                self.preview_q.put((out, ts, seq))
+                rq, pool = self.record_q, self.record_pool
+                if rq is not None and pool is not None:
+                    buf = pool.acquire(out, timeout=1.0)
+                    if buf is None:
+                        rq.dropped += 1
+                        continue
+                    buf[...] = out
+                    rq.put((buf, ts, seq, getattr(self.processor, "last_params", None)))
+        except Exception as e:
+            self.fail("process", e)
+
+    def _record_loop(self, q, sink):
+        st = self.stats["record"]
+        pool = self.record_pool
+        try:
+            while True:
+                item = q.get(timeout=0.1)
+                if item is None:
+                    if q.closed and not len(q): break
+                    continue
+                frame, ts, seq, params = item
+                t0 = time.perf_counter()
+                try:
+                    sink(frame, ts, params, seq)
+                finally:
+                    pool.release(frame)
+                st.record(time.perf_counter()-t0)
+        except Exception as e:
+            self.fail("record", e)
@@ -0,0 +1,83 @@
+import csv, json, threading
+import numpy as np
+from collections import deque
+from time import perf_counter_ns
+
+# Hot-path instrumentation. Usage:
+#     t = prof.start(); ...work...; prof.stop("grain", t)
+# When disabled start() returns 0 and stop()/count() return immediately, so
+# the instrumented code pays one attribute check per node.
+
+class Profiler:
+    def __init__(self, enabled=False, window=300, max_events=20000):
+        self.enabled = enabled
+        self.window = window  # samples kept per timer for percentiles
+        self._hist = {}
+        self.counters = {}
+        self.gauges = {}
+        self._events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self.frame = 0
+
+    def start(self):
+        return perf_counter_ns() if self.enabled else 0
+
+    def stop(self, name, t0):
+        if not t0: return
+        t1 = perf_counter_ns()
+        h = self._hist.get(name)
+        if h is None:
+            with self._lock:
+                h = self._hist.setdefault(name, deque(maxlen=self.window))
+        h.append(t1-t0)
+        self._events.append((self.frame, name, t0, t1-t0, threading.get_ident()))
+
+    def count(self, name, n=1):
+        if not self.enabled: return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def reset(self):
+        with self._lock:
+            self._hist.clear()
+            self.counters.clear()
+            self._events.clear()
+
+    def summary(self):
+        # {timer: {p50, p95, p99, mean (ms), n}}
+        out = {}
+        for name, h in list(self._hist.items()):
+            if not h: continue
+            a = np.fromiter(h, np.int64, len(h))/1e6
+            p50, p95, p99 = np.percentile(a, [50, 95, 99])
+            out[name] = {"p50": round(float(p50), 3), "p95": round(float(p95), 3),
+                         "p99": round(float(p99), 3), "mean": round(float(a.mean()), 3), "n": int(a.size)}
+        return out
+
+    def format_table(self):
+        lines = [f"{'stage':12s} {'p50':>7s} {'p95':>7s} {'p99':>7s}"]
+        for name, s in sorted(self.summary().items(), key=lambda kv: -kv[1]["p50"]):
+            lines.append(f"{name:12s} {s['p50']:7.2f} {s['p95']:7.2f} {s['p99']:7.2f}")
+        for name, v in sorted(self.counters.items()):
+            lines.append(f"{name:24s} {v}")
+        for name, v in sorted(self.gauges.items()):
+            lines.append(f"{name:24s} {v}")
+        return "\n".join(lines)
+
+    # ----- trace export -----
+    def dump_json(self, path):
+        # Chrome/Perfetto trace events plus the summary
+        events = [{"name": name, "ph": "X", "ts": t0/1000.0, "dur": dur/1000.0, "pid": 0, "tid": tid,
+                   "args": {"frame": frame}} for frame, name, t0, dur, tid in list(self._events)]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "summary": self.summary(),
+                       "counters": dict(self.counters), "gauges": dict(self.gauges)}, f)
+
+    def dump_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["frame", "stage", "start_ns", "dur_ns", "thread"])
+            w.writerows(list(self._events))
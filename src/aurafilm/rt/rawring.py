@@ -0,0 +1,170 @@
+import os
+import numpy as np
+
+# Raw (pre-effect) capture into a preallocated memory-mapped file, so the
+# footage can be re-graded later under any preset. Writing a frame is one
+# memcpy into the page cache; the OS flushes it in the background, so the
+# capture thread never waits on an encoder.
+#
+# Layout: a 64-byte file header, then `slots` fixed-size records of a
+# 32-byte slot header (capture frame index, timestamp, seq) and the uint8
+# BGR frame. A slot is invalidated (idx = -1) before its pixels are
+# overwritten and committed by writing idx last, so a reader never sees a
+# half-written frame as valid.
+#
+#   overwrite=True:  ring; keeps the newest `slots` frames (instant replay)
+#   overwrite=False: segment; stops accepting frames when full (raw take).
+#                    Closing a writable segment trims the file (and its
+#                    header) to the frames actually written.
+#
+# Readers get zero-copy views straight into the map. FrameReader opens
+# .afraw files, so `aurafilm render take.afraw out.mp4 -p <preset>` re-grades
+# a raw take.
+
+EXT = ".afraw"
+MAGIC = b"AFRAW1\0\0"
+HEADER = np.dtype([("magic", "S8"), ("width", "<u4"), ("height", "<u4"), ("slots", "<u4"),
+                   ("overwrite", "<u4"), ("written", "<i8"), ("fps", "<f8")])
+HEADER_BYTES = 64
+
+def slot_dtype(w, h):
+    return np.dtype([("idx", "<i8"), ("ts", "<f8"), ("seq", "<i8"), ("_pad", "<i8"),
+                     ("frame", "u1", (h, w, 3))])
+
+def is_raw_path(path):
+    return path.lower().endswith(EXT)
+
+class RawRing:
+    def __init__(self, path, mode="r"):
+        # open an existing file; use RawRing.create for a new one
+        self.path = path
+        self.writable = mode != "r"
+        self._head = np.memmap(path, HEADER, mode="r+" if self.writable else "r", shape=(1,))
+        h = self._head[0]
+        if h["magic"] != MAGIC.rstrip(b"\0"):
+            raise ValueError(f"{path}: not an {EXT} file")
+        self.width, self.height, self.slots = int(h["width"]), int(h["height"]), int(h["slots"])
+        self.overwrite = bool(h["overwrite"])
+        self._slots = np.memmap(path, slot_dtype(self.width, self.height), mode="r+" if self.writable else "r",
+                                offset=HEADER_BYTES, shape=(self.slots,))
+        self.dropped = 0  # frames refused: full segment or wrong size
+
+    @classmethod
+    def create(cls, path, width, height, slots, overwrite=True):
+        # preallocates the file (sparse where the filesystem allows)
+        size = HEADER_BYTES + slots*slot_dtype(width, height).itemsize
+        d = os.path.dirname(path)
+        if d: os.makedirs(d, exist_ok=True)
+        with open(path, "wb") as f:
+            f.truncate(size)
+        head = np.memmap(path, HEADER, mode="r+", shape=(1,))
+        head[0] = (MAGIC, width, height, slots, int(overwrite), 0, 0.0)
+        head.flush()
+        del head
+        ring = cls(path, mode="r+")
+        ring._slots["idx"] = -1
+        return ring
+
+    @classmethod
+    def for_seconds(cls, path, width, height, seconds, fps, overwrite=True):
+        return cls.create(path, width, height, max(1, int(round(seconds*fps))), overwrite)
+
+    @property
+    def written(self):
+        return int(self._head["written"][0])
+
+    def __len__(self):
+        return min(self.written, self.slots)
+
+    # ----- writer (one thread) -----
+    def write(self, frame, ts, idx=None, seq=None):
+        # -> False when the frame was refused
+        n = self.written
+        if (not self.overwrite and n >= self.slots) or frame.shape != (self.height, self.width, 3):
+            self.dropped += 1
+            return False
+        k, s = n % self.slots, self._slots
+        s["idx"][k] = -1
+        s["frame"][k] = frame
+        s["ts"][k] = ts
+        s["seq"][k] = n if seq is None else seq
+        s["idx"][k] = n if idx is None else idx
+        self._head["written"][0] = n + 1
+        return True
+
+    def __call__(self, frame, ts, seq=None):
+        # PipelineRunner raw sink
+        self.write(frame, ts, seq=seq)
+
+    def set_fps(self, fps):
+        self._head["fps"][0] = fps
+
+    def flush(self):
+        if self.writable:
+            self._slots.flush()
+            self._head.flush()
+
+    def close(self):
+        self.flush()
+        trim = self.writable and not self.overwrite and self._slots is not None and len(self) < self.slots
+        if trim:
+            slots = max(1, len(self))
+            self._head["slots"][0] = self.slots = slots
+            self._head.flush()
+        itemsize = self._slots.dtype.itemsize if self._slots is not None else 0
+        self._slots = self._head = None  # unmapped before truncating (Windows)
+        if trim: os.truncate(self.path, HEADER_BYTES + slots*itemsize)
+
+    # ----- reader -----
+    def order(self):
+        # slot numbers of the valid frames, oldest first
+        n = self.written
+        start = max(0, n - self.slots)
+        idx = self._slots["idx"]
+        return [i % self.slots for i in range(start, n) if idx[i % self.slots] >= 0]
+
+    def frame(self, slot):
+        # zero-copy view; valid until the slot is overwritten
+        return self._slots["frame"][slot]
+
+    def info(self, slot):
+        s = self._slots
+        return int(s["idx"][slot]), float(s["ts"][slot]), int(s["seq"][slot])
+
+    def frames(self):
+        # (idx, ts, view) oldest first
+        for slot in self.order():
+            idx, ts, _ = self.info(slot)
+            yield idx, ts, self.frame(slot)
+
+    def last(self, seconds):
+        # slot numbers covering the newest `seconds` of capture time
+        order = self.order()
+        if not order: return []
+        ts = self._slots["ts"]
+        return [s for s in order if ts[order[-1]] - ts[s] <= seconds]
+
+    @property
+    def fps(self):
+        # recorded rate, else estimated from the timestamps
+        fps = float(self._head["fps"][0])
+        if fps > 0: return fps
+        ts = self._slots["ts"][self.order()[-120:]]
+        dt = np.diff(ts)
+        dt = dt[dt > 0]
+        return float(1.0/np.median(dt)) if len(dt) else 30.0
+
+    def export(self, path, slots=None):
+        # copy frames (default: all, oldest first) into a standalone segment
+        slots = self.order() if slots is None else slots
+        out = RawRing.create(path, self.width, self.height, max(1, len(slots)), overwrite=False)
+        for s in slots:
+            idx, ts, seq = self.info(s)
+            out.write(self.frame(s), ts, idx=idx, seq=seq)
+        out.set_fps(self.fps)
+        out.close()
+        return path
+
+    def stats(self):
+        return {"written": self.written, "frames": len(self), "slots": self.slots, "dropped": self.dropped,
+                "mb": round((HEADER_BYTES + self.slots*self._slots.dtype.itemsize)/2**20, 1)}
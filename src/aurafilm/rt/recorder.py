@@ -0,0 +1,128 @@
+import csv, json, time
+import cv2
+from dataclasses import asdict
+
+# Recording sink for PipelineRunner.start_recording. Runs on the runner's
+# record thread, so encoding never blocks the preview; the runner's bounded
+# record queue provides the backpressure metrics.
+#
+# Timing comes from capture timestamps, not from arrival order:
+#   "cfr": each frame goes to output slot round((ts - t0) * fps); missing
+#          slots repeat the previous frame, frames landing on an already
+#          written slot are dropped, so the file plays back in real time.
+#          A stall longer than max_dup slots is cut: after max_dup repeats
+#          the slot clock is re-based to the current frame (counted as
+#          skipped), so later frames do not keep filling the gap.
+#   "vfr": every frame is written once and a timecode v2 sidecar
+#          (mkvmerge --timestamps) carries the real capture times.
+# Next to the video: <base>.frames.csv maps output frames to capture
+# sequence numbers and capture times (a duplicate row repeats the seq and
+# time of the frame it duplicates), and <base>.params.jsonl logs the full
+# params at the first frame and every change after it, by output frame.
+
+MODES = ("cfr", "vfr")
+
+class Recorder:
+    def __init__(self, base, size, fps=30.0, fourcc="mp4v", ext=".mp4", mode="cfr", max_dup=None):
+        if mode not in MODES:
+            raise ValueError(f"unknown recording mode: {mode}")
+        self.base = base
+        self.path = base + ext
+        self.size = tuple(size)
+        self.fps = float(fps)
+        self.mode = mode
+        self.max_dup = max_dup if max_dup is not None else int(self.fps*2)  # cap for long capture stalls
+        self.writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*fourcc), self.fps, self.size)
+        if not self.writer.isOpened():
+            raise IOError(f"cannot open video writer for {self.path}")
+        self._frames_f = open(base + ".frames.csv", "w", newline="", encoding="utf-8")
+        self._frames = csv.writer(self._frames_f)
+        self._frames.writerow(["out_frame", "seq", "capture_s", "dup"])
+        self._params_f = open(base + ".params.jsonl", "w", encoding="utf-8")
+        self._timecodes = None
+        if mode == "vfr":
+            self._timecodes = open(base + ".timecodes.txt", "w", encoding="utf-8")
+            self._timecodes.write("# timecode format v2\n")
+        self._t0 = None
+        self._last = None  # own copy of the last written frame, for duplicates
+        self._last_seq = self._last_t = None
+        self._last_params = None
+        self._seq = 0
+        self._slot_skip = 0  # output slots cut from stalls
+        self.written = 0
+        self.frames_in = 0
+        self.dups = 0
+        self.drops = 0
+        self.skipped = 0
+        self.encode_ms = 0.0  # EWMA per written frame
+        self.closed = False
+
+    # ----- sink -----
+    def __call__(self, frame, ts, params=None, seq=None):
+        # seq: the capture sequence number (None: count frames as they come)
+        if self.closed: return
+        if frame.shape[1::-1] != self.size:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if self._t0 is None: self._t0 = ts
+        t = ts - self._t0
+        if seq is None: seq = self._seq
+        self._seq = seq + 1
+        self.frames_in += 1
+        if self.mode == "cfr":
+            slot = int(round(t*self.fps)) - self._slot_skip
+            if slot < self.written:
+                self.drops += 1
+                return
+            gap = slot - self.written
+            if self._last is not None and gap:
+                for _ in range(min(gap, self.max_dup)):
+                    self._write(self._last, self._last_seq, self._last_t, dup=True)
+                if gap > self.max_dup:  # re-base: this frame takes the next slot
+                    self._slot_skip += gap - self.max_dup
+                    self.skipped += gap - self.max_dup
+        self._log_params(params, t)
+        self._write(frame, seq, t)
+        if self.mode == "cfr":  # the sink's frame is only valid during the call
+            if self._last is None or self._last.shape != frame.shape: self._last = frame.copy()
+            else: self._last[...] = frame
+            self._last_seq, self._last_t = seq, t
+        if self._timecodes is not None:
+            self._timecodes.write(f"{t*1000.0:.3f}\n")
+
+    def _write(self, frame, seq, t, dup=False):
+        t0 = time.perf_counter()
+        self.writer.write(frame)
+        ms = (time.perf_counter()-t0)*1000.0
+        self.encode_ms = ms if self.written == 0 else self.encode_ms + 0.1*(ms-self.encode_ms)
+        self._frames.writerow([self.written, seq, f"{t:.6f}", int(dup)])
+        self.written += 1
+        if dup: self.dups += 1
+
+    def _log_params(self, params, t):
+        # params: (version, Params) the frame was processed with, or None
+        if params is None: return
+        version, p = params
+        if self._last_params is not None and self._last_params[0] == version: return
+        d = asdict(p)
+        if self._last_params is None:
+            rec = {"frame": self.written, "t": round(t, 6), "version": version, "params": d}
+        else:
+            prev = asdict(self._last_params[1])
+            rec = {"frame": self.written, "t": round(t, 6), "version": version,
+                   "set": {k: v for k, v in d.items() if prev.get(k) != v}}
+        self._params_f.write(json.dumps(rec) + "\n")
+        self._last_params = params
+
+    # ----- lifecycle -----
+    def stats(self):
+        return {"frames_in": self.frames_in, "written": self.written, "dups": self.dups,
+                "drops": self.drops, "skipped": self.skipped, "encode_ms": round(self.encode_ms, 3), "fps": self.fps, "mode": self.mode}
+
+    def close(self):
+        # call after PipelineRunner.stop_recording() has drained the queue
+        if self.closed: return self.stats()
+        self.closed = True
+        self.writer.release()
+        for f in (self._frames_f, self._params_f, self._timecodes):
+            if f is not None: f.close()
+        return self.stats()
@@ -0,0 +1,112 @@
+import os, time, itertools
+import cv2
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from ..utils.params import Params, ParamStore, PARAM_FIELDS
+from ..utils.presets import load_preset_by_name, apply_preset_to_params
+from .engine import make_processor
+from .sources import open_source, is_image_path
+
+# Offline renderer: splits any seekable frame source (video file, image
+# sequence, raw capture, synthetic) into chunks of frames, renders them on a
+# process pool and writes the results in order.
+# Temporal effects are keyed by the absolute frame index, so the output does
+# not depend on how the frames are partitioned. With backend="torch" each
+# chunk goes through TorchProcessor.process_batch as tensor batches, on one
+# worker process by default (torch threads across the cores itself).
+
+def params_for_preset(name=None, **overrides):
+    p = Params()
+    if name:
+        preset = load_preset_by_name(name)
+        if preset is None:
+            raise ValueError(f"unknown preset: {name}")
+        p = apply_preset_to_params(preset, p)
+    return replace(p, **{k: v for k, v in overrides.items() if v is not None and k in PARAM_FIELDS})
+
+# ---------- worker side ----------
+_worker = {}
+
+def _init_worker(path, params, size, image_out, tiles, backend, batch, threads, prefetch):
+    cv2.setNumThreads(1)  # one process per core already
+    _worker["reader"] = open_source(path, size, prefetch=prefetch)
+    if backend == "torch":
+        _worker["proc"] = make_processor(ParamStore(params), "torch", batch=batch, threads=threads)
+    else:
+        _worker["proc"] = make_processor(ParamStore(params), tiles=tiles)
+    _worker["image_out"] = image_out
+
+def _render_chunk(chunk):
+    start, stop = chunk
+    reader, proc = _worker["reader"], _worker["proc"]
+    src = []
+    for i in range(start, stop):
+        frame = reader.read_at(i)  # already at the render size
+        if frame is None: break
+        src.append(frame)
+    frames = proc.process_batch(src, frame_idx=start)
+    if _worker["image_out"]:
+        for i, out in enumerate(frames):
+            cv2.imwrite(_worker["image_out"] % (start+i), out)
+        frames = [None]*len(frames)
+    return start, frames
+
+# ---------- parent side ----------
+def render(src, dst, params, workers=None, chunk=16, size=None, fps=None, fourcc="mp4v",
+           tiles=1, progress=None, backend="opencv", batch=4, cancel=None):
+    # cancel: an Event; once set, rendering stops after the chunks in flight
+    reader = open_source(src)
+    if reader.live or not reader.bounded:
+        raise ValueError(f"{src}: rendering needs a finite, seekable source")
+    total, src_fps = len(reader), reader.fps
+    first = reader.read_at(0)
+    reader.close()
+    if first is None:
+        raise ValueError(f"no frames in {src}")
+    if size is None: size = (first.shape[1], first.shape[0])
+    cores = os.cpu_count() or 1
+    if backend == "torch":
+        make_processor(ParamStore(params), "torch")  # fail early if torch is missing
+        workers = workers or 1
+    workers = workers or cores
+    threads = max(1, cores//workers) if backend == "torch" else None
+    # a single worker reads the source front to back: decode ahead of it
+    prefetch = chunk if workers == 1 else 0
+
+    image_out = None
+    writer = None
+    if is_image_path(dst) or "%" in dst:
+        image_out = dst if "%" in dst else os.path.splitext(dst)[0] + "_%06d" + os.path.splitext(dst)[1]
+        d = os.path.dirname(image_out)
+        if d: os.makedirs(d, exist_ok=True)
+    else:
+        writer = cv2.VideoWriter(dst, cv2.VideoWriter_fourcc(*fourcc), fps or src_fps, size)
+        if not writer.isOpened():
+            raise OSError(f"cannot open video writer for {dst} (fourcc {fourcc})")
+
+    # frame counts from containers can be off or missing (0): chunks are cut
+    # from the frames actually read, until one comes back short (the end)
+    chunks = ((s, s+chunk) for s in itertools.count(0, chunk))
+    done = 0
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(src, params, size, image_out, tiles, backend, batch, threads, prefetch)) as pool:
+        # bounded window of in-flight chunks, consumed in submission order
+        pending = deque(pool.submit(_render_chunk, c) for c in itertools.islice(chunks, 2*workers))
+        eof = False
+        while pending:
+            if cancel is not None and cancel.is_set():
+                for f in pending: f.cancel()
+                break
+            _start, frames = pending.popleft().result()
+            eof |= len(frames) < chunk
+            if not eof: pending.append(pool.submit(_render_chunk, next(chunks)))
+            for out in frames:
+                if writer is not None: writer.write(out)
+            done += len(frames)
+            if progress: progress(done, total, done/max(1e-9, time.perf_counter()-t0))
+    if writer is not None: writer.release()
+    elapsed = time.perf_counter() - t0
+    return {"frames": done, "seconds": elapsed, "fps": done/max(1e-9, elapsed), "workers": workers,
+            "backend": backend, "cancelled": bool(cancel is not None and cancel.is_set())}
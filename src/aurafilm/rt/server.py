@@ -0,0 +1,300 @@
+import html, json, sys, threading, time, traceback
+import cv2
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, quote, unquote
+from ..utils.params import ParamStore
+from .cache import ArtifactCache
+from .grain import GrainBank
+from .engine import RTProcessor
+from .pipeline import RingQueue, StageStats
+from .sources import open_source, PacedReader
+
+# Headless multi-stream service: N streams, each with its own ParamStore and
+# RTProcessor (frame counter, arena, derived-state pointer), processed on one
+# shared worker pool. Streams share one ArtifactCache and one GrainBank, whose
+# entries are keyed by the parameter values and frame size they were built
+# from, so streams at the same resolution and preset build their LUTs, masks,
+# glow plans, remap tables and grain tiles once.
+#
+#   source -> capture thread -> in_q (latest frame wins) -> scheduler
+#          -> pool worker: process + JPEG encode -> MJPEG clients
+#
+# Scheduling is round-robin with at most one frame per stream in flight: a
+# stream's frames stay in order, and a stream that falls behind drops its
+# oldest frames (counted) instead of starving the others. The pool is threads:
+# OpenCV releases the GIL, and processors keep per-stream state that a
+# process pool would have to ship around.
+#
+# HTTP (ThreadingHTTPServer, localhost by default):
+#   /                        index page with every stream
+#   /stream/<name>.mjpg      multipart/x-mixed-replace MJPEG
+#   /snapshot/<name>.jpg     the next frame as a single JPEG
+#   /stats                   per-stream latency / throughput, pool and caches
+# Frames are only JPEG-encoded while someone is watching. A stream whose
+# processing raises is logged to stderr and marked failed (its error shows in
+# /stats); it stops capturing and its clients are disconnected.
+
+class Stream:
+    def __init__(self, name, source, params, cache, grain, jpeg_quality=80):
+        self.name = name
+        self.source = source
+        self.params = ParamStore(params)
+        self.proc = RTProcessor(self.params, cache=cache)
+        self.proc.grain = grain
+        self.proc.out_ring = 2  # each output is encoded before the next frame starts
+        self.jpeg_quality = jpeg_quality
+        self.in_q = RingQueue(1, "latest")
+        self.stats = {k: StageStats() for k in ("capture", "process", "encode", "output")}
+        self.busy = False  # a frame of this stream is on the pool
+        self.clients = 0
+        self._jpeg = None
+        self._jpeg_seq = 0
+        self._out_cv = threading.Condition()
+        self._read = PacedReader(source)
+        self._thread = None
+        self._running = False
+        self.error = None  # why the stream failed, if it did
+
+    # ----- capture thread -----
+    def _capture_loop(self, wake):
+        try:
+            while self._running:
+                t0 = time.perf_counter()
+                ok, frame = self._read()
+                if not ok:
+                    time.sleep(0.005)
+                    continue
+                ts = time.perf_counter()
+                self.stats["capture"].record(ts-t0)
+                self.in_q.put((frame, ts))
+                wake()
+        except Exception as e:
+            self.fail(e)
+
+    def start(self, wake):
+        self._running = True
+        self._thread = threading.Thread(target=self._capture_loop, args=(wake,),
+                                        name=f"aurafilm-capture-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._halt()
+        if self._thread is not None: self._thread.join(timeout=2.0)
+        self.source.close()
+
+    def _halt(self):
+        self._running = False
+        self.in_q.close()
+        with self._out_cv:
+            self._out_cv.notify_all()
+
+    def fail(self, exc):
+        # capture or processing raised: stop the stream, keep the reason
+        self.error = f"{type(exc).__name__}: {exc}"
+        print(f"aurafilm serve: stream {self.name} failed:", file=sys.stderr)
+        traceback.print_exception(exc, file=sys.stderr)
+        self._halt()
+
+    # ----- pool worker -----
+    def process(self, frame, ts):
+        t0 = time.perf_counter()
+        out = self.proc.process(frame)
+        t1 = time.perf_counter()
+        self.stats["process"].record(t1-t0)
+        if self.clients:
+            ok, buf = cv2.imencode(".jpg", out, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            self.stats["encode"].record(time.perf_counter()-t1)
+            if ok:
+                with self._out_cv:
+                    self._jpeg = buf.tobytes()
+                    self._jpeg_seq += 1
+                    self._out_cv.notify_all()
+        self.stats["output"].record(time.perf_counter()-ts)  # capture -> output latency
+
+    # ----- clients -----
+    def attach(self):
+        with self._out_cv: self.clients += 1
+
+    def detach(self):
+        with self._out_cv: self.clients -= 1
+
+    def next_jpeg(self, after, timeout=2.0):
+        # -> (seq, jpeg bytes) of the first frame newer than `after`, or None
+        with self._out_cv:
+            fresh = lambda: self._jpeg is not None and self._jpeg_seq != after
+            if not self._out_cv.wait_for(lambda: fresh() or not self._running, timeout):
+                return None
+            if not self._running: return None
+            return self._jpeg_seq, self._jpeg
+
+    def stats_dict(self):
+        d = {k: s.as_dict() for k, s in self.stats.items()}
+        p = self.params.snapshot()
+        return {"preset": p.preset_name, "size": list(self.source.size or ()), "clients": self.clients,
+                "fps": d["output"]["fps"], "latency_ms": d["output"]["avg_ms"], "process_ms": d["process"]["avg_ms"],
+                "frames": d["output"]["frames"], "dropped": self.in_q.dropped, "error": self.error, "stages": d}
+
+class StreamServer:
+    def __init__(self, workers=2, cache=None, jpeg_quality=80):
+        self.workers = max(1, int(workers))
+        self.cache = cache if cache is not None else ArtifactCache()
+        self.grain = GrainBank()
+        self.jpeg_quality = jpeg_quality
+        self.streams = {}  # name -> Stream, in scheduling order
+        self._pool = None
+        self._cv = threading.Condition()
+        self._inflight = 0
+        self._running = False
+        self._scheduler = None
+        self._httpd = None
+        self._t_start = None
+
+    def add_stream(self, source, params, name=None, size=None):
+        # source: a FrameSource or anything open_source takes
+        if not hasattr(source, "read"):
+            synthetic = isinstance(source, str) and source.startswith("synthetic")
+            source = open_source(source, size=size, **({"realtime": True} if synthetic else {}))
+        name = str(name if name is not None else len(self.streams))
+        if name in self.streams:
+            raise ValueError(f"duplicate stream name: {name}")
+        s = Stream(name, source, params, self.cache, self.grain, self.jpeg_quality)
+        with self._cv:
+            self.streams[name] = s
+        if self._running: s.start(self._wake)
+        return s
+
+    def _wake(self):
+        with self._cv:
+            self._cv.notify()
+
+    # ----- scheduling -----
+    def _schedule_loop(self):
+        rr = 0
+        while self._running:
+            with self._cv:
+                picked = None
+                streams = list(self.streams.values())
+                if self._inflight < self.workers:
+                    for k in range(len(streams)):
+                        s = streams[(rr+k) % len(streams)]
+                        if not s.busy and len(s.in_q):
+                            picked, rr = s, (rr+k+1) % len(streams)
+                            break
+                if picked is None:
+                    self._cv.wait(0.05)
+                    continue
+                item = picked.in_q.get_nowait()
+                if item is None: continue
+                picked.busy = True
+                self._inflight += 1
+            self._pool.submit(self._run, picked, *item)
+
+    def _run(self, s, frame, ts):
+        try:
+            s.process(frame, ts)
+        except Exception as e:
+            s.fail(e)
+        finally:
+            with self._cv:
+                s.busy = False
+                self._inflight -= 1
+                self._cv.notify()
+
+    # ----- lifecycle -----
+    def start(self):
+        if self._running: return
+        self._running = True
+        self._t_start = time.perf_counter()
+        self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="aurafilm-serve")
+        for s in self.streams.values(): s.start(self._wake)
+        self._scheduler = threading.Thread(target=self._schedule_loop, name="aurafilm-schedule", daemon=True)
+        self._scheduler.start()
+
+    def serve_http(self, host="127.0.0.1", port=8080):
+        # -> (host, port) actually bound (port=0 picks a free one)
+        httpd = ThreadingHTTPServer((host, port), _Handler)
+        httpd.daemon_threads = True
+        httpd.app = self
+        self._httpd = httpd
+        threading.Thread(target=httpd.serve_forever, name="aurafilm-http", daemon=True).start()
+        return httpd.server_address[:2]
+
+    def stop(self):
+        self._running = False
+        with self._cv:
+            self._cv.notify_all()
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        if self._scheduler is not None: self._scheduler.join(timeout=2.0)
+        for s in self.streams.values(): s.stop()
+        if self._pool is not None: self._pool.shutdown(wait=True)
+
+    def stats(self):
+        return {"uptime_s": round(time.perf_counter() - (self._t_start or time.perf_counter()), 1),
+                "workers": self.workers, "inflight": self._inflight,
+                "streams": {n: s.stats_dict() for n, s in self.streams.items()},
+                "cache": self.cache.stats(), "grain_bank": {"hits": self.grain.hits, "misses": self.grain.misses}}
+
+    def index_html(self):
+        esc = lambda v: html.escape(str(v))
+        items = "".join(f'<figure><img src="/stream/{quote(n)}.mjpg" width="480"><figcaption>{esc(n)} &middot; '
+                        f'{esc(s.params.snapshot().preset_name)}</figcaption></figure>' for n, s in self.streams.items())
+        return (f'<!doctype html><title>aurafilm</title><body style="background:#111;color:#ddd;font:13px sans-serif">'
+                f'{items}<p><a href="/stats" style="color:#8af">stats</a></p></body>')
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "aurafilm"
+    BOUNDARY = "aurafilmframe"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code, ctype, body):
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        app = self.server.app
+        path = urlsplit(self.path).path.rstrip("/") or "/"
+        if path == "/":
+            return self._send(200, "text/html; charset=utf-8", app.index_html().encode())
+        if path == "/stats":
+            return self._send(200, "application/json", json.dumps(app.stats(), indent=1).encode())
+        kind, _, name = path.strip("/").partition("/")
+        s = app.streams.get(unquote(name.rsplit(".", 1)[0]))
+        if kind not in ("stream", "snapshot") or s is None:
+            return self._send(404, "text/plain", b"not found\n")
+        s.attach()
+        try:
+            if kind == "snapshot":
+                got = s.next_jpeg(s._jpeg_seq)
+                if got is None: return self._send(503, "text/plain", b"no frame\n")
+                return self._send(200, "image/jpeg", got[1])
+            self._mjpeg(s)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client went away
+        finally:
+            s.detach()
+
+    def _mjpeg(self, s):
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={self.BOUNDARY}")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        seq = None
+        while True:
+            got = s.next_jpeg(seq)
+            if got is None:
+                if not s._running: return
+                continue
+            seq, jpeg = got
+            self.wfile.write(f"--{self.BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode())
+            self.wfile.write(jpeg)
+            self.wfile.write(b"\r\n")
@@ -0,0 +1,368 @@
+import os, sys, glob, threading, time
+import cv2, numpy as np
+from numpy.random import default_rng
+from .pipeline import RingQueue
+from .rawring import RawRing, is_raw_path
+
+# Frame sources: cameras, video files, image sequences, raw captures and a
+# deterministic synthetic generator behind one interface:
+#
+#   read() -> (ok, frame)   next uint8 BGR frame at the source's size
+#   read_at(i) -> frame     random access (None past the end; not cameras)
+#   size, fps, len()        len() is 0 when unknown or endless
+#   live, bounded           live: frames arrive in real time (no seeking);
+#                           bounded: the source ends
+#   set_size(w, h), close()
+#
+# Sizing is negotiated once: a source asks the device for the requested
+# size, looks at what actually arrives and caches whether frames need a
+# resize (and with which filter), so the per-frame path is a single check.
+# Prefetch wraps any source in a read-ahead thread; open_source builds one
+# from a path, a camera index or "synthetic[:WxH[:frames]]". PacedReader is
+# the read_frame of a live consumer (preview, server stream).
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".exr")
+
+def is_image_path(path):
+    return path.lower().endswith(IMAGE_EXTS)
+
+def list_image_sequence(path):
+    if os.path.isdir(path):
+        files = [f for f in glob.glob(os.path.join(path, "*")) if is_image_path(f)]
+    else:
+        files = glob.glob(path)
+    return sorted(files)
+
+def camera_backend():
+    # DirectShow on Windows, V4L2 on Linux, OpenCV's pick elsewhere
+    if sys.platform == "win32": return cv2.CAP_DSHOW
+    if sys.platform.startswith("linux"): return cv2.CAP_V4L2
+    return cv2.CAP_ANY
+
+class FrameSource:
+    live = False
+    bounded = True
+
+    def __init__(self, size=None):
+        self.size = tuple(size) if size else None  # requested (w, h); None = native
+        self._native = None  # (w, h) of what the source delivers, once seen
+        self._interp = None  # None: no resize needed
+
+    def set_size(self, w, h):
+        self.size = (w, h)
+        self._native = None
+
+    def _fit(self, frame):
+        if frame is None or self.size is None: return frame
+        nat = frame.shape[1::-1]
+        if nat != self._native:
+            self._native = nat
+            self._interp = None if nat == self.size else (
+                cv2.INTER_AREA if nat[0]*nat[1] > self.size[0]*self.size[1] else cv2.INTER_LINEAR)
+        if self._interp is None: return frame
+        return cv2.resize(frame, self.size, interpolation=self._interp)
+
+    def read(self):
+        raise NotImplementedError
+
+    def read_at(self, idx):
+        raise NotImplementedError(f"{type(self).__name__} has no random access")
+
+    @property
+    def fps(self):
+        return 30.0
+
+    def __len__(self):
+        return 0
+
+    def close(self):
+        pass
+
+class CameraSource(FrameSource):
+    live = True
+    bounded = False
+
+    def __init__(self, index=0, size=None, backend=None, fourcc=None):
+        super().__init__(size)
+        self.cap = cv2.VideoCapture(index, camera_backend() if backend is None else backend)
+        if not self.cap.isOpened() and backend is None:
+            self.cap = cv2.VideoCapture(index)  # let OpenCV pick
+        if not self.cap.isOpened():
+            raise IOError(f"cannot open camera {index}")
+        if fourcc: self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        if self.size: self._request(*self.size)
+
+    def _request(self, w, h):
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, w)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, h)
+
+    def set_size(self, w, h):
+        # call from the thread that reads
+        super().set_size(w, h)
+        self._request(w, h)
+
+    def read(self):
+        ok, frame = self.cap.read()
+        return ok, self._fit(frame) if ok else frame
+
+    @property
+    def fps(self):
+        fps = self.cap.get(cv2.CAP_PROP_FPS)  # -1 / 0 when unknown
+        return fps if fps >= 1 else 30.0
+
+    def close(self):
+        self.cap.release()
+
+class VideoSource(FrameSource):
+    def __init__(self, path, size=None):
+        super().__init__(size)
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise FileNotFoundError(f"cannot open video {path}")
+        self._pos = 0
+
+    def read(self):
+        ok, frame = self.cap.read()
+        self._pos = self._pos + 1 if ok else -1
+        return ok, self._fit(frame) if ok else frame
+
+    def read_at(self, idx):
+        if idx != self._pos:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+            self._pos = idx
+        ok, frame = self.read()
+        return frame if ok else None
+
+    @property
+    def fps(self):
+        return self.cap.get(cv2.CAP_PROP_FPS) or 24.0
+
+    def __len__(self):
+        return int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    def close(self):
+        self.cap.release()
+
+class ImageSequenceSource(FrameSource):
+    def __init__(self, path, size=None, fps=24.0):
+        super().__init__(size)
+        self.files = list_image_sequence(path)
+        if not self.files:
+            raise FileNotFoundError(f"no images found in {path}")
+        self._fps = fps
+        self._pos = 0
+
+    def read_at(self, idx):
+        if idx >= len(self.files): return None
+        self._pos = idx + 1
+        return self._fit(cv2.imread(self.files[idx], cv2.IMREAD_COLOR))
+
+    def read(self):
+        frame = self.read_at(self._pos)
+        return frame is not None, frame
+
+    @property
+    def fps(self):
+        return self._fps
+
+    def __len__(self):
+        return len(self.files)
+
+class RawSource(FrameSource):
+    # .afraw capture; frames are zero-copy views unless a resize is needed
+    def __init__(self, path, size=None):
+        super().__init__(size)
+        self.raw = RawRing(path)
+        self._order = self.raw.order()
+        self._pos = 0
+
+    def read_at(self, idx):
+        if idx >= len(self._order): return None
+        self._pos = idx + 1
+        return self._fit(self.raw.frame(self._order[idx]))
+
+    def read(self):
+        frame = self.read_at(self._pos)
+        return frame is not None, frame
+
+    @property
+    def fps(self):
+        return self.raw.fps
+
+    def __len__(self):
+        return len(self._order)
+
+class SyntheticSource(FrameSource):
+    # deterministic test footage: frame i is always the same image. A smooth
+    # gradient with texture and a few highlights (so glow masks are
+    # non-empty), drifting a few pixels per frame. frames=None: endless.
+    # realtime=True paces read() at fps like a camera.
+    def __init__(self, size=(1280, 720), fps=30.0, frames=None, seed=0, realtime=False):
+        super().__init__(size)
+        self._fps = fps
+        self.frames = frames
+        self.seed = seed
+        self.realtime = self.live = realtime
+        self.bounded = frames is not None
+        w, h = self.size
+        self._base = synthetic_frame(w + 64, h, seed)
+        self._pos = 0
+        self._t_next = None
+
+    def set_size(self, w, h):
+        super().set_size(w, h)
+        self._base = synthetic_frame(w + 64, h, self.seed)
+
+    def read_at(self, idx):
+        if self.frames is not None and idx >= self.frames: return None
+        self._pos = idx + 1
+        w = self.size[0]
+        ox = int(32 + 24*np.sin(idx*0.05))
+        return np.ascontiguousarray(self._base[:, ox:ox+w])
+
+    def read(self):
+        if self.realtime:
+            now = time.perf_counter()
+            if self._t_next is not None and now < self._t_next: time.sleep(self._t_next - now)
+            self._t_next = max(now, self._t_next or now) + 1.0/self._fps
+        frame = self.read_at(self._pos)
+        return frame is not None, frame
+
+    @property
+    def fps(self):
+        return self._fps
+
+    def __len__(self):
+        return self.frames or 0
+
+def synthetic_frame(w, h, seed=0):
+    # smooth gradients + texture + a few highlights, so glow masks are non-empty
+    rng = default_rng(seed)
+    yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+    base = np.stack([xx/w, yy/h, 0.5+0.5*np.sin(xx/37.0+yy/53.0)], axis=-1)*200
+    base += rng.normal(0, 12, (h, w, 3))
+    for _ in range(6):
+        cx, cy, r = rng.integers(w), rng.integers(h), rng.integers(4, max(5, w//20))
+        base[(xx-cx)**2 + (yy-cy)**2 < r*r] = 252
+    return np.clip(base, 0, 255).astype(np.uint8)
+
+class Prefetch(FrameSource):
+    # read-ahead thread over another source. Files: an ordered, lossless
+    # queue of `depth` decoded frames (read_at restarts it when the caller
+    # jumps). Live sources: the newest `depth` frames, older ones dropped.
+    # The reader closes its queue however it ends (EOF, error), so read()
+    # never waits on a dead thread; a reader error is re-raised by read().
+    def __init__(self, source, depth=4):
+        super().__init__(source.size)
+        self.source = source
+        self.depth = max(1, int(depth))
+        self.live, self.bounded = source.live, source.bounded
+        self._q = None
+        self._thread = None
+        self._error = None
+        self._next = 0  # index of the next frame the queue will deliver
+        self._start(0)
+
+    def _start(self, idx):
+        self._stop()
+        q = self._q = RingQueue(self.depth, "latest" if self.live else "block")
+        self._next, self._error = idx, None
+        src = self.source
+        def run():
+            i = idx
+            try:
+                while not q.closed:
+                    if self.live: ok, frame = src.read()
+                    else:
+                        frame = src.read_at(i)
+                        ok = frame is not None
+                    if not ok:
+                        if self.live: time.sleep(0.005); continue
+                        break
+                    q.put(frame)
+                    i += 1
+            except Exception as e:
+                self._error = e
+            finally:
+                q.close()  # queued frames are still delivered, then EOF
+        self._thread = threading.Thread(target=run, name="aurafilm-prefetch", daemon=True)
+        self._thread.start()
+
+    def _stop(self):
+        if self._q is not None:
+            self._q.close()
+            self._thread.join()
+            self._q = self._thread = None
+
+    def read(self):
+        frame = self._q.get()
+        if frame is None:
+            err, self._error = self._error, None
+            if err is not None: raise err
+            return False, None
+        self._next += 1
+        return True, frame
+
+    def read_at(self, idx):
+        if self.live: raise NotImplementedError("live sources have no random access")
+        if idx != self._next: self._start(idx)
+        return self.read()[1]
+
+    def set_size(self, w, h):
+        # the reader thread owns the source; pause it while resizing
+        self._stop()
+        self.source.set_size(w, h)
+        self.size = (w, h)
+        self._start(self._next)
+
+    @property
+    def fps(self):
+        return self.source.fps
+
+    def __len__(self):
+        return len(self.source)
+
+    def close(self):
+        self._stop()
+        self.source.close()
+
+class PacedReader:
+    # read_frame() for a live consumer: live sources are read as frames
+    # arrive; files play at the source rate and start over at the end.
+    # Errors from the source propagate to the caller.
+    def __init__(self, source):
+        self.source = source
+        self._t_next = 0.0
+
+    def __call__(self):
+        src = self.source
+        if src.live: return src.read()
+        now = time.perf_counter()
+        if now < self._t_next: time.sleep(self._t_next - now)
+        self._t_next = max(now, self._t_next) + 1.0/src.fps
+        ok, frame = src.read()
+        if not ok:
+            frame = src.read_at(0)
+            ok = frame is not None
+        return ok, frame
+
+def open_source(spec, size=None, prefetch=0, **kw):
+    # spec: camera index (int, "N" or "cam:N"), "synthetic[:WxH[:frames]]",
+    # a .afraw capture, an image directory / glob / single image, or a video
+    if isinstance(spec, str) and (spec.isdigit() or spec.startswith("cam:")):
+        spec = int(spec[4:] if spec.startswith("cam:") else spec)
+    if isinstance(spec, int):
+        src = CameraSource(spec, size, **kw)
+    elif spec == "synthetic" or spec.startswith("synthetic:"):
+        parts = spec.split(":")[1:]
+        if parts: size = tuple(map(int, parts[0].lower().split("x")))
+        if len(parts) > 1: kw["frames"] = int(parts[1])
+        src = SyntheticSource(size or (1280, 720), **kw)
+    elif is_raw_path(spec):
+        src = RawSource(spec, size)
+    elif os.path.isdir(spec) or any(c in spec for c in "*?[") or is_image_path(spec):
+        src = ImageSequenceSource(spec, size, **kw)
+    else:
+        src = VideoSource(spec, size)
+    return Prefetch(src, prefetch) if prefetch else src
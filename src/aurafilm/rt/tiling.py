@@ -0,0 +1,38 @@
+import os, math
+from .glow import QUALITY_LEVELS
+
+# Horizontal band layout for tiled execution. Each band is processed with a
+# halo of extra rows above/below so blurs and shifts near the band edge see
+# the same neighbourhood as in the full frame; only the core rows are kept.
+
+MIN_BAND_ROWS = 128
+
+def halo_rows(p):
+    # OpenCV sizes float Gaussian kernels to ~4 sigma per side
+    sigma = max(p.hal_r, p.hal_g, p.hal_b, p.bloom_radius)
+    halo = math.ceil(4*sigma) + 1
+    halo += math.ceil(abs(p.weave)) + 1  # vertical gate weave
+    halo += math.ceil(abs(p.ca_pixels))  # radial CA: at most ca_pixels anywhere
+    # lens distortion moves the corners by up to |k1| * r^3 (r ~ 1.15 for 16:9)
+    halo += math.ceil(abs(p.distortion)*1.6*p.width/2)
+    # pyramid levels need aligned band origins and some extra edge context
+    align = 2**QUALITY_LEVELS.get(p.quality, 0)
+    halo += 2*align
+    return -(-halo // align) * align
+
+def auto_tiles(w, h, halo, cores=None):
+    cores = cores or os.cpu_count() or 1
+    if cores < 2 or w*h < 1280*720:
+        return 1
+    return max(1, min(cores, h // max(MIN_BAND_ROWS, 4*halo)))
+
+def band_layout(h, tiles, halo, align=1):
+    # -> [(y0, y1, a, b)]: core rows [y0,y1), processed rows [a,b)
+    tiles = max(1, min(int(tiles), h // max(1, align)))
+    bands = []
+    for i in range(tiles):
+        y0 = (h*i//tiles) // align * align
+        y1 = h if i == tiles-1 else (h*(i+1)//tiles) // align * align
+        if y1 <= y0: continue
+        bands.append((y0, y1, max(0, y0-halo), min(h, y1+halo)))
+    return bands
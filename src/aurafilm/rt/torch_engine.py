@@ -0,0 +1,244 @@
+import numpy as np
+import torch
+import torch.nn.functional as F
+from .cache import ArtifactCache
+from .grain import GrainBank
+from .glow import glow_plan
+from .geometry import geometry_maps, needs_geometry
+from .lut3d import bake_lut3d, load_or_bake, needs_lut3d
+from .profiling import Profiler
+from .nodes import lut_from_tone, vignette_mask, dep_key, flicker_gain, weave_offset
+
+# Torch CPU backend: the node chain as batched tensor ops on [N,3,H,W]
+# float32 frames in channels-last memory, on torch's intra-op thread pool.
+# Same interface as RTProcessor (process, process_batch, profiler, stats), so
+# offline rendering can push whole chunks through it. Derived tables come
+# from the same builders as the OpenCV path and are cached as tensors.
+#
+# Differences from the OpenCV path are interpolation-level only (pyrDown /
+# resize / remap borders and rounding); scripts/check_torch_parity.py bounds
+# them. Tiling and the quality governor are OpenCV-only.
+
+EPS = 1e-4
+PYR_KERNEL = torch.tensor([1., 4., 6., 4., 1.])/16.0
+CODES = torch.linspace(-1.0, 1.0, 256)  # uint8 code -> grid coordinate (align_corners=True)
+
+def _sep_blur(x, k):
+    # depthwise separable blur, reflect-101 borders like cv2.sepFilter2D
+    c = x.shape[1]
+    r = k.numel()//2
+    mode = "reflect" if r < min(x.shape[2:]) else "replicate"
+    x = F.conv2d(F.pad(x, (0, 0, r, r), mode=mode), k.view(1, 1, -1, 1).repeat(c, 1, 1, 1), groups=c)
+    return F.conv2d(F.pad(x, (r, r, 0, 0), mode=mode), k.view(1, 1, 1, -1).repeat(c, 1, 1, 1), groups=c)
+
+def _pyr_down(x):
+    # cv2.pyrDown: 5-tap binomial, reflect-101, keep even samples
+    c = x.shape[1]
+    mode = "reflect" if min(x.shape[2:]) > 2 else "replicate"
+    k = PYR_KERNEL.to(x.dtype)
+    x = F.pad(x, (2, 2, 2, 2), mode=mode)
+    x = F.conv2d(x, k.view(1, 1, -1, 1).repeat(c, 1, 1, 1), stride=(2, 1), groups=c)
+    return F.conv2d(x, k.view(1, 1, 1, -1).repeat(c, 1, 1, 1), stride=(1, 2), groups=c)
+
+class _Pyramid:
+    def __init__(self, x):
+        self.levels = [x]
+    def level(self, i):
+        while len(self.levels) <= i:
+            self.levels.append(_pyr_down(self.levels[-1]))
+        return self.levels[i]
+
+def _pyramid_blur(pyr, entry, size, channel=None):
+    L, k = entry
+    src = pyr.level(L)
+    if channel is not None: src = src[:, channel:channel+1]
+    b = _sep_blur(src, k)
+    if L == 0: return b
+    return F.interpolate(b, size=size, mode="bilinear", align_corners=False)
+
+class TorchDerived:
+    __slots__ = ("lut", "lut3d", "mask", "plan", "grids", "identity")
+    def __init__(self, lut, lut3d, mask, plan, grids, identity):
+        self.lut, self.lut3d, self.mask, self.plan = lut, lut3d, mask, plan
+        self.grids, self.identity = grids, identity
+
+class TorchProcessor:
+    # threads: torch intra-op threads (None = torch's default, all cores).
+    # batch: frames per tensor batch in process_batch (bounds peak memory).
+    def __init__(self, param_store, cache=None, threads=None, batch=4):
+        self.params_store = param_store
+        self.cache = cache if cache is not None else ArtifactCache()
+        self.batch = max(1, int(batch))
+        if threads: torch.set_num_threads(int(threads))
+        self.grain = GrainBank()
+        self.profiler = Profiler()
+        self.last_params = None
+        self.out_ring = None  # accepted for PipelineRunner; outputs are always fresh arrays
+        self._frame_idx = 0
+        self._derived = None
+        self._derived_for = None
+
+    def _artifacts(self, w, h, p):
+        # tensors built from the OpenCV path's artifacts, cached under their
+        # own kinds so a shared ArtifactCache serves both backends
+        c = self.cache
+        lut = c.get("torch.lut", dep_key(lut_from_tone, p),
+                    lambda: torch.from_numpy(lut_from_tone(p).astype(np.float32)/np.float32(255.0)))
+        lut3d = None
+        if needs_lut3d(p):
+            # lut[b, g, r] -> volume (1, 3, D=b, H=g, W=r)
+            lut3d = c.get("torch.lut3d", dep_key(bake_lut3d, p),
+                          lambda: torch.from_numpy(load_or_bake(p)).permute(3, 0, 1, 2).unsqueeze(0).contiguous())
+        mask = c.get("torch.mask", (w, h) + dep_key(vignette_mask, p),
+                     lambda: torch.from_numpy(vignette_mask(w, h, p.vignette_str, p.vignette_round)).view(1, 1, h, w))
+        plan = c.get("torch.glow_plan", dep_key(glow_plan, p),
+                     lambda: {k: (L, torch.from_numpy(np.ascontiguousarray(kern.ravel())))
+                              for k, (L, kern) in glow_plan(p).items()})
+        grids, identity = None, None
+        if needs_geometry(p):
+            grids, identity = c.get("torch.geometry", (w, h) + dep_key(geometry_maps, p),
+                                    lambda: self._grids(geometry_maps(w, h, p.ca_pixels, p.distortion)))
+        if p.grain_strength > EPS:
+            self.grain.bank(w, h, p.grain_scale)
+        return TorchDerived(lut, lut3d, mask, plan, grids, identity)
+
+    @staticmethod
+    def _grids(geo):
+        # pixel source coordinates -> grid_sample's [-1, 1] (align_corners=True)
+        w, h = geo.size
+        scale = np.float32([2.0/max(1, w-1), 2.0/max(1, h-1)])
+        grids = [torch.from_numpy(m*scale - np.float32(1.0)).unsqueeze(0) for m in geo.maps]
+        return grids, list(geo.identity)
+
+    def _derive(self, w, h, p, version):
+        if self._derived_for != (version, w, h):
+            self._derived = self._artifacts(w, h, p)
+            self._derived_for = (version, w, h)
+        return self._derived
+
+    def warm(self, p, w, h):
+        self._artifacts(w, h, p)
+
+    def params_changed(self, recalc_tone=True, recalc_vignette=True):
+        if recalc_tone: self.cache.invalidate("torch.lut")
+        if recalc_vignette: self.cache.invalidate("torch.mask")
+        self._derived_for = None
+
+    @torch.inference_mode()
+    def _run(self, src, p, d, idx):
+        # src: uint8 (N, H, W, 3) tensor; idx: absolute frame index per frame.
+        # Returns uint8 (N, H, W, 3).
+        prof = self.profiler
+        n, h, w = src.shape[:3]
+        t = prof.start()
+        if d.lut3d is not None:
+            # trilinear lookup; grid is (x=r, y=g, z=b) in [-1, 1]
+            grid = CODES[src.flip(-1).long()].unsqueeze(0)
+            x = F.grid_sample(d.lut3d, grid, mode="bilinear", padding_mode="border", align_corners=True)
+            x = x[0].permute(1, 0, 2, 3).contiguous(memory_format=torch.channels_last)
+        else:
+            # NHWC gather viewed as NCHW: channels-last without a copy
+            x = d.lut[src.long()].permute(0, 3, 1, 2)
+        prof.stop("tone", t)
+
+        if p.grain_strength > EPS:
+            t = prof.start()
+            noise = np.stack([self.grain.noise(w, h, p.grain_scale, i, locked=p.lock_grain) for i in idx])
+            k = torch.from_numpy(noise).unsqueeze(1).mul_(p.grain_strength).add_(1.0)
+            x = x.mul_(k).clamp_(0, 1)
+            prof.stop("grain", t)
+
+        if p.hal_str > EPS or p.bloom_str > EPS:
+            t = prof.start()
+            x = self._glow(x, p, d.plan, (h, w))
+            prof.stop("glow", t)
+
+        if p.flicker > EPS:
+            t = prof.start()
+            g = torch.tensor([flicker_gain(i, p.flicker) for i in idx], dtype=torch.float32).view(n, 1, 1, 1)
+            x = x.mul_(g).clamp_(0, 1)
+            prof.stop("flicker", t)
+
+        mask = d.mask if p.vignette_str > EPS else None
+        if d.grids is not None:
+            t = prof.start()
+            x = self._geometry(x, p, d, idx, mask)
+            prof.stop("geometry", t)
+        elif mask is not None:
+            t = prof.start()
+            x = x.mul_(mask)
+            prof.stop("vignette", t)
+
+        t = prof.start()
+        # truncates, like to_uint8: the same float maps to the same code on
+        # both backends, so quantization adds no offset between them
+        out = x.clamp_(0, 1).mul_(255).to(torch.uint8).permute(0, 2, 3, 1)
+        prof.stop("quantize", t)
+        return out
+
+    def _glow(self, x, p, plan, size, bloom_thresh=0.85):
+        luma = x[:, 2:3]*0.2126 + x[:, 1:2]*0.7152 + x[:, 0:1]*0.0722
+        # nothing above a threshold: that blur would add zeros
+        bglow = None
+        if p.bloom_str > EPS and bool((luma > bloom_thresh).any()):
+            bglow = _pyramid_blur(_Pyramid(x*(luma > bloom_thresh)), plan["bloom"], size)
+        if p.hal_str > EPS and bool((luma > p.hal_thresh).any()):
+            m = ((luma - p.hal_thresh)/(1 - p.hal_thresh + 1e-6)).clamp_(0, 1)
+            hal = _Pyramid(x*m)
+            g = torch.cat([_pyramid_blur(hal, plan[ch], size, channel=c) for c, ch in ((0, "b"), (1, "g"), (2, "r"))], 1)
+            x = x.add_(g.mul_(p.hal_str)).clamp_(0, 1)
+        if bglow is not None:
+            x = x.add_(bglow.mul_(p.bloom_str)).clamp_(0, 1)
+        return x
+
+    def _geometry(self, x, p, d, idx, mask):
+        # per channel: cached grid plus each frame's weave offset, one gather
+        n, _, h, w = x.shape
+        shift = None
+        if p.weave > EPS:
+            off = np.float32([weave_offset(i, p.weave) for i in idx])
+            off *= -np.float32([2.0/max(1, w-1), 2.0/max(1, h-1)])
+            shift = torch.from_numpy(off).view(n, 1, 1, 2)
+        chans = []
+        for c in range(3):
+            xc = x[:, c:c+1]
+            if not (d.identity[c] and shift is None):
+                grid = d.grids[c].expand(n, -1, -1, -1)
+                if shift is not None: grid = grid + shift
+                xc = F.grid_sample(xc, grid, mode="bilinear", padding_mode="reflection", align_corners=True)
+            chans.append(xc)
+        x = torch.cat(chans, 1).contiguous(memory_format=torch.channels_last)
+        return x.mul_(mask) if mask is not None else x
+
+    def process_batch(self, frames, frame_idx=None):
+        # frames: equally sized uint8 BGR frames, consecutive from frame_idx;
+        # -> list of uint8 BGR outputs
+        if len(frames) == 0: return []
+        if frame_idx is None: frame_idx = self._frame_idx
+        self._frame_idx = frame_idx + len(frames)
+        version, p = self.params_store.versioned()
+        self.last_params = (version, p)
+        h, w = frames[0].shape[:2]
+        d = self._derive(w, h, p, version)
+        prof = self.profiler
+        outs = []
+        for s in range(0, len(frames), self.batch):
+            chunk = frames[s:s+self.batch]
+            prof.frame = frame_idx + s
+            t = prof.start()
+            src = torch.from_numpy(np.ascontiguousarray(np.stack(chunk)))
+            res = self._run(src, p, d, range(frame_idx+s, frame_idx+s+len(chunk)))
+            outs.extend(np.ascontiguousarray(res.numpy()))
+            prof.stop("total", t)
+        return outs
+
+    def process(self, frame_bgr, frame_idx=None):
+        return self.process_batch([frame_bgr], frame_idx)[0]
+
+    def stats(self):
+        prof = self.profiler
+        for kind, s in self.cache.stats().items():
+            prof.gauge(f"{kind}.hits", s["hits"])
+            prof.gauge(f"{kind}.misses", s["misses"])
+        prof.gauge("torch.threads", torch.get_num_threads())
+        return {"timers": prof.summary(), "counters": dict(prof.counters), "gauges": dict(prof.gauges)}
@@ -0,0 +1,145 @@
+import time
+import cv2, numpy as np
+from dataclasses import replace
+from .arena import BufferArena
+from .cache import ArtifactCache
+from .grain import GrainBank
+from .glow import glow_f, glow_plan
+from .lut3d import Lut3D, bake_lut3d, load_or_bake, needs_lut3d
+from .geometry import geometry_maps, geometry_f, needs_geometry
+from .nodes import lut_from_tone, vignette_mask, to_uint8, dep_key, flicker_gain, weave_offset
+
+# One frame under N parameter sets (preset thumbnails, A/B grids). The proxy
+# resize, the grain field and the final quantize are shared; per-pixel
+# stages run once over a (N, h, w, 3) batch: stacked 1D tone LUTs in a single
+# gather, stacked vignette masks, per-variant grain strength and flicker
+# gain as broadcast vectors. Only the spatial stages (glow, the geometry
+# gather) and 3D LUT looks run per variant.
+
+EPS = 1e-4
+SPATIAL_FIELDS = ("hal_r", "hal_g", "hal_b", "bloom_radius", "ca_pixels", "weave", "grain_scale")
+
+def proxy_params(p, s):
+    # pixel-sized parameters scaled to a proxy that is s times the frame width
+    if s == 1: return p
+    return replace(p, **{f: getattr(p, f)*s for f in SPATIAL_FIELDS})
+
+def proxy_size(w, h, width):
+    return width, max(2, int(round(h*width/w))) & ~1
+
+class VariantRenderer:
+    def __init__(self, width=240, cache=None):
+        self.width = width
+        # proxy masks and remap tables are small; keep one per variant
+        self.cache = cache if cache is not None else ArtifactCache(max_per_kind=64, limits={"mask": 64, "geometry": 64})
+        self.grain = GrainBank(tiles=2, pad=8)
+        self.arena = BufferArena()  # glow / geometry scratch, shared by the variants in turn
+        self._x = None
+        self._tmp = None
+        self.cost_ms = None  # EWMA per-variant render cost
+        self._next = 0
+
+    def _buffers(self, n, h, w):
+        if self._x is None or self._x.shape[0] < n or self._x.shape[1:3] != (h, w):
+            self._x = np.empty((n, h, w, 3), np.float32)
+            self._tmp = np.empty((h, w, 3), np.float32)
+        return self._x[:n]
+
+    def _lutf(self, p):
+        return self.cache.get("lutf", dep_key(lut_from_tone, p),
+                              lambda: np.divide(lut_from_tone(p), np.float32(255.0)))
+
+    def render(self, frame, params_list, frame_idx=0):
+        # -> list of uint8 BGR proxies, one per Params
+        fh, fw = frame.shape[:2]
+        w, h = proxy_size(fw, fh, min(self.width, fw))
+        src = frame if (fw, fh) == (w, h) else cv2.resize(frame, (w, h), interpolation=cv2.INTER_AREA)
+        ps = [proxy_params(p, w/fw) for p in params_list]
+        n = len(ps)
+        if n == 0: return []
+        x = self._buffers(n, h, w)
+        c = self.cache
+
+        # tone: all 1D LUT variants in one gather, 3D LUT looks one by one
+        one = [i for i, p in enumerate(ps) if not needs_lut3d(p)]
+        if one:
+            lf = np.stack([self._lutf(ps[i]) for i in one])
+            if len(one) == n: np.take(lf, src, axis=1, out=x)
+            else: x[one] = lf[:, src]
+        for i, p in enumerate(ps):
+            if needs_lut3d(p):
+                lut = c.get("lut3d", dep_key(bake_lut3d, p), lambda p=p: Lut3D(load_or_bake(p)))
+                lut.apply_f(src, out=x[i])
+
+        # grain: one noise field per distinct (scale, lock), strength per variant
+        groups = {}
+        for i, p in enumerate(ps):
+            if p.grain_strength > EPS:
+                groups.setdefault((round(p.grain_scale, 4), p.lock_grain), []).append(i)
+        for (scale, locked), idx in groups.items():
+            noise = self.grain.noise(w, h, scale, frame_idx, locked=locked)
+            k = 1.0 + np.float32([ps[i].grain_strength for i in idx])[:, None, None]*noise
+            x[idx] = np.clip(x[idx]*k[..., None], 0, 1)
+
+        # glow per variant, in place
+        for i, p in enumerate(ps):
+            if p.hal_str > EPS or p.bloom_str > EPS:
+                plan = c.get("glow_plan", dep_key(glow_plan, p), lambda p=p: glow_plan(p))
+                glow_f(x[i], p, out=x[i], plan=plan, arena=self.arena)
+
+        # flicker as a broadcast multiply over the batch
+        gains = np.float32([flicker_gain(frame_idx, p.flicker) if p.flicker > EPS else 1.0 for p in ps])
+        if (gains != 1).any():
+            x *= gains[:, None, None, None]
+            np.clip(x, 0, 1, out=x)
+
+        # geometry gather per variant (vignette folded in), stacked vignette
+        # masks for the rest
+        def mask(p):
+            if p.vignette_str <= EPS: return None
+            return c.get("mask", (w, h) + dep_key(vignette_mask, p),
+                         lambda: vignette_mask(w, h, p.vignette_str, p.vignette_round))
+        vig = []
+        for i, p in enumerate(ps):
+            if needs_geometry(p):
+                geo = c.get("geometry", (w, h) + dep_key(geometry_maps, p),
+                            lambda p=p: geometry_maps(w, h, p.ca_pixels, p.distortion))
+                dx, dy = weave_offset(frame_idx, p.weave) if p.weave > EPS else (0.0, 0.0)
+                np.copyto(x[i], geometry_f(x[i], geo, dx, dy, mask(p), out=self._tmp, arena=self.arena))
+            elif p.vignette_str > EPS:
+                vig.append(i)
+        if vig:
+            masks = np.stack([mask(ps[i]) for i in vig])
+            if len(vig) == n: x *= masks[..., None]
+            else: x[vig] *= masks[..., None]
+        return list(to_uint8(x))
+
+    def step(self, frame, params_list, budget_ms=8.0, frame_idx=0):
+        # round-robin over params_list rendering as many variants as fit the
+        # budget (by the measured per-variant cost); -> {index: image}
+        n = len(params_list)
+        if n == 0: return {}
+        k = n if self.cost_ms is None else int(max(1, min(n, budget_ms/max(self.cost_ms, 1e-3))))
+        start = self._next % n
+        idx = [(start+j) % n for j in range(k)]
+        t0 = time.perf_counter()
+        imgs = self.render(frame, [params_list[i] for i in idx], frame_idx)
+        per = (time.perf_counter()-t0)*1000/k
+        self.cost_ms = per if self.cost_ms is None else 0.8*self.cost_ms + 0.2*per
+        self._next = start + k
+        return dict(zip(idx, imgs))
+
+def contact_sheet(images, labels=None, cols=None, pad=4):
+    # A/B grid of equally sized images with optional captions
+    n = len(images)
+    cols = cols or int(np.ceil(np.sqrt(n)))
+    rows = int(np.ceil(n/cols))
+    h, w = images[0].shape[:2]
+    sheet = np.zeros((rows*(h+pad)+pad, cols*(w+pad)+pad, 3), np.uint8)
+    for i, img in enumerate(images):
+        y, x = pad + (i//cols)*(h+pad), pad + (i % cols)*(w+pad)
+        sheet[y:y+h, x:x+w] = img
+        if labels:
+            cv2.putText(sheet, str(labels[i]), (x+6, y+h-8), cv2.FONT_HERSHEY_SIMPLEX, 0.45,
+                        (255, 255, 255), 1, cv2.LINE_AA)
+    return sheet
@@ -1,27 +1,90 @@
-import os, cv2, time, json
+import os, time, json, threading
+from dataclasses import replace
 from PySide6 import QtWidgets, QtGui, QtCore
 from ..utils.params import Params, ParamStore
-from ..rt.engine import RTProcessor
+from ..rt.governor import QualityGovernor
 from ..utils.config import read_config, write_config
-from ..utils.presets import list_presets, load_preset_by_name, apply_preset_to_params, save_user_preset
+from ..utils.presets import registry, apply_preset_to_params, save_user_preset
+from ..utils.startup import StartupMarks
+
+# Startup: only Qt and the light utils are imported with this module. The
+# window is built and shown straight away; the engine (numpy / OpenCV), the
+# frame source (camera open can take a second) and the preset index come up
+# on background threads and are handed to the UI thread through the `ready`
+# signal. Controls that need the pipeline stay disabled until then.
+# AURAFILM_PROFILE_STARTUP=1 prints the startup milestones.
+
+MAX_RAW_FPS = 60      # sizing cap for the raw maps (file sources report bogus rates)
+RECENT_PRESETS = 2    # previously used presets kept warm (see _warm_presets)
+RECORD_QUEUE_BYTES = 256 << 20  # frames the encoder may fall behind by (allocated on demand)
+
+class VideoWidget(QtWidgets.QWidget):
+    # copies the frame into a buffer of its own (the processor recycles its
+    # output buffers while this one may be repainted for a while), wraps that
+    # as a BGR888 QImage (no colour conversion) and scales it once, straight
+    # onto the widget, in paintEvent.
+    def __init__(self):
+        super().__init__()
+        self._frame = None
+        self._qimg = None
+        self.setMinimumSize(320, 180)
+        self.setAttribute(QtCore.Qt.WidgetAttribute.WA_OpaquePaintEvent)
+
+    @property
+    def frame(self):
+        # the frame on screen; owned by the widget, replaced by set_frame
+        return self._frame
 
-class VideoWidget(QtWidgets.QLabel):
     def set_frame(self, bgr):
-        rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
-        h,w,ch = rgb.shape
-        qimg = QtGui.QImage(rgb.data, w, h, ch*w, QtGui.QImage.Format.Format_RGB888)
-        self.setPixmap(QtGui.QPixmap.fromImage(qimg))
+        if self._frame is None or self._frame.shape != bgr.shape:
+            self._frame = bgr.copy()
+            h, w = bgr.shape[:2]
+            self._qimg = QtGui.QImage(self._frame.data, w, h, self._frame.strides[0], QtGui.QImage.Format.Format_BGR888)
+        else:
+            self._frame[...] = bgr
+        self.update()
+
+    def paintEvent(self, _ev):
+        qp = QtGui.QPainter(self)
+        qp.fillRect(self.rect(), QtCore.Qt.GlobalColor.black)
+        if self._qimg is not None:
+            size = self._qimg.size().scaled(self.size(), QtCore.Qt.AspectRatioMode.KeepAspectRatio)
+            target = QtCore.QRect(QtCore.QPoint(0, 0), size)
+            target.moveCenter(self.rect().center())
+            qp.setRenderHint(QtGui.QPainter.RenderHint.SmoothPixmapTransform)
+            qp.drawImage(target, self._qimg)
+        qp.end()
+
+class ThumbLabel(QtWidgets.QLabel):
+    clicked = QtCore.Signal(str)
+    def __init__(self, name):
+        super().__init__(name)
+        self.name = name
+        self.setToolTip(name)
+        self.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+    def mousePressEvent(self, _ev):
+        self.clicked.emit(self.name)
 
 class MainWindow(QtWidgets.QWidget):
-    def __init__(self, camera_index=0):
+    ready = QtCore.Signal(str, object)  # (what, payload) from the startup threads
+
+    def __init__(self, source=0):
+        # source: camera index, video / image sequence / .afraw path, or
+        # "synthetic"; files loop at their own frame rate
         super().__init__()
+        self.startup = StartupMarks()
         self.setWindowTitle("AURAfilm — Live Vintage")
-        cfg = read_config()
+        cfg = self.cfg = read_config()  # raw_seconds, replay_seconds, replay_dir are read on use
 
-        # Params & processor
+        # Params; processor, source and runner arrive from _boot
         p = Params(width=cfg["width"], height=cfg["height"], preset_name=cfg["last_preset"])
         self.params = ParamStore(p)
-        self.proc = RTProcessor(self.params)
+        self.governor = QualityGovernor(target_fps=30)
+        self.governor.enabled = False
+        self.proc = self.source = self.runner = self.variants = None
+        self._presets_ready = False
+        self._recent_presets = []  # most recent first, for _warm_presets
+        self._closed = False
         self.last_frame = None
 
         # --- Left: preview & status ---
@@ -34,15 +97,40 @@ class MainWindow(QtWidgets.QWidget):
         self.res_combo.setCurrentText(f"{p.width}x{p.height}")
         self.res_combo.currentTextChanged.connect(self.on_res_changed)
 
+        # Glow quality dropdown
+        self.quality_combo = QtWidgets.QComboBox()
+        self.quality_combo.addItems(["full","half","quarter"])
+        self.quality_combo.setCurrentText(p.quality)
+        self.quality_combo.currentTextChanged.connect(lambda q: self.params.update(quality=q))
+
+        # Adaptive quality: hold a target frame rate
+        self.chk_governor = QtWidgets.QCheckBox("Hold FPS")
+        self.chk_governor.stateChanged.connect(self.on_governor_toggled)
+        self.target_combo = QtWidgets.QComboBox()
+        self.target_combo.addItems(["24", "30", "60"])
+        self.target_combo.setCurrentText("30")
+        self.target_combo.currentTextChanged.connect(lambda t: self.governor.set_target(float(t)))
+
+        # Preset thumbnail strip (batched variant renders on a frame-time budget)
+        self.thumbs = {}
+        self._thumb_params = (None, [])
+        self.thumb_row = QtWidgets.QHBoxLayout()
+        self.thumb_strip = QtWidgets.QWidget()
+        self.thumb_strip.setLayout(self.thumb_row)
+        self.thumb_strip.setVisible(False)
+        self.chk_thumbs = QtWidgets.QCheckBox("Preset Thumbnails")
+        self.chk_thumbs.stateChanged.connect(lambda _: self.thumb_strip.setVisible(self.chk_thumbs.isChecked()))
+
         # Preset controls
         self.preset_combo = QtWidgets.QComboBox()
-        self._refresh_preset_combo()
-        if self.preset_combo.findText(p.preset_name) >= 0:
-            self.preset_combo.setCurrentText(p.preset_name)
+        self.preset_combo.addItem(p.preset_name)  # placeholder until the index is built
+        self.preset_combo.setEnabled(False)
         self.preset_combo.currentTextChanged.connect(self.on_preset_changed)
         self.btn_save_preset = QtWidgets.QPushButton("Save Preset…")
         self.btn_load_preset = QtWidgets.QPushButton("Load Preset YAML…")
         self.btn_reset = QtWidgets.QPushButton("Reset Sliders")
+        self.btn_look = QtWidgets.QPushButton("Load LUT (.cube)…")
+        self.btn_look.clicked.connect(self.on_load_look)
         self.btn_save_preset.clicked.connect(self.on_save_preset)
         self.btn_load_preset.clicked.connect(self.on_load_preset)
         self.btn_reset.clicked.connect(self.on_reset)
@@ -55,18 +143,37 @@ class MainWindow(QtWidgets.QWidget):
         self.s_vig = self._slider(0, 100, int(p.vignette_str*100), "Vignette")
         self.s_ca = self._slider(0, 20,  int(p.ca_pixels*10), "Chromatic Aberration")
         self.s_flicker = self._slider(0, 50, int(p.flicker*100), "Flicker")
-        self.s_weave = self._slider(0, 10, int(p.weave), "Gate Weave")
+        self.s_weave = self._slider(0, 100, int(p.weave*10), "Gate Weave")
+        self.s_dist = self._slider(-20, 20, int(p.distortion*100), "Lens Distortion")
 
         self.lock_grain = QtWidgets.QCheckBox("Lock Grain (no boil)")
         self.lock_grain.setChecked(p.lock_grain)
         self.lock_grain.stateChanged.connect(lambda _: self.params.update(lock_grain=self.lock_grain.isChecked()))
 
+        # Profiling panel
+        self.chk_timings = QtWidgets.QCheckBox("Show Timings")
+        self.chk_timings.stateChanged.connect(self.on_timings_toggled)
+        self.btn_trace = QtWidgets.QPushButton("Dump Trace")
+        self.btn_trace.clicked.connect(self.on_dump_trace)
+        self.timings_label = QtWidgets.QLabel()
+        self.timings_label.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.SystemFont.FixedFont))
+        self.timings_label.setVisible(False)
+
         # Buttons
         self.btn_photo = QtWidgets.QPushButton("Capture Photo")
         self.btn_rec = QtWidgets.QPushButton("Start Recording")
         self.btn_photo.clicked.connect(self.capture_photo)
         self.btn_rec.clicked.connect(self.toggle_recording)
 
+        # Raw capture (re-gradable later) and instant replay
+        self.btn_raw = QtWidgets.QPushButton("Start Raw")
+        self.btn_raw.clicked.connect(self.toggle_raw)
+        self.chk_replay = QtWidgets.QCheckBox(f"Replay Buffer ({cfg['replay_seconds']:g}s)")
+        self.chk_replay.stateChanged.connect(self.on_replay_toggled)
+        self.btn_replay = QtWidgets.QPushButton("Save Replay")
+        self.btn_replay.setEnabled(False)
+        self.btn_replay.clicked.connect(self.save_replay)
+
         # Wire sliders
         self.s_contrast["slider"].valueChanged.connect(self.on_contrast)
         self.s_grain["slider"].valueChanged.connect(self.on_grain)
@@ -76,13 +183,17 @@ class MainWindow(QtWidgets.QWidget):
         self.s_ca["slider"].valueChanged.connect(self.on_ca)
         self.s_flicker["slider"].valueChanged.connect(self.on_flicker)
         self.s_weave["slider"].valueChanged.connect(self.on_weave)
+        self.s_dist["slider"].valueChanged.connect(self.on_distortion)
 
         # Right panel layout
         right = QtWidgets.QFormLayout()
         right.addRow("Preset", self.preset_combo)
         right.addRow(self.btn_save_preset, self.btn_load_preset)
-        right.addRow(self.btn_reset)
+        right.addRow(self.btn_reset, self.btn_look)
+        right.addRow(self.chk_thumbs)
         right.addRow("Resolution", self.res_combo)
+        right.addRow("Glow Quality", self.quality_combo)
+        right.addRow(self.chk_governor, self.target_combo)
         right.addRow("FPS", self.fps_label)
         right.addRow(self.s_contrast["label"], self.s_contrast["slider"])
         right.addRow(self.s_grain["label"], self.s_grain["slider"])
@@ -92,33 +203,117 @@ class MainWindow(QtWidgets.QWidget):
         right.addRow(self.s_ca["label"], self.s_ca["slider"])
         right.addRow(self.s_flicker["label"], self.s_flicker["slider"])
         right.addRow(self.s_weave["label"], self.s_weave["slider"])
+        right.addRow(self.s_dist["label"], self.s_dist["slider"])
         right.addRow(self.lock_grain)
         right.addRow(self.btn_photo, self.btn_rec)
+        right.addRow(self.btn_raw)
+        right.addRow(self.chk_replay, self.btn_replay)
+        right.addRow(self.chk_timings, self.btn_trace)
+        right.addRow(self.timings_label)
 
         layout = QtWidgets.QHBoxLayout(self)
-        layout.addWidget(self.preview, stretch=3)
+        left = QtWidgets.QVBoxLayout()
+        left.addWidget(self.preview, stretch=1)
+        left.addWidget(self.thumb_strip)
+        layout.addLayout(left, stretch=3)
         col = QtWidgets.QWidget(); col.setLayout(right)
         layout.addWidget(col, stretch=1)
 
-        # Camera
-        self.cap = cv2.VideoCapture(camera_index, cv2.CAP_DSHOW)
-        self._apply_resolution(p.width, p.height)
+        # need the pipeline: enabled once _boot has delivered it
+        self._pipeline_controls = [self.btn_photo, self.btn_rec, self.btn_raw, self.chk_replay,
+                                   self.chk_timings, self.btn_trace]
+        for w in self._pipeline_controls: w.setEnabled(False)
 
-        # Timer loop
+        # Present loop
         self.rec = False
-        self.writer = None
-        self.t_last = time.time()
+        self.recorder = None
+        self.raw_take = None
+        self.replay = None
+        self._replay_busy = False    # a save (export + graded render) is running
+        self._replay_paused = False  # the buffer is being exported: no writes
+        self._replay_thread = None
+        self._replay_exported = threading.Event()
+        self._replay_cancel = threading.Event()
         self.timer = QtCore.QTimer(self)
         self.timer.timeout.connect(self.tick)
-        self.timer.start(0)
+        self.timer.start(5)
 
-        os.makedirs("captures", exist_ok=True)
+        # Window size from config
+        self.resize(*cfg.get("window", [1200,700]))
+
+        # Source -> capture thread -> processing thread -> UI, and the preset
+        # index, both off the UI thread
+        self.ready.connect(self._on_ready)
+        threading.Thread(target=self._boot, args=(source, (p.width, p.height)),
+                         name="aurafilm-boot", daemon=True).start()
+        threading.Thread(target=self._index_presets, name="aurafilm-index", daemon=True).start()
+
+    # ---------- startup ----------
+    def _boot(self, source, size):
+        # background: import the engine, build the processor, open the source
+        src = None
+        try:
+            from ..rt.engine import RTProcessor
+            from ..rt.sources import open_source, Prefetch
+            from ..rt.variants import VariantRenderer
+            proc = RTProcessor(self.params, tiles="auto", governor=self.governor)
+            synthetic = isinstance(source, str) and source.startswith("synthetic")
+            src = open_source(source, size=size, **({"realtime": True} if synthetic else {}))
+            if not src.live: src = Prefetch(src, 4)  # decode ahead of the pacing
+            variants = VariantRenderer(width=160)
+        except Exception as e:
+            if src is not None: src.close()
+            if isinstance(e, (OSError, ValueError)):
+                self.ready.emit("error", f"Could not open source {source!r}:\n{e}")
+            else:  # anything else (a missing module, cv2.error, ...)
+                self.ready.emit("error", f"Could not start the pipeline:\n{type(e).__name__}: {e}")
+            return
+        self.ready.emit("pipeline", (proc, src, variants))
 
-        # Apply the startup preset if found
-        self._apply_current_preset()
+    def _index_presets(self):
+        # background: stat the preset files; only new or changed ones are parsed
+        try:
+            names = registry().names()
+        except Exception as e:
+            self.ready.emit("error", f"Could not index the presets:\n{type(e).__name__}: {e}")
+            return
+        self.ready.emit("presets", names)
 
-        # Window size from config
-        self.resize(*read_config().get("window", [1200,700]))
+    def _on_ready(self, what, payload):
+        if what == "error":
+            QtWidgets.QMessageBox.warning(self, "Error", payload)
+            return
+        if what == "pipeline":
+            proc, src, variants = payload
+            if self._closed:
+                src.close()
+                return
+            from ..rt.pipeline import PipelineRunner
+            from ..rt.sources import PacedReader
+            self.proc, self.source, self.variants = proc, src, variants
+            self.runner = PipelineRunner(PacedReader(src), proc)  # files play at their rate and loop
+            self.runner.on_error = lambda msg: self.ready.emit("error", f"Pipeline stopped:\n{msg}")
+            p = self.params.snapshot()
+            if src.size != (p.width, p.height): self._apply_resolution(p.width, p.height)
+            self.runner.start()
+            for w in self._pipeline_controls: w.setEnabled(True)
+            self.startup.mark("pipeline ready")
+        elif what == "replay":
+            self._replay_busy = False
+            self.btn_replay.setEnabled(self.replay is not None)
+            if payload and not self._closed: QtWidgets.QMessageBox.warning(self, "Replay", payload)
+            return
+        elif what == "presets":
+            self._presets_ready = True
+            self._refresh_preset_combo(payload)  # keeps the placeholder's (configured) name selected
+            self.preset_combo.setEnabled(True)
+            self._apply_current_preset()
+            self.startup.mark("presets indexed")
+        self._warm_presets()
+
+    def showEvent(self, e):
+        self.startup.mark("window shown")
+        return super().showEvent(e)
 
     # ---------- helpers ----------
     def _slider(self, lo, hi, val, text):
@@ -127,58 +322,114 @@ class MainWindow(QtWidgets.QWidget):
         return {"slider": s, "label": QtWidgets.QLabel(text)}
 
     def _apply_resolution(self, w,h):
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, w)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, h)
-
-    def _refresh_preset_combo(self):
-        names = []
-        for p in list_presets():
-            try:
-                d = __import__("yaml").safe_load(open(p, "r", encoding="utf-8"))
-                if d and "name" in d: names.append(d["name"])
-            except Exception:
-                pass
+        # the source negotiates the size (and resizes only if it must)
+        if self.runner is None: return  # _on_ready reconciles the size
+        self.runner.call_in_capture(lambda: self.source.set_size(w, h))
+
+    def _refresh_preset_combo(self, names=None):
+        if names is None: names = registry().refresh()
+        self.preset_combo.blockSignals(True)
+        cur = self.preset_combo.currentText()
         self.preset_combo.clear()
-        self.preset_combo.addItems(sorted(set(names)))
+        self.preset_combo.addItems(names)
+        if cur in names: self.preset_combo.setCurrentText(cur)
+        self.preset_combo.blockSignals(False)
+        self._rebuild_thumbs(names)
+
+    def _rebuild_thumbs(self, names):
+        for lbl in self.thumbs.values():
+            self.thumb_row.removeWidget(lbl)
+            lbl.deleteLater()
+        self.thumbs = {}
+        for n in names:
+            lbl = ThumbLabel(n)
+            lbl.clicked.connect(self.preset_combo.setCurrentText)
+            self.thumb_row.addWidget(lbl)
+            self.thumbs[n] = lbl
+        self._thumb_params = (None, [])
+
+    def _update_thumbs(self, budget_ms=6.0):
+        # renders as many thumbnails as fit the budget, round-robin
+        frame = self.runner.last_source
+        if frame is None or not self.thumbs: return
+        version, cur = self.params.versioned()
+        key = (version, tuple(self.thumbs))
+        if self._thumb_params[0] != key:
+            # each thumbnail shows the preset as it would look if picked now
+            reg = registry()
+            self._thumb_params = (key, [reg.params(n, cur) or cur for n in self.thumbs])
+        names = list(self.thumbs)
+        prof = self.proc.profiler
+        t = prof.start()
+        for i, img in self.variants.step(frame, self._thumb_params[1], budget_ms).items():
+            h, w = img.shape[:2]
+            qimg = QtGui.QImage(img.data, w, h, 3*w, QtGui.QImage.Format.Format_BGR888)
+            self.thumbs[names[i]].setPixmap(QtGui.QPixmap.fromImage(qimg))
+        prof.stop("thumbnails", t)
+
+    def _warm_presets(self):
+        # precompile, in the background, the derived state of the presets the
+        # user is likely to pick next: the most recently used ones, then the
+        # neighbours of the active one in the list. Only as many as the caches
+        # hold (full-frame masks and grain banks are large): warming a whole
+        # library would evict its own earlier work and leave every switch
+        # cold, so presets further away are built on first use instead. The
+        # active preset goes last so it stays most recent.
+        if self.proc is None or not self._presets_ready: return
+        p = self.params.snapshot()
+        names = registry().names()
+        order = [n for n in self._recent_presets if n in names]
+        if p.preset_name in names:
+            i = names.index(p.preset_name)
+            for k in range(1, len(names)):
+                order += [names[(i+k) % len(names)], names[(i-k) % len(names)]]
+        picked = []
+        for n in order:
+            if len(picked) >= self.proc.warm_capacity-1: break
+            if n != p.preset_name and n not in picked: picked.append(n)
+        names = picked + [p.preset_name]
+        threading.Thread(target=registry().warm, args=(self.proc, p, p.width, p.height, names),
+                         name="aurafilm-warm", daemon=True).start()
 
     def _apply_current_preset(self):
         name = self.preset_combo.currentText()
-        preset = load_preset_by_name(name)
+        preset = registry().get(name)
         if preset:
-            apply_preset_to_params(preset, self.params.snapshot())
+            # one atomic swap; the processor rebuilds only what actually changed
+            self.params.apply(lambda cur: apply_preset_to_params(preset, cur))
             self._sync_sliders_from_params()
-            # tone/vignette caches need recompute
-            self.proc.params_changed(recalc_tone=True, recalc_vignette=True)
 
     def _sync_sliders_from_params(self):
+        # signals blocked: slider positions are rounded and must not write
+        # quantized values back into the params
         p = self.params.snapshot()
-        self.s_contrast["slider"].setValue(int(p.contrast*10))
-        self.s_grain["slider"].setValue(int(p.grain_strength*100))
-        self.s_hal_str["slider"].setValue(int(p.hal_str*100))
-        self.s_bloom["slider"].setValue(int(p.bloom_str*100))
-        self.s_vig["slider"].setValue(int(p.vignette_str*100))
-        self.s_ca["slider"].setValue(int(p.ca_pixels*10))
-        self.s_flicker["slider"].setValue(int(p.flicker*100))
-        self.s_weave["slider"].setValue(int(p.weave))
+        for s, v in ((self.s_contrast, int(p.contrast*10)), (self.s_grain, int(p.grain_strength*100)),
+                     (self.s_hal_str, int(p.hal_str*100)), (self.s_bloom, int(p.bloom_str*100)),
+                     (self.s_vig, int(p.vignette_str*100)), (self.s_ca, int(p.ca_pixels*10)),
+                     (self.s_flicker, int(p.flicker*100)), (self.s_weave, int(p.weave*10)),
+                     (self.s_dist, int(p.distortion*100))):
+            s["slider"].blockSignals(True)
+            s["slider"].setValue(v)
+            s["slider"].blockSignals(False)
 
     # ---------- slider handlers ----------
-    def on_contrast(self, v):
-        self.params.update(contrast=max(0.1, v/10.0))
-        self.proc.params_changed(recalc_tone=True, recalc_vignette=False)
+    def on_contrast(self, v): self.params.update(contrast=max(0.1, v/10.0))
     def on_grain(self, v): self.params.update(grain_strength=v/100.0)
     def on_hal(self, v):   self.params.update(hal_str=v/100.0)
     def on_bloom(self, v): self.params.update(bloom_str=v/100.0)
-    def on_vignette(self, v):
-        self.params.update(vignette_str=v/100.0)
-        self.proc.params_changed(recalc_tone=False, recalc_vignette=True)
+    def on_vignette(self, v): self.params.update(vignette_str=v/100.0)
     def on_ca(self, v):    self.params.update(ca_pixels=v/10.0)
     def on_flicker(self, v): self.params.update(flicker=v/100.0)
-    def on_weave(self, v):   self.params.update(weave=float(v))
+    def on_weave(self, v):   self.params.update(weave=v/10.0)
+    def on_distortion(self, v): self.params.update(distortion=v/100.0)
 
     # ---------- preset actions ----------
     def on_preset_changed(self, _name):
+        prev = self.params.snapshot().preset_name
+        self._recent_presets = ([prev] + [n for n in self._recent_presets if n != prev])[:RECENT_PRESETS]
         self.params.update(preset_name=self.preset_combo.currentText())
         self._apply_current_preset()
+        self._warm_presets()  # the neighbours changed
 
     def on_save_preset(self):
         name, ok = QtWidgets.QInputDialog.getText(self, "Save Preset", "Preset name:")
@@ -198,14 +449,24 @@ class MainWindow(QtWidgets.QWidget):
         except Exception as e:
             QtWidgets.QMessageBox.warning(self, "Error", f"Could not load preset:\n{e}")
             return
-        apply_preset_to_params(preset, self.params.snapshot())
-        self.params.update(preset_name=preset.get("name", os.path.splitext(os.path.basename(path))[0]))
+        name = preset.get("name", os.path.splitext(os.path.basename(path))[0])
+        self.params.apply(lambda cur: replace(apply_preset_to_params(preset, cur), preset_name=name))
         self._sync_sliders_from_params()
-        self.proc.params_changed(recalc_tone=True, recalc_vignette=True)
         self._refresh_preset_combo()
         i = self.preset_combo.findText(self.params.snapshot().preset_name)
         if i>=0: self.preset_combo.setCurrentIndex(i)
 
+    def on_load_look(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Load 3D LUT", "", "Cube LUT (*.cube)")
+        if not path: return
+        from ..rt.lut3d import read_cube
+        try:
+            read_cube(path)
+        except Exception as e:
+            QtWidgets.QMessageBox.warning(self, "Error", f"Could not load LUT:\n{e}")
+            return
+        self.params.update(look_cube=path)
+
     def on_reset(self):
         # Reload the selected preset defaults
         self._apply_current_preset()
@@ -215,32 +476,78 @@ class MainWindow(QtWidgets.QWidget):
         w,h = map(int, text.split("x"))
         self.params.update(width=w, height=h)
         self._apply_resolution(w,h)
-        self.proc.params_changed(recalc_tone=False, recalc_vignette=True)
+        self._warm_presets()
+        if self.replay is not None:  # the buffer is sized per resolution
+            self.chk_replay.setChecked(False); self.chk_replay.setChecked(True)
 
     def tick(self):
-        ok, frame = self.cap.read()
-        if not ok: return
-        p = self.params.snapshot()
-        if frame.shape[1]!=p.width or frame.shape[0]!=p.height:
-            frame = cv2.resize(frame, (p.width, p.height))
-        out = self.proc.process(frame)
-        self.last_frame = out
+        if self.runner is None: return
+        out = self.runner.poll_preview()
+        if out is None: return
+        if self.last_frame is None: self.startup.mark("first frame")
+        prof = self.proc.profiler
+        t = prof.start()
         self.preview.set_frame(out)
+        self.last_frame = self.preview.frame  # `out` goes back to the processor's ring
+        prof.stop("display", t)
+        if self.chk_thumbs.isChecked():
+            self._update_thumbs()
 
         now = time.time()
-        dt = now - getattr(self, "_t_last", now)
-        if dt>0: self.fps_label.setText(f"FPS: {int(1.0/dt)}")
-        self._t_last = now
-
-        if getattr(self, "rec", False) and getattr(self, "writer", None):
-            self.writer.write(out)
+        if now - getattr(self, "_t_stats", 0) > 0.5:
+            s = self.runner.stats_dict()
+            drops = s["capture"]["dropped"] + s["present"]["dropped"]
+            self.fps_label.setText(f"FPS: {s['present']['fps']:.0f}  proc {s['process']['avg_ms']:.1f}ms"
+                                   f"  lat {s['present']['avg_ms']:.0f}ms  drop {drops}")
+            if self.governor.enabled:
+                g = self.governor
+                self.fps_label.setText(self.fps_label.text() + f"\nquality {g.level}: {g.name}")
+            if self.recorder is not None:
+                r = self.recorder.stats()
+                self.fps_label.setText(self.fps_label.text() +
+                                       f"\nREC {r['written']} fr @ {r['fps']:g}  dup {r['dups']}  drop "
+                                       f"{r['drops'] + s['record'].get('dropped', 0)}  queue {s['record'].get('queued', 0)}"
+                                       f"  enc {r['encode_ms']:.1f}ms")
+            if self.raw_take is not None:
+                r = self.raw_take.stats()
+                self.fps_label.setText(self.fps_label.text() +
+                                       f"\nRAW {r['frames']}/{r['slots']} fr  drop {r['dropped']}")
+            if prof.enabled:
+                self.proc.stats()
+                self.timings_label.setText(prof.format_table())
+            self._t_stats = now
+
+    def on_governor_toggled(self, _state):
+        self.governor.reset()
+        self.governor.enabled = self.chk_governor.isChecked()
+
+    # ---------- profiling ----------
+    def on_timings_toggled(self, _state):
+        if self.proc is None: return
+        on = self.chk_timings.isChecked()
+        self.proc.profiler.enabled = on
+        self.timings_label.setVisible(on)
+        if on: self.proc.profiler.reset()
+
+    def on_dump_trace(self):
+        ts = QtCore.QDateTime.currentDateTime().toString("yyyyMMdd_HHmmss")
+        base = self._capture_path(f"trace_{ts}")
+        self.proc.stats()
+        self.proc.profiler.dump_json(base + ".json")
+        self.proc.profiler.dump_csv(base + ".csv")
+        QtWidgets.QMessageBox.information(self, "Trace", f"Saved trace:\n{base}.json\n{base}.csv")
 
     # ---------- capture / record ----------
+    def _capture_path(self, name):
+        os.makedirs("captures", exist_ok=True)  # on first capture, not at startup
+        return os.path.join("captures", name)
+
     def capture_photo(self):
         if self.last_frame is None: return
+        import cv2
         ts = QtCore.QDateTime.currentDateTime().toString("yyyyMMdd_HHmmss")
-        base = f"captures/{ts}_{self.params.snapshot().preset_name}"
-        cv2.imwrite(base + ".jpg", self.last_frame)
+        base = self._capture_path(f"{ts}_{self.params.snapshot().preset_name}")
+        cv2.imwrite(base + ".jpg", self.last_frame.copy())
         # optional metadata sidecar
         with open(base + ".json", "w", encoding="utf-8") as f:
             json.dump(self.params.to_dict(), f, indent=2)
@@ -250,25 +557,147 @@ class MainWindow(QtWidgets.QWidget):
         self.rec = not rec
         if self.rec:
             ts = QtCore.QDateTime.currentDateTime().toString("yyyyMMdd_HHmmss")
-            fourcc = cv2.VideoWriter_fourcc(*"mp4v")
             p = self.params.snapshot()
-            base = f"captures/{ts}_{p.preset_name}"
-            self.writer = cv2.VideoWriter(base + ".mp4", fourcc, 30, (p.width, p.height))
+            base = self._capture_path(f"{ts}_{p.preset_name}")
+            from ..rt.recorder import Recorder
+            try:
+                self.recorder = Recorder(base, (p.width, p.height), fps=self._record_fps())
+            except IOError as e:
+                self.rec = False
+                QtWidgets.QMessageBox.warning(self, "Error", str(e))
+                return
+            # lossless: a slow encoder holds processing back (the preview slows,
+            # the capture queue drops) instead of dropping processed frames. The
+            # queue holds its own copies: bound it by memory, not frames
+            depth = max(8, min(90, RECORD_QUEUE_BYTES // (p.width*p.height*3)))
+            self.runner.start_recording(self.recorder, depth=depth, policy="block")
             with open(base + ".json", "w", encoding="utf-8") as f:
                 json.dump(self.params.to_dict(), f, indent=2)
             self.btn_rec.setText("Stop Recording")
         else:
-            if getattr(self, "writer", None):
-                self.writer.release(); self.writer=None
+            self.runner.stop_recording()
+            if self.recorder is not None:
+                self.recorder.close(); self.recorder = None
             self.btn_rec.setText("Start Recording")
 
+    # ---------- raw capture / instant replay ----------
+    def _raw_sink(self, frame, ts, seq):
+        # capture thread: a memcpy into each active map
+        take, replay = self.raw_take, self.replay
+        if take is not None: take.write(frame, ts, seq=seq)
+        if replay is not None and not self._replay_paused: replay.write(frame, ts, seq=seq)
+
+    def _update_raw_tap(self):
+        if self.raw_take is not None or self.replay is not None: self.runner.start_raw(self._raw_sink)
+        else: self.runner.stop_raw()
+
+    def _close_raw(self, attr):
+        # detach from the capture thread before closing the map
+        ring = getattr(self, attr)
+        self.runner.stop_raw()
+        setattr(self, attr, None)
+        self._update_raw_tap()
+        if ring is not None: ring.close()
+        return ring
+
+    def toggle_raw(self):
+        if self.raw_take is None:
+            ts = QtCore.QDateTime.currentDateTime().toString("yyyyMMdd_HHmmss")
+            p = self.params.snapshot()
+            base = self._capture_path(f"{ts}_raw")
+            from ..rt.rawring import RawRing
+            try:
+                self.raw_take = RawRing.for_seconds(base + ".afraw", p.width, p.height, float(self.cfg["raw_seconds"]),
+                                                    min(self._record_fps(), MAX_RAW_FPS), overwrite=False)
+            except (OSError, ValueError) as e:
+                QtWidgets.QMessageBox.warning(self, "Error", str(e))
+                return
+            self.raw_take.set_fps(self._record_fps())
+            with open(base + ".json", "w", encoding="utf-8") as f:
+                json.dump(self.params.to_dict(), f, indent=2)
+            self._update_raw_tap()
+            self.btn_raw.setText("Stop Raw")
+        else:
+            self._close_raw("raw_take")
+            self.btn_raw.setText("Start Raw")
+
+    def on_replay_toggled(self, _state):
+        if self.chk_replay.isChecked():
+            p = self.params.snapshot()
+            # not the temp dir: that is often tmpfs, i.e. RAM
+            d = self.cfg["replay_dir"] or "captures"
+            path = os.path.join(d, f".replay_{os.getpid()}.afraw")
+            from ..rt.rawring import RawRing
+            try:
+                self.replay = RawRing.for_seconds(path, p.width, p.height, float(self.cfg["replay_seconds"]),
+                                                  min(self._record_fps(), MAX_RAW_FPS))
+            except (OSError, ValueError) as e:
+                QtWidgets.QMessageBox.warning(self, "Error", str(e))
+                return
+            self._update_raw_tap()
+        else:
+            if self._replay_busy: self._replay_exported.wait()  # the save still reads the buffer
+            ring = self._close_raw("replay")
+            if ring is not None:
+                try: os.remove(ring.path)
+                except OSError: pass
+        self.btn_replay.setEnabled(self.replay is not None and not self._replay_busy)
+
+    def save_replay(self):
+        # raw copy of the buffer, then a graded render of it, both on a worker
+        # thread; the button stays disabled until the render is done
+        if self.replay is None or self._replay_busy: return
+        self._replay_busy = True
+        self.btn_replay.setEnabled(False)
+        ts = QtCore.QDateTime.currentDateTime().toString("yyyyMMdd_HHmmss")
+        p = self.params.snapshot()
+        base = self._capture_path(f"{ts}_replay")
+        ring, runner = self.replay, self.runner
+        self._replay_exported.clear()
+        self._replay_cancel.clear()
+        def job():
+            err = None
+            try:
+                self._replay_paused = True
+                try:
+                    runner.sync_capture()  # no write in flight into the buffer
+                    ring.export(base + ".afraw")
+                finally:
+                    self._replay_paused = False
+                    self._replay_exported.set()
+                from ..rt.render import render
+                r = render(base + ".afraw", base + ".mp4", p, workers=1, cancel=self._replay_cancel)
+                if r["cancelled"]:  # window closed: no truncated mp4; the .afraw can be rendered later
+                    os.remove(base + ".mp4")
+            except Exception as e:
+                err = f"saving the replay failed: {e}"
+            self.ready.emit("replay", err)
+        self._replay_thread = threading.Thread(target=job, name="aurafilm-replay")
+        self._replay_thread.start()
+
+    def _record_fps(self):
+        # the measured capture rate, else what the device reports, else 30
+        fps = self.runner.stats["capture"].fps
+        if fps < 1: fps = self.source.fps
+        return round(float(fps), 2)
+
     # ---------- persist window + last settings ----------
     def closeEvent(self, e):
         p = self.params.snapshot()
-        cfg = {
+        cfg = dict(self.cfg, **{
             "last_preset": p.preset_name,
             "width": p.width, "height": p.height,
             "window": [self.width(), self.height()]
-        }
+        })  # keeps keys the UI does not edit (raw_seconds, ...)
         write_config(cfg)
+        self._closed = True
+        self._replay_cancel.set()
+        if self.runner is not None:
+            self.runner.stop()
+            if self.recorder is not None: self.recorder.close()
+            if self.raw_take is not None: self._close_raw("raw_take")
+            if self.replay is not None:
+                self.chk_replay.setChecked(False)
+        if self.source is not None: self.source.close()
+        if self._replay_thread is not None: self._replay_thread.join()  # stops after the chunk in flight
         return super().closeEvent(e)
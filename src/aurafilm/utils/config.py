@@ -1,13 +1,15 @@
 import os, json
 CFG_DIR  = os.path.join(os.path.expanduser("~"), ".aurafilm")
 CFG_PATH = os.path.join(CFG_DIR, "config.json")
-os.makedirs(CFG_DIR, exist_ok=True)
 
 DEFAULT_CFG = {
     "last_preset": "portra_00s",
     "width": 1280,
     "height": 720,
-    "window": [1200, 700]
+    "window": [1200, 700],
+    "raw_seconds": 60,     # longest raw take (preallocated, trimmed on stop)
+    "replay_seconds": 10,  # instant replay buffer
+    "replay_dir": "",      # where the replay buffer lives; "" = the captures dir
 }
 
 def read_config():
@@ -25,6 +27,7 @@ def read_config():
 
 def write_config(cfg: dict):
     try:
+        os.makedirs(CFG_DIR, exist_ok=True)  # on first write, not at import
         with open(CFG_PATH, "w", encoding="utf-8") as f:
             json.dump(cfg, f, indent=2)
     except Exception:
@@ -1,7 +1,9 @@
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, fields, replace
 from threading import RLock
 
-@dataclass
+# Params is immutable: every change produces a new object, so a snapshot
+# handed to the processing thread can never be half-updated.
+@dataclass(frozen=True)
 class Params:
     # resolution
     width: int = 1280
@@ -13,6 +15,16 @@ class Params:
     lift: float = 0.01
     gamma: float = 1.02
     gain: float = 1.03
+    # colour (baked into a 3D LUT together with the tone curve when active)
+    balance_r: float = 1.0
+    balance_g: float = 1.0
+    balance_b: float = 1.0
+    mono: float = 0.0          # 0 = colour, 1 = fully monochrome
+    mono_r: float = 0.2126     # monochrome channel mix
+    mono_g: float = 0.7152
+    mono_b: float = 0.0722
+    look_cube: str = ""        # optional external .cube applied after the tone
+    lut3d_size: int = 33
     # grain
     grain_strength: float = 0.12
     grain_scale: float = 1.2
@@ -30,24 +42,45 @@ class Params:
     ca_pixels: float = 0.6
     vignette_str: float = 0.18
     vignette_round: float = 0.7
+    distortion: float = 0.0    # radial lens distortion k1 (>0 barrel, <0 pincushion)
     # temporal
     flicker: float = 0.02
     weave: float = 0.5
+    # glow quality: "full" | "half" | "quarter"
+    quality: str = "full"
     # preset
     preset_name: str = "portra_00s"
 
+PARAM_FIELDS = frozenset(f.name for f in fields(Params))
+
 class ParamStore:
+    # copy-on-write holder of the current Params; version increments on every
+    # effective change
     def __init__(self, p: Params):
         self._p = p
         self._lock = RLock()
+        self.version = 0
     def snapshot(self) -> Params:
         with self._lock:
             return self._p
-    def update(self, **kw):
+    def versioned(self):
+        with self._lock:
+            return self.version, self._p
+    def update(self, **kw) -> bool:
+        with self._lock:
+            kw = {k:v for k,v in kw.items() if k in PARAM_FIELDS and getattr(self._p, k) != v}
+            if not kw: return False
+            self._p = replace(self._p, **kw)
+            self.version += 1
+            return True
+    def apply(self, fn) -> bool:
+        # atomically replace the params with fn(current) (e.g. applying a preset)
         with self._lock:
-            for k,v in kw.items():
-                if hasattr(self._p, k):
-                    setattr(self._p, k, v)
+            new = fn(self._p)
+            if new == self._p: return False
+            self._p = new
+            self.version += 1
+            return True
     def to_dict(self):
         with self._lock:
             return asdict(self._p)
@@ -1,10 +1,12 @@
-import os, glob, yaml
-from dataclasses import asdict
+import os, glob, json, threading
+from dataclasses import asdict, replace
 from .params import Params
 
 PRESETS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "presets")
 USER_PRESETS_DIR = os.path.join(os.path.expanduser("~"), ".aurafilm", "presets")
-os.makedirs(USER_PRESETS_DIR, exist_ok=True)
+INDEX_PATH = os.path.join(os.path.expanduser("~"), ".aurafilm", "preset_index.json")
+# no filesystem side effects at import: directories are created on first
+# write, and yaml is only imported once a preset actually has to be parsed
 
 def list_presets():
     files = []
@@ -12,46 +14,183 @@ def list_presets():
     files += sorted(glob.glob(os.path.join(USER_PRESETS_DIR, "*.yaml")))
     return files
 
-def load_preset_by_name(name: str) -> dict | None:
-    for p in list_presets():
+def _stat_key(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+def _parse(path):
+    import yaml
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+    except Exception:
+        return None
+    return data if isinstance(data, dict) and data.get("name") else None
+
+class PresetRegistry:
+    # name -> path index over the preset dirs. Files are only re-parsed when
+    # their (mtime, size) changes; parsed presets are cached, so lookups are a
+    # dict hit plus one stat. With index_path set, the name of every file is
+    # persisted so a restart does not have to parse unchanged presets.
+    # On duplicate names the first file in list_presets() order wins.
+    def __init__(self, index_path=None):
+        self.index_path = index_path
+        self._files = {}   # path -> (stat key, name)
+        self._parsed = {}  # path -> (stat key, preset dict)
+        self._by_name = {}
+        self._lock = threading.RLock()
+        self.parses = 0
+        self._load_index()
+        self.refresh()
+
+    def _load_index(self):
+        if not self.index_path: return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._files = {p: (tuple(v[0]), v[1]) for p, v in data.get("files", {}).items()}
+        except (OSError, ValueError, TypeError, IndexError):
+            self._files = {}
+
+    def _save_index(self):
+        if not self.index_path: return
         try:
-            data = yaml.safe_load(open(p, "r", encoding="utf-8"))
-        except Exception:
-            continue
-        if data and data.get("name") == name:
-            return data
-    return None
-
-def apply_preset_to_params(preset: dict, params: Params):
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            tmp = self.index_path + f".{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"files": {p: [list(k), n] for p, (k, n) in self._files.items()}}, f)
+            os.replace(tmp, self.index_path)
+        except OSError:
+            pass  # the index is only a startup shortcut
+
+    def _load(self, path, key):
+        data = _parse(path)
+        self.parses += 1
+        if data is not None:
+            self._parsed[path] = (key, data)
+        return data
+
+    def refresh(self):
+        # stat every preset file, parse only new or changed ones
+        with self._lock:
+            files, changed = {}, False
+            for path in list_presets():
+                try:
+                    key = _stat_key(path)
+                except OSError:
+                    continue
+                known = self._files.get(path)
+                if known and known[0] == key:
+                    files[path] = known
+                    continue
+                data = self._load(path, key)
+                files[path] = (key, data["name"] if data else None)
+                changed = True
+            changed |= files.keys() != self._files.keys()
+            self._files = files
+            self._parsed = {p: v for p, v in self._parsed.items() if p in files}
+            self._by_name = {}
+            for path, (_, name) in files.items():
+                if name: self._by_name.setdefault(name, path)
+            if changed: self._save_index()
+            return self.names()
+
+    def names(self):
+        return sorted(self._by_name)
+
+    def path(self, name):
+        return self._by_name.get(name)
+
+    def get(self, name):
+        # parsed preset dict, or None; the returned dict is shared, do not mutate
+        with self._lock:
+            for attempt in (0, 1):
+                path = self._by_name.get(name)
+                if path is not None:
+                    try:
+                        key = _stat_key(path)
+                    except OSError:
+                        key = None
+                    if key is not None:
+                        hit = self._parsed.get(path)
+                        if hit and hit[0] == key:
+                            return hit[1]
+                        if self._files[path][0] == key or attempt:
+                            data = self._load(path, key)
+                            if data and data["name"] == name:
+                                return data
+                if attempt == 0:
+                    self.refresh()  # file added, removed, renamed or edited
+            return None
+
+    def params(self, name, base=None):
+        preset = self.get(name)
+        return None if preset is None else apply_preset_to_params(preset, base or Params())
+
+    def warm(self, processor, base, w, h, names=None):
+        # compile derived state (tone / 3D LUT, vignette mask, glow plan, grain
+        # tiles) for each preset at w x h into the processor's caches, so a
+        # later switch is a cache hit. Safe to call from a background thread.
+        for name in (self.names() if names is None else names):
+            p = self.params(name, base)
+            if p is not None:
+                processor.warm(p, w, h)
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def registry() -> PresetRegistry:
+    # shared registry with a persisted index
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = PresetRegistry(index_path=INDEX_PATH)
+        return _registry
+
+def load_preset_by_name(name: str) -> dict | None:
+    return registry().get(name)
+
+def apply_preset_to_params(preset: dict, params: Params) -> Params:
+    # returns a new Params with the preset's values (Params is immutable)
     if not preset: return params
+    kw = {}
     t = preset.get("tone", {})
-    params.toe       = float(t.get("toe", params.toe))
-    params.shoulder  = float(t.get("shoulder", params.shoulder))
-    params.contrast  = float(t.get("contrast", params.contrast))
-    params.lift      = float(t.get("lift", params.lift))
-    params.gamma     = float(t.get("gamma", params.gamma))
-    params.gain      = float(t.get("gain", params.gain))
+    kw["toe"]       = float(t.get("toe", params.toe))
+    kw["shoulder"]  = float(t.get("shoulder", params.shoulder))
+    kw["contrast"]  = float(t.get("contrast", params.contrast))
+    kw["lift"]      = float(t.get("lift", params.lift))
+    kw["gamma"]     = float(t.get("gamma", params.gamma))
+    kw["gain"]      = float(t.get("gain", params.gain))
     g = preset.get("grain", {})
-    params.grain_strength = float(g.get("strength", params.grain_strength))
-    params.grain_scale    = float(g.get("scale", params.grain_scale))
+    kw["grain_strength"] = float(g.get("strength", params.grain_strength))
+    kw["grain_scale"]    = float(g.get("scale", params.grain_scale))
     h = preset.get("halation", {})
-    params.hal_thresh = float(h.get("thresh", params.hal_thresh))
-    params.hal_r      = float(h.get("r", params.hal_r))
-    params.hal_g      = float(h.get("g", params.hal_g))
-    params.hal_b      = float(h.get("b", params.hal_b))
-    params.hal_str    = float(h.get("strength", params.hal_str))
+    kw["hal_thresh"] = float(h.get("thresh", params.hal_thresh))
+    kw["hal_r"]      = float(h.get("r", params.hal_r))
+    kw["hal_g"]      = float(h.get("g", params.hal_g))
+    kw["hal_b"]      = float(h.get("b", params.hal_b))
+    kw["hal_str"]    = float(h.get("strength", params.hal_str))
     b = preset.get("bloom", {})
-    params.bloom_radius = float(b.get("radius", params.bloom_radius))
-    params.bloom_str    = float(b.get("strength", params.bloom_str))
+    kw["bloom_radius"] = float(b.get("radius", params.bloom_radius))
+    kw["bloom_str"]    = float(b.get("strength", params.bloom_str))
     o = preset.get("optics", {})
-    params.ca_pixels     = float(o.get("ca_pixels", params.ca_pixels))
-    params.vignette_str  = float(o.get("vignette_strength", params.vignette_str))
-    params.vignette_round= float(o.get("vignette_round", params.vignette_round))
+    kw["ca_pixels"]     = float(o.get("ca_pixels", params.ca_pixels))
+    kw["vignette_str"]  = float(o.get("vignette_strength", params.vignette_str))
+    kw["vignette_round"]= float(o.get("vignette_round", params.vignette_round))
+    kw["distortion"]    = float(o.get("distortion", params.distortion))
+    c = preset.get("color", {})
+    cp = params if "color" in preset else Params()  # no colour section: neutral, not the previous look
+    bal = c.get("balance", [cp.balance_r, cp.balance_g, cp.balance_b])
+    kw["balance_r"], kw["balance_g"], kw["balance_b"] = (float(v) for v in bal)
+    kw["mono"] = float(c.get("mono", cp.mono))
+    mix = c.get("mono_mix", [cp.mono_r, cp.mono_g, cp.mono_b])
+    kw["mono_r"], kw["mono_g"], kw["mono_b"] = (float(v) for v in mix)
+    kw["look_cube"] = str(c.get("look", cp.look_cube) or "")
     tm = preset.get("temporal", {})
-    params.flicker = float(tm.get("flicker", params.flicker))
-    params.weave   = float(tm.get("weave", params.weave))
-    params.preset_name = preset.get("name", params.preset_name)
-    return params
+    kw["flicker"] = float(tm.get("flicker", params.flicker))
+    kw["weave"]   = float(tm.get("weave", params.weave))
+    kw["preset_name"] = preset.get("name", params.preset_name)
+    return replace(params, **kw)
 
 def export_preset_from_params(name: str, params: Params) -> dict:
     # Build a YAML-able dict from current Params
@@ -70,13 +209,22 @@ def export_preset_from_params(name: str, params: Params) -> dict:
         "optics": {
             "ca_pixels": params.ca_pixels,
             "vignette_strength": params.vignette_str,
-            "vignette_round": params.vignette_round
+            "vignette_round": params.vignette_round,
+            "distortion": params.distortion
+        },
+        "color": {
+            "balance": [params.balance_r, params.balance_g, params.balance_b],
+            "mono": params.mono,
+            "mono_mix": [params.mono_r, params.mono_g, params.mono_b],
+            "look": params.look_cube
         },
         "temporal": { "flicker": params.flicker, "weave": params.weave }
     }
 
 def save_user_preset(name: str, params: Params) -> str:
+    import yaml
     data = export_preset_from_params(name, params)
+    os.makedirs(USER_PRESETS_DIR, exist_ok=True)
     path = os.path.join(USER_PRESETS_DIR, f"{name}.yaml")
     with open(path, "w", encoding="utf-8") as f:
         yaml.safe_dump(data, f, sort_keys=False)
@@ -0,0 +1,72 @@
+import os, sys, subprocess
+from time import perf_counter
+
+# Startup profiling.
+#
+# import_times(module) runs `python -X importtime -c "import module"` in a
+# fresh interpreter (so nothing is cached in sys.modules) and returns one
+# row per imported module: (self_us, cumulative_us, depth, name).
+# import_report() turns that into the `aurafilm startup` table, leaving out
+# what the bare interpreter imports anyway (site, encodings, ...).
+#
+# StartupMarks records wall-clock milestones of the UI startup (window shown,
+# pipeline ready, first frame, presets indexed) relative to its creation and
+# prints them to stderr when AURAFILM_PROFILE_STARTUP is set.
+
+PROFILE_ENV = "AURAFILM_PROFILE_STARTUP"
+DEFAULT_MODULES = ("aurafilm.rt", "aurafilm.rt.engine", "aurafilm.utils.presets", "aurafilm.ui.app")
+
+def import_times(module=None, python=None):
+    # module=None: what a bare interpreter imports at startup
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    res = subprocess.run([python or sys.executable, "-X", "importtime", "-c", f"import {module}" if module else "pass"],
+                         capture_output=True, text=True, env=env)
+    rows = []
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line: continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1)//2
+        rows.append((int(self_us), int(cum_us), depth, name.strip()))
+    if res.returncode:
+        err = [l for l in res.stderr.splitlines() if not l.startswith("import time:")]
+        raise ImportError(err[-1] if err else f"cannot import {module}")
+    return rows
+
+def _package(name):
+    return name.split(".")[0]
+
+def import_report(modules=DEFAULT_MODULES, top=12, python=None):
+    # -> list of lines: total per module, self time per top-level package,
+    # and the most expensive individual modules
+    lines = []
+    base = {name for *_, name in import_times(None, python)}
+    for module in modules:
+        try:
+            rows = [r for r in import_times(module, python) if r[3] not in base]
+        except ImportError as e:
+            lines.append(f"{module}: {e}")
+            continue
+        total = next((cum for _, cum, _, name in reversed(rows) if name == module), 0)
+        by_pkg = {}
+        for self_us, _, _, name in rows:
+            by_pkg[_package(name)] = by_pkg.get(_package(name), 0) + self_us
+        lines.append(f"{module}: {total/1000:.1f} ms, {len(rows)} modules")
+        for pkg, us in sorted(by_pkg.items(), key=lambda kv: -kv[1])[:top]:
+            lines.append(f"  {pkg:28s} {us/1000:8.1f} ms")
+        lines.append("  top modules (self / cumulative):")
+        for self_us, cum_us, _, name in sorted(rows, key=lambda r: -r[0])[:top]:
+            lines.append(f"    {name:40s} {self_us/1000:7.1f} {cum_us/1000:8.1f} ms")
+    return lines
+
+class StartupMarks:
+    def __init__(self, enabled=None):
+        self.enabled = bool(os.environ.get(PROFILE_ENV)) if enabled is None else enabled
+        self.t0 = perf_counter()
+        self.marks = {}  # name -> ms since creation; the first mark of a name wins
+
+    def mark(self, name):
+        if name in self.marks: return
+        ms = self.marks[name] = (perf_counter() - self.t0)*1000.0
+        if self.enabled: print(f"startup: {name:16s} {ms:8.1f} ms", file=sys.stderr)
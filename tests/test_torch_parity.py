@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from dataclasses import replace
+
+pytest.importorskip("torch")  # CI with torch runs it; skipped elsewhere
+
+from aurafilm.utils.params import Params, ParamStore
+from aurafilm.utils.presets import load_preset_by_name, apply_preset_to_params
+from aurafilm.rt.engine import RTProcessor, make_processor
+from aurafilm.rt.sources import synthetic_frame
+
+# The torch backend against the OpenCV path (scripts/check_torch_parity.py
+# is the full-size version with timings). Same tolerances: the backends
+# differ only in interpolation details, in uint8 levels.
+MEAN_TOL = 0.5
+P999_TOL = 3
+SIZE = (320, 180)
+FRAMES = 4
+
+@pytest.fixture(scope="module")
+def frames():
+    base = synthetic_frame(*SIZE)
+    return [np.roll(base, 3*i, axis=1) for i in range(FRAMES)]
+
+def _processors(name):
+    w, h = SIZE
+    p = apply_preset_to_params(load_preset_by_name(name), Params(width=w, height=h))
+    if name == "kodachrome_60s": p = replace(p, distortion=0.06)  # cover the distortion tables
+    ref = RTProcessor(ParamStore(p))
+    tp = make_processor(ParamStore(p), "torch", batch=2)
+    tp.grain = ref.grain  # same grain fields
+    return ref, tp
+
+@pytest.mark.parametrize("name", ["portra_00s", "kodachrome_60s", "expired_90s", "bw_trix"])
+def test_matches_opencv(name, frames):
+    ref_proc, tp = _processors(name)
+    ref = np.stack([ref_proc.process(f, frame_idx=i) for i, f in enumerate(frames)]).astype(np.int16)
+    out = np.stack(tp.process_batch(frames, frame_idx=0)).astype(np.int16)
+    d = np.abs(out - ref)
+    assert d.mean() <= MEAN_TOL
+    assert np.percentile(d, 99.9) <= P999_TOL
+
+@pytest.mark.parametrize("name", ["portra_00s", "bw_trix"])
+def test_batch_matches_single(name, frames):
+    _, tp = _processors(name)
+    batch = tp.process_batch(frames, frame_idx=0)
+    for i, (f, o) in enumerate(zip(frames, batch)):
+        assert np.abs(tp.process(f, frame_idx=i).astype(np.int16) - o).max() <= 1